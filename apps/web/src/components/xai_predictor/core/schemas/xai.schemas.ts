@@ -112,6 +112,7 @@ export const ConnectedStudentSearchResponseSchema = z.object({
     limit: z.number().int().min(1),
     institute_id: z.string(),
     students: z.array(ConnectedStudentSummarySchema),
+    next_cursor: z.string().nullable().optional(),
 });
 
 export const TemporaryStudentSummarySchema = z.object({
@@ -128,6 +129,7 @@ export const TemporaryStudentListResponseSchema = z.object({
     total: z.number().int().min(0),
     limit: z.number().int().min(1),
     students: z.array(TemporaryStudentSummarySchema),
+    next_cursor: z.string().nullable().optional(),
 });
 
 export const TemporaryStudentRecordSchema = z.object({
@@ -279,6 +281,7 @@ export const StudentInsightsResponseSchema = z.object({
     fairness_evaluation: FairnessEvaluationSchema.nullable().optional(),
     explanation_stability: ExplanationStabilityEvaluationSchema.nullable().optional(),
     case_outcome_explorer: CaseOutcomeExplorerSchema.nullable().optional(),
+    degraded_sections: z.array(z.string()).optional(),
 });
 
 /**
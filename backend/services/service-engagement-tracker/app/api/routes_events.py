@@ -2,16 +2,21 @@
 Event Ingestion API Routes
 For receiving activity events from Moodle or other sources
 """
-from fastapi import APIRouter, Depends, HTTPException, Header, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, status
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
+from starlette.concurrency import run_in_threadpool
+from typing import Iterable, List, Optional, Set, Tuple
+from datetime import date, datetime
+import json
 import uuid
 
 from app.api.dependencies import get_db
 from app.models import StudentActivityEvent
 from app.schemas import EventCreate
-from app.services.aggregation_service import run_pipeline
+from app.services.aggregation_queue import aggregation_queue
+from app.services.aggregation_service import apply_event_to_daily_metrics
+from app.core.config import settings
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -20,12 +25,119 @@ router = APIRouter(prefix="/api/v1/events", tags=["Event Ingestion"])
 
 FALLBACK_INSTITUTE = "LMS_INST_A"
 
+# Rejected NDJSON lines reported back in the response (all are counted)
+MAX_REPORTED_LINE_ERRORS = 100
+
+EVENT_COPY_COLUMNS = (
+    "event_id",
+    "student_id",
+    "institute_id",
+    "event_type",
+    "event_timestamp",
+    "session_id",
+    "event_data",
+    "source_service",
+    "created_at",
+)
+
 
 def _resolve_institute(header_value: Optional[str], body_value: Optional[str]) -> str:
     """Header wins over body field; both fall back to default."""
     return (header_value or body_value or FALLBACK_INSTITUTE).strip()
 
 
+def _apply_to_daily_metrics(db: Session, db_events: List[StudentActivityEvent]) -> bool:
+    """
+    Incrementally update daily metrics for freshly flushed events.
+    On failure the metrics are left untouched (savepoint) and False is
+    returned so the worker recomputes those days in full.
+    """
+    try:
+        with db.begin_nested():
+            for db_event in db_events:
+                apply_event_to_daily_metrics(db, db_event)
+        return True
+    except Exception as e:
+        logger.error(f"❌ Incremental metric update failed, queuing full recompute: {str(e)}", exc_info=True)
+        return False
+
+
+def _event_copy_row(event: EventCreate, institute_id: str, created_at: datetime) -> tuple:
+    return (
+        uuid.uuid4(),
+        event.student_id,
+        institute_id,
+        event.event_type.value,
+        event.event_timestamp,
+        event.session_id,
+        json.dumps(event.event_data or {}),
+        event.source_service,
+        created_at,
+    )
+
+
+def _copy_events(db: Session, rows: Iterable[tuple]) -> None:
+    """Stream event rows into student_activity_events with COPY (caller commits)."""
+    driver_connection = db.connection().connection.driver_connection
+    columns = ", ".join(EVENT_COPY_COLUMNS)
+    with driver_connection.cursor() as cursor:
+        with cursor.copy(
+            f"COPY {StudentActivityEvent.__tablename__} ({columns}) FROM STDIN"
+        ) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def _store_event_chunk(
+    db: Session, events: List[EventCreate], x_institute_id: Optional[str]
+) -> Set[Tuple[str, str, date]]:
+    """
+    COPY one chunk of events, commit it and queue its student-days.
+
+    Bulk imports skip the per-event metric updates; every affected
+    student-day is queued once for a full (repair) recompute instead.
+    """
+    created_at = datetime.now()
+    rows = []
+    keys: Set[Tuple[str, str, date]] = set()
+    for event in events:
+        institute_id = _resolve_institute(x_institute_id, event.institute_id)
+        rows.append(_event_copy_row(event, institute_id, created_at))
+        keys.add((event.student_id, institute_id, event.event_timestamp.date()))
+
+    try:
+        _copy_events(db, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    for student_id, institute_id, event_date in keys:
+        aggregation_queue.enqueue(student_id, institute_id, event_date, repair=True)
+    return keys
+
+
+def _store_ndjson_chunk(
+    db: Session, lines: List[Tuple[int, bytes]], x_institute_id: Optional[str]
+) -> Tuple[int, Set[Tuple[str, str, date]], List[Tuple[int, str]]]:
+    """
+    Parse one chunk of numbered NDJSON lines and store the valid events.
+
+    Runs in the threadpool so validation does not block the event loop.
+    Returns the number of events stored, their student-days and the
+    (line number, error) of every rejected line.
+    """
+    events: List[EventCreate] = []
+    line_errors: List[Tuple[int, str]] = []
+    for line_number, line in lines:
+        try:
+            events.append(EventCreate.model_validate_json(line))
+        except ValidationError as e:
+            line_errors.append((line_number, str(e)))
+    keys = _store_event_chunk(db, events, x_institute_id) if events else set()
+    return len(events), keys, line_errors
+
+
 @router.post("/ingest", status_code=status.HTTP_201_CREATED)
 def ingest_event(
     event: EventCreate,
@@ -37,7 +149,8 @@ def ingest_event(
 
     The institute is identified by the X-Institute-ID request header
     (preferred) or the institute_id field in the JSON body.
-    After storing the event the aggregation pipeline runs automatically.
+    The event is folded into its day's metrics in the same transaction and
+    the student-day is queued for scoring and prediction.
     """
     institute_id = _resolve_institute(x_institute_id, event.institute_id)
     try:
@@ -54,25 +167,24 @@ def ingest_event(
         )
         
         db.add(db_event)
+        db.flush()
+        repair = not _apply_to_daily_metrics(db, [db_event])
         db.commit()
-        db.refresh(db_event)
 
-        # Run aggregation pipeline for this student on the event's date
+        # Score + prediction run in the background worker, once per dirty student-day
         event_date = event.event_timestamp.date()
-        try:
-            pipeline_result = run_pipeline(db, event.student_id, event_date, institute_id=institute_id)
-            logger.info(f"✅ Aggregation successful for {event.student_id} on {event_date}: score={pipeline_result.get('engagement_score', 'N/A')}")
-        except Exception as e:
-            # Log the error but don't fail the event ingestion
-            logger.error(f"❌ Aggregation failed for {event.student_id} on {event_date} (institute: {institute_id}): {str(e)}", exc_info=True)
-            pipeline_result = {"error": str(e), "student_id": event.student_id, "date": str(event_date)}
+        aggregation_queue.enqueue(event.student_id, institute_id, event_date, repair=repair)
         
         return {
             "status": "success",
             "event_id": str(db_event.event_id),
             "institute_id": institute_id,
-            "message": "Event ingested and aggregated",
-            "aggregation": pipeline_result,
+            "message": "Event ingested; aggregation queued",
+            "aggregation": {
+                "status": "queued",
+                "student_id": event.student_id,
+                "date": str(event_date),
+            },
         }
         
     except Exception as e:
@@ -92,39 +204,100 @@ def ingest_events_batch(
     """
     Ingest multiple activity events in batch.
     X-Institute-ID header applies to all events in the batch.
+    Events are written with COPY and committed every
+    INGEST_COPY_CHUNK_SIZE events; each affected student-day is
+    queued for aggregation once.
     """
-    try:
-        db_events = []
-        for event in events:
-            institute_id = _resolve_institute(x_institute_id, event.institute_id)
-            db_event = StudentActivityEvent(
-                event_id=uuid.uuid4(),
-                student_id=event.student_id,
-                institute_id=institute_id,
-                event_type=event.event_type.value,
-                event_timestamp=event.event_timestamp,
-                session_id=event.session_id,
-                event_data=event.event_data or {},
-                source_service=event.source_service,
-                created_at=datetime.now()
+    chunk_size = max(1, settings.INGEST_COPY_CHUNK_SIZE)
+    keys: Set[Tuple[str, str, date]] = set()
+    ingested = 0
+    for start in range(0, len(events), chunk_size):
+        chunk = events[start:start + chunk_size]
+        try:
+            keys.update(_store_event_chunk(db, chunk, x_institute_id))
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error ingesting events after {ingested} were stored: {str(e)}"
             )
-            db_events.append(db_event)
-        
-        db.bulk_save_objects(db_events)
-        db.commit()
-        
-        return {
-            "status": "success",
-            "events_ingested": len(events),
-            "message": f"Successfully ingested {len(events)} events"
-        }
-        
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error ingesting events: {str(e)}"
-        )
+        ingested += len(chunk)
+
+    return {
+        "status": "success",
+        "events_ingested": ingested,
+        "aggregation_keys_queued": len(keys),
+        "message": f"Successfully ingested {ingested} events"
+    }
+
+
+@router.post("/ingest/stream", status_code=status.HTTP_201_CREATED)
+async def ingest_events_stream(
+    request: Request,
+    db: Session = Depends(get_db),
+    x_institute_id: Optional[str] = Header(None, alias="X-Institute-ID"),
+):
+    """
+    Ingest a newline-delimited JSON (NDJSON) stream, one event per line.
+    Meant for LMS log backfills: the body is read incrementally and
+    committed every INGEST_COPY_CHUNK_SIZE lines, so it can hold millions
+    of rows. Each chunk is parsed and stored in the threadpool. Invalid
+    lines are skipped and reported; each affected student-day is queued
+    for aggregation once.
+    """
+    chunk_size = max(1, settings.INGEST_COPY_CHUNK_SIZE)
+    chunk: List[Tuple[int, bytes]] = []
+    keys: Set[Tuple[str, str, date]] = set()
+    ingested = 0
+    rejected = 0
+    errors: List[dict] = []
+    line_number = 0
+
+    async def flush_chunk() -> None:
+        nonlocal chunk, ingested, rejected
+        if not chunk:
+            return
+        pending, chunk = chunk, []
+        try:
+            stored, chunk_keys, line_errors = await run_in_threadpool(
+                _store_ndjson_chunk, db, pending, x_institute_id
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error ingesting events after {ingested} were stored: {str(e)}"
+            )
+        ingested += stored
+        keys.update(chunk_keys)
+        rejected += len(line_errors)
+        for error_line, error in line_errors[:MAX_REPORTED_LINE_ERRORS - len(errors)]:
+            errors.append({"line": error_line, "error": error})
+
+    def add_line(line: bytes) -> None:
+        if line.strip():
+            chunk.append((line_number, line))
+
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            add_line(line)
+            if len(chunk) >= chunk_size:
+                await flush_chunk()
+    if buffer:
+        line_number += 1
+        add_line(buffer)
+    await flush_chunk()
+
+    return {
+        "status": "success",
+        "events_ingested": ingested,
+        "lines_rejected": rejected,
+        "errors": errors,
+        "aggregation_keys_queued": len(keys),
+        "message": f"Successfully ingested {ingested} events"
+    }
 
 
 @router.get("/students/{student_id}/recent")
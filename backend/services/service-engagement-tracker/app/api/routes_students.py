@@ -6,12 +6,21 @@ All endpoints are scoped by institute_id (passed as a query parameter).
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
+from collections import defaultdict
 from typing import List, Optional
 from datetime import date, timedelta
 
 from app.api.dependencies import get_db
 from app.models import EngagementScore, DisengagementPrediction, DailyEngagementMetric
-from app.schemas import StudentAnalytics, EngagementSummary, EngagementScoreResponse, DisengagementPredictionResponse
+from app.schemas import (
+    StudentAnalytics,
+    EngagementSummary,
+    EngagementScoreResponse,
+    DisengagementPredictionResponse,
+    BulkFeaturesRequest,
+    BulkFeaturesResponse,
+    StudentFeatureBundle,
+)
 from app.services.aggregation_service import generate_prediction
 
 router = APIRouter(prefix="/api/v1/students", tags=["Student Analytics"])
@@ -216,7 +225,8 @@ def list_students(
     if engagement_level:
         query = query.filter(EngagementScore.engagement_level == engagement_level)
 
-    scores = query.offset(offset).limit(limit).all()
+    # A total order keeps offset pages stable for callers that walk the whole roster
+    scores = query.order_by(EngagementScore.student_id, EngagementScore.id).offset(offset).limit(limit).all()
 
     students = []
     seen = set()
@@ -253,6 +263,69 @@ def list_students(
     }
 
 
+@router.post("/bulk-features", response_model=BulkFeaturesResponse)
+def get_bulk_features(
+    request: BulkFeaturesRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Latest score, recent score history and recent daily metrics for many students.
+
+    Equivalent to calling /engagement/students/{id}/latest, /history and /metrics
+    for every requested student, but answered with two windowed queries.
+    """
+    student_ids = list(dict.fromkeys(request.student_ids))
+
+    score_rank = func.row_number().over(
+        partition_by=EngagementScore.student_id,
+        order_by=desc(EngagementScore.date),
+    ).label("rank")
+    ranked_scores = db.query(EngagementScore.id, score_rank).filter(
+        EngagementScore.student_id.in_(student_ids)
+    ).subquery()
+    scores = db.query(EngagementScore).join(
+        ranked_scores, EngagementScore.id == ranked_scores.c.id
+    ).filter(
+        ranked_scores.c.rank <= request.days
+    ).order_by(EngagementScore.student_id, EngagementScore.date).all()
+
+    metric_rank = func.row_number().over(
+        partition_by=DailyEngagementMetric.student_id,
+        order_by=desc(DailyEngagementMetric.date),
+    ).label("rank")
+    ranked_metrics = db.query(DailyEngagementMetric.id, metric_rank).filter(
+        DailyEngagementMetric.student_id.in_(student_ids)
+    ).subquery()
+    metrics = db.query(DailyEngagementMetric).join(
+        ranked_metrics, DailyEngagementMetric.id == ranked_metrics.c.id
+    ).filter(
+        ranked_metrics.c.rank <= request.days
+    ).order_by(DailyEngagementMetric.student_id, DailyEngagementMetric.date).all()
+
+    history_by_student = defaultdict(list)
+    for score in scores:
+        history_by_student[score.student_id].append(score)
+    metrics_by_student = defaultdict(list)
+    for metric in metrics:
+        metrics_by_student[metric.student_id].append(metric)
+
+    bundles = []
+    missing = []
+    for student_id in student_ids:
+        history = history_by_student.get(student_id)
+        if not history:
+            missing.append(student_id)
+            continue
+        bundles.append(StudentFeatureBundle(
+            student_id=student_id,
+            latest=history[-1],
+            history=history,
+            metrics=metrics_by_student.get(student_id, []),
+        ))
+
+    return BulkFeaturesResponse(days=request.days, students=bundles, missing=missing)
+
+
 @router.get("/compare")
 def compare_students(
     student_ids: str = Query(..., description="Comma-separated student IDs"),
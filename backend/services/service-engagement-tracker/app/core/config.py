@@ -45,6 +45,19 @@ class Settings(BaseServiceSettings):
     RISK_THRESHOLD_LOW: float = 0.3
     RISK_THRESHOLD_HIGH: float = 0.7
     
+    # Background aggregation (ingest only marks student-days dirty)
+    AGGREGATION_FLUSH_INTERVAL_SECONDS: float = 0.5
+    # A student-day is re-aggregated at most once per this many seconds
+    AGGREGATION_DEBOUNCE_SECONDS: float = 30.0
+    AGGREGATION_MAX_BATCH: int = 200
+    AGGREGATION_DRAIN_TIMEOUT_SECONDS: float = 30.0
+    # Failed runs are retried after this delay, doubling per attempt
+    AGGREGATION_RETRY_BASE_SECONDS: float = 5.0
+    AGGREGATION_MAX_RETRIES: int = 5
+    
+    # Bulk ingest: events (batch) or NDJSON lines (stream) per COPY/commit in /events/ingest/*
+    INGEST_COPY_CHUNK_SIZE: int = 5000
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,7 +1,7 @@
 """
 Database configuration and session management for Engagement Tracker Service
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from typing import Generator
@@ -53,15 +53,53 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+# Keeps the newest row of every (student, institute, day) so the unique index
+# behind the daily metric upsert can be built on databases that predate it
+DEDUPE_DAILY_METRICS_SQL = """
+DELETE FROM daily_engagement_metrics older
+USING daily_engagement_metrics newer
+WHERE older.student_id = newer.student_id
+  AND older.institute_id = newer.institute_id
+  AND older.date = newer.date
+  AND older.id < newer.id
+"""
+
+
 def init_db():
     """
     Initialize database - create all tables
     Call this when starting the application
+
+    Idempotent: existing tables are left alone and only missing tables and
+    indexes are created. Databases created before the daily metric upsert may
+    hold duplicate (student_id, institute_id, date) rows, which stop the
+    ``uq_daily_metric_student_institute_date`` index from being built; run
+    ``python scripts/init_db.py --dedupe-daily-metrics`` once to remove them.
     """
     Base.metadata.create_all(bind=engine)
+    # create_all skips indexes added to tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                print(f"⚠️  Could not create index {index.name}: {e}")
+                if index.name == "uq_daily_metric_student_institute_date":
+                    print("   Run 'python scripts/init_db.py --dedupe-daily-metrics' to remove duplicate daily rows")
     print("✅ Database tables created successfully")
 
 
+def dedupe_daily_metrics() -> int:
+    """
+    Delete duplicate daily engagement metric rows, keeping the newest per
+    student, institute and day. Returns the number of rows removed.
+    """
+    with engine.begin() as connection:
+        result = connection.execute(text(DEDUPE_DAILY_METRICS_SQL))
+    print(f"🧹 Removed {result.rowcount} duplicate daily engagement metric rows")
+    return result.rowcount
+
+
 def drop_all_tables():
     """
     Drop all tables - USE WITH CAUTION!
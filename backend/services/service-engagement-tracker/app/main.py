@@ -115,6 +115,10 @@ async def global_health_check():
     except Exception:
         health["components"]["rabbitmq"] = "error"
         health["status"] = "degraded"
+
+    from app.services.aggregation_queue import aggregation_queue
+
+    health["components"]["aggregation_queue"] = aggregation_queue.stats()
         
     return health
 
@@ -160,6 +164,15 @@ async def redirect_to_app():
 async def startup_event():
     """Runs when the application starts"""
     print("EduMind Engagement Tracking Service starting...")
+
+    # The aggregation upserts need daily_session_bounds and the daily metric unique index
+    from app.core.database import init_db
+
+    try:
+        init_db()
+    except Exception as e:
+        logger.error(f"Database initialization failed: {e}")
+        print(f"Could not initialize database: {e}")
     
     # Connect to RabbitMQ
     broker = get_broker(settings.RABBITMQ_URL)
@@ -168,6 +181,10 @@ async def startup_event():
         print(f"Connected to RabbitMQ as {settings.SERVICE_NAME}")
     except Exception as e:
         print(f"Could not connect to RabbitMQ: {e}")
+
+    from app.services.aggregation_queue import aggregation_queue
+
+    aggregation_queue.start()
         
     print("API Documentation: http://localhost:8002/api/docs")
     print("Service ready!")
@@ -178,6 +195,10 @@ async def startup_event():
 async def shutdown_event():
     """Runs when the application shuts down"""
     print("EduMind Engagement Tracking Service shutting down...")
+
+    from app.services.aggregation_queue import aggregation_queue
+
+    await aggregation_queue.stop(timeout=settings.AGGREGATION_DRAIN_TIMEOUT_SECONDS)
     
     # Close RabbitMQ connection
     broker = get_broker(settings.RABBITMQ_URL)
@@ -4,6 +4,7 @@ Models package - exports all SQLAlchemy models
 from app.models.engagement import (
     StudentActivityEvent,
     DailyEngagementMetric,
+    DailySessionBounds,
     EngagementScore,
     DisengagementPrediction,
     InterventionLog,
@@ -13,6 +14,7 @@ from app.models.engagement import (
 __all__ = [
     "StudentActivityEvent",
     "DailyEngagementMetric",
+    "DailySessionBounds",
     "EngagementScore",
     "DisengagementPrediction",
     "InterventionLog",
@@ -3,7 +3,7 @@ SQLAlchemy models for engagement tracking
 """
 from sqlalchemy import (
     Column, Integer, String, Float, DateTime, Date, 
-    Boolean, JSON, ForeignKey, CheckConstraint, Text, Time
+    Boolean, JSON, ForeignKey, CheckConstraint, Index, Text, Time
 )
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
@@ -99,6 +99,8 @@ class DailyEngagementMetric(Base):
     
     # Unique constraint: one row per student per day
     __table_args__ = (
+        # Also the ON CONFLICT target of aggregate_daily_metrics' upsert
+        Index('uq_daily_metric_student_institute_date', 'student_id', 'institute_id', 'date', unique=True),
         CheckConstraint('login_count >= 0', name='chk_login_count_positive'),
         CheckConstraint('total_session_duration_minutes >= 0', name='chk_session_duration_positive'),
         CheckConstraint('quiz_score_avg IS NULL OR (quiz_score_avg >= 0 AND quiz_score_avg <= 100)', 
@@ -109,6 +111,32 @@ class DailyEngagementMetric(Base):
         return f"<DailyMetric {self.student_id} on {self.date}>"
 
 
+class DailySessionBounds(Base):
+    """
+    First/last event timestamp per session per student-day
+    Lets DailyEngagementMetric session totals be updated per event
+    without rescanning the day's raw events
+    """
+    __tablename__ = "daily_session_bounds"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    student_id = Column(String(50), nullable=False)
+    institute_id = Column(String(100), nullable=False, default='LMS_INST_A')
+    date = Column(Date, nullable=False)
+    session_id = Column(String(100), nullable=False)
+    
+    first_event_at = Column(DateTime(timezone=True), nullable=False)
+    last_event_at = Column(DateTime(timezone=True), nullable=False)
+    event_count = Column(Integer, nullable=False, default=1)
+    
+    __table_args__ = (
+        Index('uq_session_bounds_student_day_session', 'student_id', 'institute_id', 'date', 'session_id', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<SessionBounds {self.session_id} for {self.student_id} on {self.date}>"
+
+
 class EngagementScore(Base):
     """
     Calculated composite engagement scores
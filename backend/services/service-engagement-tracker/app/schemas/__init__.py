@@ -8,6 +8,9 @@ from app.schemas.engagement import (
     AtRiskStudent,
     DailyMetricResponse,
     StudentAnalytics,
+    BulkFeaturesRequest,
+    StudentFeatureBundle,
+    BulkFeaturesResponse,
     BatchPredictionRequest,
     BatchPredictionResponse,
     HealthResponse,
@@ -36,6 +39,9 @@ __all__ = [
     "AtRiskStudent",
     "DailyMetricResponse",
     "StudentAnalytics",
+    "BulkFeaturesRequest",
+    "StudentFeatureBundle",
+    "BulkFeaturesResponse",
     "BatchPredictionRequest",
     "BatchPredictionResponse",
     "HealthResponse",
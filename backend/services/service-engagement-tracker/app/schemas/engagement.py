@@ -162,6 +162,27 @@ class StudentAnalytics(BaseModel):
     risk_history: List[DisengagementPredictionResponse]
 
 
+class BulkFeaturesRequest(BaseModel):
+    """Request schema for fetching feature data for many students at once"""
+    student_ids: List[str] = Field(..., min_length=1, max_length=500, description="Student IDs to fetch")
+    days: int = Field(14, ge=1, le=90, description="Number of most recent days per student")
+
+
+class StudentFeatureBundle(BaseModel):
+    """Latest score, score history and daily metrics for one student"""
+    student_id: str
+    latest: EngagementScoreResponse
+    history: List[EngagementScoreResponse]
+    metrics: List[DailyMetricResponse]
+
+
+class BulkFeaturesResponse(BaseModel):
+    """Response schema for bulk feature fetches"""
+    days: int
+    students: List[StudentFeatureBundle]
+    missing: List[str] = Field(default_factory=list, description="Requested IDs with no engagement data")
+
+
 class BatchPredictionRequest(BaseModel):
     """Request schema for batch predictions"""
     student_ids: Optional[List[str]] = Field(None, description="List of student IDs (None = all students)")
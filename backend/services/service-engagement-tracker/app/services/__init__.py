@@ -2,12 +2,13 @@
 Services package - business logic services
 """
 from app.services.scheduling_service import SchedulingService
-from app.services.aggregation_service import run_pipeline, aggregate_daily_metrics, compute_engagement_score, generate_prediction
+from app.services.aggregation_service import run_pipeline, aggregate_daily_metrics, apply_event_to_daily_metrics, compute_engagement_score, generate_prediction
 
 __all__ = [
     "SchedulingService",
     "run_pipeline",
     "aggregate_daily_metrics",
+    "apply_event_to_daily_metrics",
     "compute_engagement_score",
     "generate_prediction",
 ]
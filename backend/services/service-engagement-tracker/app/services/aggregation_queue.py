@@ -0,0 +1,285 @@
+"""
+Background aggregation queue.
+
+Event ingestion marks a (student, institute, date) key dirty and returns
+right after the insert. A worker task on the app's event loop runs the
+aggregation pipeline for each dirty key once it is due, no matter how many
+events arrived for it in the meantime, and never more than once per
+debounce interval for the same key.
+"""
+import asyncio
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logging import get_logger
+from app.services.aggregation_service import run_pipeline
+
+logger = get_logger(__name__)
+
+AggregationKey = Tuple[str, str, date]
+
+
+class AggregationQueue:
+    """
+    Debounced set of dirty aggregation keys plus the worker that drains it.
+
+    ``enqueue`` is safe to call from the threadpool that runs sync routes.
+    A newly dirty key becomes due ``flush_interval_seconds`` later, or
+    ``debounce_seconds`` after its previous run, whichever is later; events
+    arriving while it waits are coalesced into that one run. Due keys are
+    processed up to ``max_batch_size`` per session. On ``stop`` every
+    pending key is processed regardless of its due time.
+
+    A failed run is retried after ``retry_base_seconds``, doubling per
+    attempt and keeping its ``repair`` flag, and given up on (logged and
+    counted as ``abandoned``) after ``max_retries`` retries.
+
+    Daily metrics are maintained per event at ingest, so the worker only
+    rescores; keys enqueued with ``repair=True`` get a full recompute.
+    """
+
+    def __init__(
+        self,
+        flush_interval_seconds: float = 0.5,
+        debounce_seconds: float = 30.0,
+        max_batch_size: int = 200,
+        retry_base_seconds: float = 5.0,
+        max_retries: int = 5,
+    ):
+        self.flush_interval_seconds = max(0.0, flush_interval_seconds)
+        self.debounce_seconds = max(0.0, debounce_seconds)
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.retry_base_seconds = max(0.0, retry_base_seconds)
+        self.max_retries = max(0, int(max_retries))
+        self._pending: Dict[AggregationKey, float] = {}  # key -> due time
+        self._due: List[Tuple[float, AggregationKey]] = []  # min-heap over _pending
+        self._repair: Set[AggregationKey] = set()
+        self._attempts: Dict[
+            AggregationKey, int
+        ] = {}  # failed runs of keys being retried
+        # key -> monotonic time of its last run, oldest first
+        self._last_run: "OrderedDict[AggregationKey, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.enqueued = 0
+        self.coalesced = 0
+        self.executed = 0
+        self.failed = 0
+        self.retried = 0
+        self.abandoned = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def enqueue(
+        self,
+        student_id: str,
+        institute_id: str,
+        target_date: date,
+        repair: bool = False,
+    ) -> bool:
+        """Mark a student-day dirty. Returns False if it was already pending."""
+        key = (student_id, institute_id, target_date)
+        now = time.monotonic()
+        with self._lock:
+            if repair:
+                self._repair.add(key)
+            if key in self._pending:
+                self.coalesced += 1
+                return False
+            due = now + self.flush_interval_seconds
+            last_run = self._last_run.get(key)
+            if last_run is not None:
+                due = max(due, last_run + self.debounce_seconds)
+            self._pending[key] = due
+            heapq.heappush(self._due, (due, key))
+            self.enqueued += 1
+        self._wake()
+        return True
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._worker = self._loop.create_task(self._run())
+        # Keys enqueued before startup are processed straight away
+        self._wake()
+        logger.info("Aggregation queue started")
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Process the keys still pending, waiting at most ``timeout`` seconds."""
+        if self._worker is None:
+            return
+        self._stopping = True
+        self._wake()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._worker), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Aggregation queue drain timed out; "
+                f"{self.depth} keys were not processed"
+            )
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+        self._wakeup = None
+        self._loop = None
+        logger.info("Aggregation queue stopped")
+
+    @property
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _wake(self) -> None:
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            # Loop already closed during shutdown
+            pass
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            batch = self._take_due_batch(everything=self._stopping)
+            if batch:
+                await run_in_threadpool(self._process_batch, batch)
+                continue
+            if self._stopping:
+                return
+
+            # Sleep until the next key is due or a new one is enqueued
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._seconds_until_due())
+            except asyncio.TimeoutError:
+                pass
+
+    def _seconds_until_due(self) -> Optional[float]:
+        with self._lock:
+            if not self._due:
+                return None
+            return max(0.0, self._due[0][0] - time.monotonic())
+
+    def _take_due_batch(
+        self, everything: bool = False
+    ) -> List[Tuple[AggregationKey, bool]]:
+        """Pop due keys, each paired with whether it needs a full recompute."""
+        now = time.monotonic()
+        batch: List[Tuple[AggregationKey, bool]] = []
+        with self._lock:
+            while self._due and len(batch) < self.max_batch_size:
+                due, key = self._due[0]
+                if due > now and not everything:
+                    break
+                heapq.heappop(self._due)
+                del self._pending[key]
+                repair = key in self._repair
+                self._repair.discard(key)
+                batch.append((key, repair))
+        return batch
+
+    def _mark_run(self, key: AggregationKey) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._last_run[key] = now
+            self._last_run.move_to_end(key)
+            # Forget keys whose debounce window has passed
+            while self._last_run:
+                oldest_key, last_run = next(iter(self._last_run.items()))
+                if now - last_run < self.debounce_seconds:
+                    break
+                del self._last_run[oldest_key]
+
+    def _schedule_retry(self, key: AggregationKey, repair: bool) -> bool:
+        """Queue a failed key again with backoff; False once it is given up on."""
+        with self._lock:
+            attempts = self._attempts.get(key, 0) + 1
+            if attempts > self.max_retries:
+                self._attempts.pop(key, None)
+                self.abandoned += 1
+                return False
+            self._attempts[key] = attempts
+            self.retried += 1
+            if repair:
+                self._repair.add(key)
+            if key not in self._pending:
+                due = time.monotonic() + self.retry_base_seconds * 2 ** (attempts - 1)
+                self._pending[key] = due
+                heapq.heappush(self._due, (due, key))
+        return True
+
+    def _process_batch(self, batch: List[Tuple[AggregationKey, bool]]) -> None:
+        db = SessionLocal()
+        try:
+            for key, repair in batch:
+                student_id, institute_id, target_date = key
+                self._mark_run(key)
+                try:
+                    result = run_pipeline(
+                        db,
+                        student_id,
+                        target_date,
+                        institute_id=institute_id,
+                        recompute_metrics=repair,
+                    )
+                    self.executed += 1
+                    with self._lock:
+                        self._attempts.pop(key, None)
+                    logger.info(
+                        f"✅ Aggregation successful for {student_id} on {target_date}: "
+                        f"score={result.get('engagement_score', 'N/A')}"
+                    )
+                except Exception as e:
+                    db.rollback()
+                    self.failed += 1
+                    retrying = self._schedule_retry(key, repair)
+                    logger.error(
+                        f"❌ Aggregation failed for {student_id} on {target_date} "
+                        f"(institute: {institute_id}): {str(e)}"
+                        f"{'; will retry' if retrying else '; giving up'}",
+                        exc_info=True,
+                    )
+        finally:
+            db.close()
+        self.batches += 1
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "depth": self.depth,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "executed": self.executed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "abandoned": self.abandoned,
+            "batches": self.batches,
+        }
+
+
+aggregation_queue = AggregationQueue(
+    flush_interval_seconds=settings.AGGREGATION_FLUSH_INTERVAL_SECONDS,
+    debounce_seconds=settings.AGGREGATION_DEBOUNCE_SECONDS,
+    max_batch_size=settings.AGGREGATION_MAX_BATCH,
+    retry_base_seconds=settings.AGGREGATION_RETRY_BASE_SECONDS,
+    max_retries=settings.AGGREGATION_MAX_RETRIES,
+)
@@ -5,17 +5,26 @@ Three-step process that should run after every event ingest (or in batch):
     1. aggregate_daily_metrics  – count / sum raw events for one (student, date)
     2. compute_engagement_score – weighted scoring + trend for that day
     3. generate_prediction      – rule-based risk classification
+
+On ingest, step 1 is replaced by apply_event_to_daily_metrics, which folds
+each new event into the day's metrics in place; the full recompute is kept
+as the repair / backfill mode.
 """
 
 from datetime import date, datetime, time, timedelta
 from typing import Optional
 
-from sqlalchemy import func, desc, and_, cast, Date
+from sqlalchemy import (
+    func, desc, and_, cast, case, delete, insert, literal, select, true, update,
+    Date, DateTime, Numeric, Time,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from app.models import (
     StudentActivityEvent,
     DailyEngagementMetric,
+    DailySessionBounds,
     EngagementScore,
     DisengagementPrediction,
 )
@@ -48,100 +57,316 @@ def _clamp(value: float, lo: float = 0.0, hi: float = 100.0) -> float:
 # Step 1 – aggregate raw events into a DailyEngagementMetric row
 # ======================================================================== #
 
+# event_type -> DailyEngagementMetric column it is counted into
+EVENT_COUNT_COLUMNS = {
+    "login_count": ("login",),
+    "page_views": ("page_view",),
+    "video_plays": ("video_play",),
+    "quiz_attempts": ("quiz_start", "quiz_submit"),
+    "assignments_submitted": ("assignment_submit",),
+    "forum_posts": ("forum_post",),
+    "forum_replies": ("forum_reply",),
+    "resource_downloads": ("resource_download",),
+    "content_interactions": ("content_interaction",),
+}
+
+# event_type -> the counter column it increments
+EVENT_COUNTERS = {
+    event_type: column
+    for column, event_types in EVENT_COUNT_COLUMNS.items()
+    for event_type in event_types
+}
+
+SINGLE_EVENT_SESSION_MINUTES = 2.0  # single-event session gets 2 min
+VIDEO_MINUTES_PER_PLAY = 5.0  # ~5 min per play
+
+
+def _round2(value):
+    return func.round(cast(value, Numeric), 2)
+
+
 def aggregate_daily_metrics(
     db: Session, student_id: str, target_date: date, institute_id: str = "LMS_INST_A"
 ) -> DailyEngagementMetric:
+    """Roll one student-day of events up into its DailyEngagementMetric in SQL.
+
+    Runs three statements: the day's session bounds are replaced (DELETE,
+    then INSERT ... SELECT), then the metric row is computed and upserted
+    with one ``INSERT ... SELECT ... ON CONFLICT``. Event counts are
+    ``COUNT(*) FILTER (...)`` aggregates and session durations are summed
+    from the rebuilt bounds – no event is loaded into Python.
+    """
     day_start = datetime.combine(target_date, time.min)
     day_end = datetime.combine(target_date, time.max)
 
     events = (
-        db.query(StudentActivityEvent)
-        .filter(
+        select(
+            StudentActivityEvent.event_type,
+            StudentActivityEvent.event_timestamp,
+            StudentActivityEvent.session_id,
+        )
+        .where(
             StudentActivityEvent.student_id == student_id,
             StudentActivityEvent.institute_id == institute_id,
             StudentActivityEvent.event_timestamp >= day_start,
             StudentActivityEvent.event_timestamp <= day_end,
         )
-        .all()
+        .cte("day_events")
     )
 
-    login_count = sum(1 for e in events if e.event_type == "login")
-    page_views = sum(1 for e in events if e.event_type == "page_view")
-    video_plays = sum(1 for e in events if e.event_type == "video_play")
-    video_completes = sum(1 for e in events if e.event_type == "video_complete")
-    quiz_attempts = sum(1 for e in events if e.event_type in ("quiz_start", "quiz_submit"))
-    assignments_submitted = sum(1 for e in events if e.event_type == "assignment_submit")
-    forum_posts = sum(1 for e in events if e.event_type == "forum_post")
-    forum_replies = sum(1 for e in events if e.event_type == "forum_reply")
-    resource_downloads = sum(1 for e in events if e.event_type == "resource_download")
-    content_interactions = sum(1 for e in events if e.event_type == "content_interaction")
-
-    # Session duration approximation from distinct session_ids
-    session_ids = {e.session_id for e in events if e.session_id}
-    total_sessions = len(session_ids)
-    total_session_minutes = 0.0
-    longest_session = 0.0
-    for sid in session_ids:
-        sess_events = sorted(
-            [e for e in events if e.session_id == sid],
-            key=lambda e: e.event_timestamp,
+    _rebuild_session_bounds(db, student_id, institute_id, target_date, events)
+
+    # Session durations from the bounds just rebuilt, exactly as the per-event path reads them
+    sessions = _session_totals(_day_bounds_filter(student_id, institute_id, target_date))
+    session_values = _session_metric_values(sessions)
+
+    is_login = events.c.event_type == "login"
+    counts = select(
+        *(
+            func.count().filter(events.c.event_type.in_(event_types)).label(column)
+            for column, event_types in EVENT_COUNT_COLUMNS.items()
+        ),
+        func.min(events.c.event_timestamp).filter(is_login).label("first_login_at"),
+        func.max(events.c.event_timestamp).filter(is_login).label("last_login_at"),
+    ).subquery("counts")
+
+    rollup = select(
+        literal(student_id),
+        literal(institute_id),
+        literal(target_date),
+        counts.c.login_count,
+        cast(counts.c.first_login_at, Time),
+        cast(counts.c.last_login_at, Time),
+        session_values["total_sessions"],
+        session_values["total_session_duration_minutes"],
+        session_values["avg_session_duration_minutes"],
+        session_values["longest_session_minutes"],
+        counts.c.page_views,
+        counts.c.page_views,  # unique_pages_viewed, simplified
+        counts.c.content_interactions,
+        counts.c.video_plays,
+        _round2(counts.c.video_plays * VIDEO_MINUTES_PER_PLAY),
+        counts.c.resource_downloads,
+        counts.c.forum_posts,
+        counts.c.forum_replies,
+        counts.c.quiz_attempts,
+        counts.c.assignments_submitted,
+        func.now(),
+        func.now(),
+    ).select_from(counts.join(sessions, true()))
+
+    columns = [
+        "student_id",
+        "institute_id",
+        "date",
+        "login_count",
+        "first_login_time",
+        "last_login_time",
+        "total_sessions",
+        "total_session_duration_minutes",
+        "avg_session_duration_minutes",
+        "longest_session_minutes",
+        "page_views",
+        "unique_pages_viewed",
+        "content_interactions",
+        "video_plays",
+        "video_watch_minutes",
+        "resource_downloads",
+        "forum_posts",
+        "forum_replies",
+        "quiz_attempts",
+        "assignments_submitted",
+        "created_at",
+        "updated_at",
+    ]
+    statement = pg_insert(DailyEngagementMetric).from_select(columns, rollup)
+    statement = statement.on_conflict_do_update(
+        index_elements=[
+            DailyEngagementMetric.student_id,
+            DailyEngagementMetric.institute_id,
+            DailyEngagementMetric.date,
+        ],
+        set_={
+            column: statement.excluded[column]
+            for column in columns
+            if column not in ("student_id", "institute_id", "date", "created_at")
+        },
+    ).returning(DailyEngagementMetric)
+
+    return db.scalars(
+        statement, execution_options={"populate_existing": True}
+    ).one()
+
+
+def _rebuild_session_bounds(db: Session, student_id: str, institute_id: str, target_date: date, events) -> None:
+    """Replace the day's session bounds with the ones found in ``events``."""
+    db.execute(
+        delete(DailySessionBounds).where(*_day_bounds_filter(student_id, institute_id, target_date)),
+        execution_options={"synchronize_session": False},
+    )
+    db.execute(
+        insert(DailySessionBounds).from_select(
+            ["student_id", "institute_id", "date", "session_id", "first_event_at", "last_event_at", "event_count"],
+            select(
+                literal(student_id),
+                literal(institute_id),
+                literal(target_date),
+                events.c.session_id,
+                func.min(events.c.event_timestamp),
+                func.max(events.c.event_timestamp),
+                func.count(),
+            )
+            .where(events.c.session_id.isnot(None), events.c.session_id != "")
+            .group_by(events.c.session_id),
         )
-        if len(sess_events) >= 2:
-            duration = (sess_events[-1].event_timestamp - sess_events[0].event_timestamp).total_seconds() / 60
-        else:
-            duration = 2.0  # single-event session gets 2 min
-        total_session_minutes += duration
-        longest_session = max(longest_session, duration)
+    )
 
-    avg_session = total_session_minutes / total_sessions if total_sessions else 0.0
 
-    first_login_time = None
-    last_login_time = None
-    login_events = sorted(
-        [e for e in events if e.event_type == "login"],
-        key=lambda e: e.event_timestamp,
+def _day_bounds_filter(student_id: str, institute_id: str, target_date: date) -> tuple:
+    return (
+        DailySessionBounds.student_id == student_id,
+        DailySessionBounds.institute_id == institute_id,
+        DailySessionBounds.date == target_date,
     )
-    if login_events:
-        first_login_time = login_events[0].event_timestamp.time()
-        last_login_time = login_events[-1].event_timestamp.time()
 
-    # Upsert
-    existing = (
-        db.query(DailyEngagementMetric)
-        .filter(
-            DailyEngagementMetric.student_id == student_id,
-            DailyEngagementMetric.institute_id == institute_id,
-            DailyEngagementMetric.date == target_date,
+
+def _session_minutes_sql(bounds=DailySessionBounds):
+    return case(
+        (
+            bounds.event_count >= 2,
+            func.extract("epoch", bounds.last_event_at - bounds.first_event_at) / 60,
+        ),
+        else_=SINGLE_EVENT_SESSION_MINUTES,
+    )
+
+
+def _session_totals(day_bounds_filter: tuple):
+    """One-row subquery with the day's session count, total and longest minutes."""
+    minutes = _session_minutes_sql()
+    return (
+        select(
+            func.count().label("total_sessions"),
+            func.coalesce(func.sum(minutes), 0.0).label("total_minutes"),
+            func.coalesce(func.max(minutes), 0.0).label("longest_minutes"),
         )
-        .first()
+        .where(*day_bounds_filter)
+        .subquery("sessions")
     )
-    if existing:
-        metric = existing
-    else:
-        metric = DailyEngagementMetric(student_id=student_id, institute_id=institute_id, date=target_date)
-        db.add(metric)
-
-    metric.login_count = login_count
-    metric.first_login_time = first_login_time
-    metric.last_login_time = last_login_time
-    metric.total_sessions = total_sessions
-    metric.total_session_duration_minutes = round(total_session_minutes, 2)
-    metric.avg_session_duration_minutes = round(avg_session, 2)
-    metric.longest_session_minutes = round(longest_session, 2)
-    metric.page_views = page_views
-    metric.unique_pages_viewed = page_views  # simplified
-    metric.content_interactions = content_interactions
-    metric.video_plays = video_plays
-    metric.video_watch_minutes = round(video_plays * 5.0, 2)  # ~5 min per play
-    metric.resource_downloads = resource_downloads
-    metric.forum_posts = forum_posts
-    metric.forum_replies = forum_replies
-    metric.quiz_attempts = quiz_attempts
-    metric.assignments_submitted = assignments_submitted
-    metric.updated_at = datetime.utcnow()
 
-    db.flush()
-    return metric
+
+def _session_metric_values(sessions) -> dict:
+    """DailyEngagementMetric session columns, rounded the same way on every write path."""
+    return {
+        "total_sessions": sessions.c.total_sessions,
+        "total_session_duration_minutes": _round2(sessions.c.total_minutes),
+        "avg_session_duration_minutes": _round2(
+            case(
+                (sessions.c.total_sessions > 0, sessions.c.total_minutes / sessions.c.total_sessions),
+                else_=0.0,
+            )
+        ),
+        "longest_session_minutes": _round2(sessions.c.longest_minutes),
+    }
+
+
+def apply_event_to_daily_metrics(db: Session, event: StudentActivityEvent) -> DailyEngagementMetric:
+    """
+    Fold one newly stored event into its DailyEngagementMetric row.
+
+    Increments the event's counter, extends its session's bounds and
+    re-derives the session columns from the day's bounds, so the cost
+    grows with the day's sessions, not with the events the student
+    already has that day. A day aggregated before session bounds were
+    tracked is recomputed in full instead, so the event must already be
+    flushed.
+    """
+    student_id, institute_id = event.student_id, event.institute_id
+    target_date = event.event_timestamp.date()
+    event_at = literal(event.event_timestamp, DateTime(timezone=True))
+    metric_filter = (
+        DailyEngagementMetric.student_id == student_id,
+        DailyEngagementMetric.institute_id == institute_id,
+        DailyEngagementMetric.date == target_date,
+    )
+
+    metric_created = db.execute(
+        pg_insert(DailyEngagementMetric)
+        .values(student_id=student_id, institute_id=institute_id, date=target_date)
+        .on_conflict_do_nothing(index_elements=["student_id", "institute_id", "date"])
+        .returning(DailyEngagementMetric.id)
+    ).first() is not None
+
+    values = {"updated_at": func.now()}
+    counter = EVENT_COUNTERS.get(event.event_type)
+    if counter is not None:
+        values[counter] = getattr(DailyEngagementMetric, counter) + 1
+    if event.event_type == "login":
+        values["first_login_time"] = func.least(DailyEngagementMetric.first_login_time, cast(event_at, Time))
+        values["last_login_time"] = func.greatest(DailyEngagementMetric.last_login_time, cast(event_at, Time))
+    elif event.event_type == "page_view":
+        values["unique_pages_viewed"] = DailyEngagementMetric.unique_pages_viewed + 1  # simplified
+    elif event.event_type == "video_play":
+        values["video_watch_minutes"] = DailyEngagementMetric.video_watch_minutes + VIDEO_MINUTES_PER_PLAY
+
+    if event.session_id:
+        day_bounds_filter = _day_bounds_filter(student_id, institute_id, target_date)
+        opened = db.execute(
+            pg_insert(DailySessionBounds)
+            .values(
+                student_id=student_id,
+                institute_id=institute_id,
+                date=target_date,
+                session_id=event.session_id,
+                first_event_at=event.event_timestamp,
+                last_event_at=event.event_timestamp,
+                event_count=1,
+            )
+            .on_conflict_do_nothing(
+                index_elements=["student_id", "institute_id", "date", "session_id"]
+            )
+            .returning(DailySessionBounds.id)
+        ).first() is not None
+        if not opened:
+            # The session is already on record (possibly opened by a concurrent ingest)
+            db.execute(
+                update(DailySessionBounds)
+                .where(*day_bounds_filter, DailySessionBounds.session_id == event.session_id)
+                .values(
+                    first_event_at=func.least(DailySessionBounds.first_event_at, event_at),
+                    last_event_at=func.greatest(DailySessionBounds.last_event_at, event_at),
+                    event_count=DailySessionBounds.event_count + 1,
+                ),
+                execution_options={"synchronize_session": False},
+            )
+        elif not metric_created and _aggregated_without_session_bounds(
+            db, metric_filter, day_bounds_filter, event.session_id
+        ):
+            return aggregate_daily_metrics(db, student_id, target_date, institute_id=institute_id)
+
+        # Re-derived from the day's bounds (one row per session), so the stored
+        # values match the full recompute exactly, rounding included
+        values.update(_session_metric_values(_session_totals(day_bounds_filter)))
+
+    return db.scalars(
+        update(DailyEngagementMetric)
+        .where(*metric_filter)
+        .values(**values)
+        .returning(DailyEngagementMetric),
+        execution_options={"populate_existing": True, "synchronize_session": False},
+    ).one()
+
+
+def _aggregated_without_session_bounds(db: Session, metric_filter, day_bounds_filter, session_id: str) -> bool:
+    """True when the day has sessions on record but none of their bounds (legacy rows)."""
+    sessions_on_record = db.scalar(select(DailyEngagementMetric.total_sessions).where(*metric_filter))
+    if not sessions_on_record:
+        return False
+    other_bounds = db.scalar(
+        select(func.count())
+        .select_from(DailySessionBounds)
+        .where(*day_bounds_filter, DailySessionBounds.session_id != session_id)
+    )
+    return not other_bounds
 
 
 # ======================================================================== #
@@ -414,11 +639,29 @@ def run_pipeline(
     student_id: str,
     target_date: Optional[date] = None,
     institute_id: str = "LMS_INST_A",
+    recompute_metrics: bool = True,
 ) -> dict:
+    """
+    Run steps 1-3. With ``recompute_metrics=False`` the daily metric kept up
+    to date by apply_event_to_daily_metrics is used as is (it is only
+    recomputed if missing).
+    """
     if target_date is None:
         target_date = date.today()
 
-    metric = aggregate_daily_metrics(db, student_id, target_date, institute_id=institute_id)
+    metric = None
+    if not recompute_metrics:
+        metric = (
+            db.query(DailyEngagementMetric)
+            .filter(
+                DailyEngagementMetric.student_id == student_id,
+                DailyEngagementMetric.institute_id == institute_id,
+                DailyEngagementMetric.date == target_date,
+            )
+            .first()
+        )
+    if metric is None:
+        metric = aggregate_daily_metrics(db, student_id, target_date, institute_id=institute_id)
     score = compute_engagement_score(db, student_id, target_date, institute_id=institute_id)
     prediction = generate_prediction(db, student_id, institute_id=institute_id)
 
@@ -14,7 +14,7 @@ if sys.platform == 'win32':
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.core.database import engine, Base, init_db, drop_all_tables
+from app.core.database import engine, Base, init_db, drop_all_tables, dedupe_daily_metrics
 from app.models import (
     StudentActivityEvent,
     DailyEngagementMetric,
@@ -35,8 +35,8 @@ def create_tables():
     print(f"   Database: {engine.url}")
     
     try:
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        # Create all tables (and any indexes missing from existing ones)
+        init_db()
         
         print("\n✅ Successfully created tables:")
         for table in Base.metadata.sorted_tables:
@@ -76,8 +76,17 @@ if __name__ == "__main__":
         help='Drop all tables and recreate (DANGEROUS!)'
     )
     
+    parser.add_argument(
+        '--dedupe-daily-metrics',
+        action='store_true',
+        help='Remove duplicate daily engagement metric rows before creating indexes'
+    )
+    
     args = parser.parse_args()
     
+    if args.dedupe_daily_metrics:
+        dedupe_daily_metrics()
+    
     if args.reset:
         reset_database()
     else:
@@ -149,6 +149,20 @@ def test_event_ingest():
     else:
         print(f"   ❌ Failed: {response.text}")
 
+def test_bulk_features():
+    """Test bulk feature fetch"""
+    print("\n📦 Testing Bulk Features...")
+    payload = {"student_ids": ["STU0001", "STU0002", "UNKNOWN_STUDENT"], "days": 14}
+    response = requests.post(f"{BASE_URL}/api/v1/students/bulk-features", json=payload)
+    print(f"   Status: {response.status_code}")
+    if response.status_code == 200:
+        data = response.json()
+        print(f"   Students: {len(data['students'])}")
+        print(f"   Missing: {data['missing']}")
+        print("   ✅ Bulk features passed!")
+    else:
+        print(f"   ❌ Failed: {response.text}")
+
 def test_prediction_stats():
     """Test prediction statistics"""
     print("\n📈 Testing Prediction Statistics...")
@@ -180,6 +194,7 @@ def main():
         test_student_dashboard()
         test_leaderboard()
         test_event_ingest()
+        test_bulk_features()
         test_prediction_stats()
         
         print("\n" + "=" * 60)
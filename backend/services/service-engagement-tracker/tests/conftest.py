@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+# Same path setup as app/main.py: the service and the repo root (backend.shared)
+service_dir = Path(__file__).resolve().parent.parent
+project_root = service_dir.parent.parent.parent
+for path in (project_root, service_dir):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
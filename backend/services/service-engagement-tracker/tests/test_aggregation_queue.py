@@ -0,0 +1,214 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.services import aggregation_queue as aggregation_queue_module
+from app.services.aggregation_queue import AggregationQueue
+
+DAY = date(2026, 3, 2)
+KEY = ("STU_Q_1", "LMS_INST_A", DAY)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeSession:
+    rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def pipeline_runs(monkeypatch):
+    """Record run_pipeline calls as (student, institute, date, recompute_metrics)."""
+    runs = []
+
+    def run_pipeline(db, student_id, target_date, institute_id, recompute_metrics):
+        runs.append((student_id, institute_id, target_date, recompute_metrics))
+        return {"engagement_score": 50.0}
+
+    monkeypatch.setattr(aggregation_queue_module, "run_pipeline", run_pipeline)
+    monkeypatch.setattr(aggregation_queue_module, "SessionLocal", FakeSession)
+    return runs
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(aggregation_queue_module.time, "monotonic", fake_clock)
+    return fake_clock
+
+
+def drain_due(queue: AggregationQueue) -> list:
+    batches = []
+    while True:
+        batch = queue._take_due_batch()
+        if not batch:
+            return batches
+        queue._process_batch(batch)
+        batches.append(batch)
+
+
+def test_repeated_enqueues_of_one_key_run_once(pipeline_runs, clock):
+    queue = AggregationQueue(flush_interval_seconds=0.5, debounce_seconds=30.0)
+
+    assert queue.enqueue(*KEY)
+    assert not queue.enqueue(*KEY)
+    assert not queue.enqueue(*KEY)
+    assert drain_due(queue) == []
+
+    clock.now += 0.5
+    drain_due(queue)
+
+    assert pipeline_runs == [(*KEY, False)]
+    assert queue.stats()["enqueued"] == 1
+    assert queue.stats()["coalesced"] == 2
+    assert queue.depth == 0
+
+
+def test_key_enqueued_after_a_run_waits_for_the_debounce(pipeline_runs, clock):
+    queue = AggregationQueue(flush_interval_seconds=0.5, debounce_seconds=30.0)
+    queue.enqueue(*KEY)
+    clock.now += 0.5
+    drain_due(queue)
+    last_run = clock.now
+
+    clock.now += 1.0
+    queue.enqueue(*KEY)
+    clock.now = last_run + 29.9
+    assert drain_due(queue) == []
+
+    clock.now = last_run + 30.0
+    drain_due(queue)
+
+    assert len(pipeline_runs) == 2
+
+
+def test_repair_flag_sticks_until_the_key_runs(pipeline_runs, clock):
+    queue = AggregationQueue(flush_interval_seconds=0.0)
+    other_key = ("STU_Q_2", "LMS_INST_A", DAY)
+    queue.enqueue(*KEY, repair=True)
+    queue.enqueue(*KEY)
+    queue.enqueue(*other_key)
+    queue.enqueue(*other_key, repair=True)
+
+    drain_due(queue)
+
+    assert sorted(pipeline_runs) == [(*KEY, True), (*other_key, True)]
+
+
+def test_due_keys_are_processed_in_bounded_batches(pipeline_runs, clock):
+    queue = AggregationQueue(flush_interval_seconds=0.0, max_batch_size=2)
+    for index in range(5):
+        queue.enqueue(f"STU_Q_{index}", "LMS_INST_A", DAY)
+
+    batches = drain_due(queue)
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert len(pipeline_runs) == 5
+    assert queue.stats()["batches"] == 3
+
+
+def test_failed_run_is_retried_with_backoff_and_keeps_repair(monkeypatch, clock):
+    outcomes = [
+        RuntimeError("connection reset"),
+        RuntimeError("connection reset"),
+        None,
+    ]
+    runs = []
+
+    def flaky_pipeline(db, student_id, target_date, institute_id, recompute_metrics):
+        runs.append(recompute_metrics)
+        outcome = outcomes.pop(0)
+        if outcome is not None:
+            raise outcome
+        return {}
+
+    monkeypatch.setattr(aggregation_queue_module, "run_pipeline", flaky_pipeline)
+    monkeypatch.setattr(aggregation_queue_module, "SessionLocal", FakeSession)
+    queue = AggregationQueue(flush_interval_seconds=0.0, retry_base_seconds=5.0)
+    queue.enqueue(*KEY, repair=True)
+
+    drain_due(queue)
+    assert queue.depth == 1
+    clock.now += 4.9
+    assert drain_due(queue) == []
+    clock.now += 0.1
+    drain_due(queue)
+    # The second retry backs off twice as long
+    clock.now += 9.9
+    assert drain_due(queue) == []
+    clock.now += 0.1
+    drain_due(queue)
+
+    assert runs == [True, True, True]
+    assert queue.depth == 0
+    assert queue.stats()["failed"] == 2
+    assert queue.stats()["retried"] == 2
+    assert queue.stats()["executed"] == 1
+    assert queue._attempts == {}
+
+
+def test_key_is_abandoned_after_max_retries(monkeypatch, clock):
+    def failing_pipeline(db, student_id, target_date, institute_id, recompute_metrics):
+        raise RuntimeError("constraint violation")
+
+    monkeypatch.setattr(aggregation_queue_module, "run_pipeline", failing_pipeline)
+    monkeypatch.setattr(aggregation_queue_module, "SessionLocal", FakeSession)
+    queue = AggregationQueue(
+        flush_interval_seconds=0.0, retry_base_seconds=1.0, max_retries=2
+    )
+    queue.enqueue(*KEY)
+
+    for _ in range(4):
+        drain_due(queue)
+        clock.now += 10.0
+
+    assert queue.stats()["failed"] == 3
+    assert queue.stats()["abandoned"] == 1
+    assert queue.depth == 0
+
+
+def test_stop_drains_keys_that_are_not_due_yet(pipeline_runs):
+    queue = AggregationQueue(flush_interval_seconds=60.0)
+
+    async def run():
+        queue.start()
+        queue.enqueue(*KEY)
+        await asyncio.sleep(0)
+        assert pipeline_runs == []
+        await queue.stop(timeout=5.0)
+
+    asyncio.run(run())
+
+    assert pipeline_runs == [(*KEY, False)]
+    assert not queue.running
+
+
+def test_stats_report_queue_state_for_health(pipeline_runs, clock):
+    queue = AggregationQueue(flush_interval_seconds=0.5)
+    queue.enqueue(*KEY)
+    queue.enqueue(*KEY)
+    queue.enqueue("STU_Q_2", "LMS_INST_A", DAY)
+
+    assert queue.stats() == {
+        "running": False,
+        "depth": 2,
+        "enqueued": 2,
+        "coalesced": 1,
+        "executed": 0,
+        "failed": 0,
+        "retried": 0,
+        "abandoned": 0,
+        "batches": 0,
+    }
@@ -0,0 +1,207 @@
+import os
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, delete
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.models import DailyEngagementMetric, DailySessionBounds, StudentActivityEvent
+from app.services.aggregation_service import (
+    aggregate_daily_metrics,
+    apply_event_to_daily_metrics,
+)
+
+STUDENT_ID = "STU_AGG_1"
+INSTITUTE_ID = "LMS_INST_A"
+DAY = date(2026, 3, 2)
+DAY_START = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+
+# (minutes after 08:00, event_type, session_id), deliberately out of order
+EVENTS = [
+    (30, "login", "S1"),
+    (10, "page_view", "S1"),
+    (55, "video_play", "S1"),
+    (120, "login", "S2"),
+    (5, "page_view", None),
+    (121, "quiz_start", "S2"),
+    (200, "forum_post", "S3"),
+    (60, "content_interaction", "S1"),
+    (240, "resource_download", "S4"),
+    (240.5, "page_view", "S4"),  # a lone session gaining a second event gets shorter
+    (1, "login", "S1"),
+]
+
+COMPARED_COLUMNS = [
+    "login_count",
+    "first_login_time",
+    "last_login_time",
+    "total_sessions",
+    "page_views",
+    "unique_pages_viewed",
+    "content_interactions",
+    "video_plays",
+    "resource_downloads",
+    "forum_posts",
+    "forum_replies",
+    "quiz_attempts",
+    "assignments_submitted",
+]
+COMPARED_MINUTES = [
+    "total_session_duration_minutes",
+    "avg_session_duration_minutes",
+    "longest_session_minutes",
+    "video_watch_minutes",
+]
+
+
+class RecordingSession:
+    """Records the statements the aggregation functions issue, without running them."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, *args, **kwargs):
+        self.statements.append(statement)
+        # Every upsert reports a new row, so no legacy fallback is taken
+        return type("Result", (), {"first": lambda _self: (1,)})()
+
+    def scalars(self, statement, *args, **kwargs):
+        self.statements.append(statement)
+        return type("Result", (), {"one": lambda _self: None})()
+
+
+def compile_postgres(statement) -> str:
+    return " ".join(str(statement.compile(dialect=postgresql.dialect())).split())
+
+
+def test_sql_rollup_compiles_to_bounds_refresh_and_one_upsert():
+    session = RecordingSession()
+
+    aggregate_daily_metrics(session, STUDENT_ID, DAY, institute_id=INSTITUTE_ID)
+
+    delete_bounds, insert_bounds, upsert = [
+        compile_postgres(statement) for statement in session.statements
+    ]
+    assert delete_bounds.startswith("DELETE FROM daily_session_bounds WHERE")
+    assert insert_bounds.startswith("WITH day_events AS")
+    assert "INSERT INTO daily_session_bounds" in insert_bounds
+    assert "GROUP BY day_events.session_id" in insert_bounds
+    assert upsert.startswith("WITH day_events AS")
+    assert "INSERT INTO daily_engagement_metrics" in upsert
+    assert "count(*) FILTER (WHERE day_events.event_type IN" in upsert
+    assert "ON CONFLICT (student_id, institute_id, date) DO UPDATE SET" in upsert
+    assert "created_at = excluded.created_at" not in upsert
+    assert "RETURNING daily_engagement_metrics.id" in upsert
+
+
+def test_incremental_update_rounds_sessions_like_the_rollup():
+    session = RecordingSession()
+    event = StudentActivityEvent(
+        student_id=STUDENT_ID,
+        institute_id=INSTITUTE_ID,
+        event_type="page_view",
+        event_timestamp=DAY_START,
+        session_id="S1",
+    )
+
+    apply_event_to_daily_metrics(session, event)
+    aggregate_daily_metrics(session, STUDENT_ID, DAY, institute_id=INSTITUTE_ID)
+
+    update_metric, upsert = (
+        compile_postgres(session.statements[2]),
+        compile_postgres(session.statements[-1]),
+    )
+    assert update_metric.startswith("UPDATE daily_engagement_metrics SET")
+    for statement in (update_metric, upsert):
+        assert (
+            "(SELECT count(*) AS total_sessions, coalesce(sum(CASE WHEN "
+            "(daily_session_bounds.event_count >= " in statement
+        )
+        assert "round(CAST(sessions.total_minutes AS NUMERIC)" in statement
+        assert "round(CAST(sessions.longest_minutes AS NUMERIC)" in statement
+        assert "round(CAST(CASE WHEN (sessions.total_sessions > " in statement
+
+
+@pytest.fixture
+def db():
+    """Session on ENGAGEMENT_TEST_DATABASE_URL, rolled back after the test."""
+    database_url = os.getenv("ENGAGEMENT_TEST_DATABASE_URL")
+    if not database_url:
+        pytest.skip("ENGAGEMENT_TEST_DATABASE_URL is not set")
+    engine = create_engine(database_url)
+    tables = [
+        model.__table__
+        for model in (StudentActivityEvent, DailyEngagementMetric, DailySessionBounds)
+    ]
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        connection.exec_driver_sql("SET TIME ZONE 'UTC'")
+        StudentActivityEvent.metadata.create_all(connection, tables=tables)
+        session = Session(bind=connection, join_transaction_mode="create_savepoint")
+        try:
+            yield session
+        finally:
+            session.close()
+            transaction.rollback()
+    engine.dispose()
+
+
+def store_event(db, offset, event_type, session_id) -> StudentActivityEvent:
+    event = StudentActivityEvent(
+        student_id=STUDENT_ID,
+        institute_id=INSTITUTE_ID,
+        event_type=event_type,
+        event_timestamp=DAY_START + timedelta(minutes=offset),
+        session_id=session_id,
+        event_data={},
+    )
+    db.add(event)
+    db.flush()
+    return event
+
+
+def metric_values(metric: DailyEngagementMetric) -> dict:
+    values = {column: getattr(metric, column) for column in COMPARED_COLUMNS}
+    values.update(
+        {column: round(getattr(metric, column), 2) for column in COMPARED_MINUTES}
+    )
+    return values
+
+
+def test_incremental_metrics_match_sql_rollup(db):
+    for offset, event_type, session_id in EVENTS:
+        incremental = metric_values(
+            apply_event_to_daily_metrics(
+                db, store_event(db, offset, event_type, session_id)
+            )
+        )
+
+    recomputed = metric_values(
+        aggregate_daily_metrics(db, STUDENT_ID, DAY, institute_id=INSTITUTE_ID)
+    )
+
+    assert incremental == recomputed
+    assert recomputed["total_sessions"] == 4
+    assert recomputed["longest_session_minutes"] == 59.0
+
+
+def test_day_aggregated_before_session_bounds_is_recomputed(db):
+    for offset, event_type, session_id in EVENTS[:3]:
+        store_event(db, offset, event_type, session_id)
+    aggregate_daily_metrics(db, STUDENT_ID, DAY, institute_id=INSTITUTE_ID)
+    # A row written before daily_session_bounds existed has no bounds to extend
+    db.execute(delete(DailySessionBounds))
+
+    offset, event_type, session_id = EVENTS[3]
+    incremental = metric_values(
+        apply_event_to_daily_metrics(
+            db, store_event(db, offset, event_type, session_id)
+        )
+    )
+    recomputed = metric_values(
+        aggregate_daily_metrics(db, STUDENT_ID, DAY, institute_id=INSTITUTE_ID)
+    )
+
+    assert incremental == recomputed
+    assert db.query(DailySessionBounds).count() == 2
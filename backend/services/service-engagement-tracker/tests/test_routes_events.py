@@ -0,0 +1,57 @@
+import json
+from datetime import date
+
+from app.api import routes_events
+from app.core.config import settings
+
+
+def event_payload(student_id: str) -> dict:
+    return {
+        "student_id": student_id,
+        "event_type": "page_view",
+        "event_timestamp": "2026-03-02T08:00:00Z",
+        "session_id": "S1",
+    }
+
+
+def test_batch_is_stored_in_copy_sized_chunks(monkeypatch):
+    stored_chunks = []
+
+    def record_chunk(db, events, x_institute_id):
+        stored_chunks.append([event.student_id for event in events])
+        return {(event.student_id, "LMS_INST_A", date(2026, 3, 2)) for event in events}
+
+    monkeypatch.setattr(settings, "INGEST_COPY_CHUNK_SIZE", 2)
+    monkeypatch.setattr(routes_events, "_store_event_chunk", record_chunk)
+    events = [
+        routes_events.EventCreate.model_validate(event_payload(f"STU_{index}"))
+        for index in range(5)
+    ]
+
+    response = routes_events.ingest_events_batch(events, db=None, x_institute_id=None)
+
+    assert stored_chunks == [["STU_0", "STU_1"], ["STU_2", "STU_3"], ["STU_4"]]
+    assert response["events_ingested"] == 5
+    assert response["aggregation_keys_queued"] == 5
+
+
+def test_ndjson_chunk_is_parsed_with_line_numbers(monkeypatch):
+    stored_chunks = []
+
+    def record_chunk(db, events, x_institute_id):
+        stored_chunks.append([event.student_id for event in events])
+        return {("STU_1", "LMS_INST_A", date(2026, 3, 2))}
+
+    monkeypatch.setattr(routes_events, "_store_event_chunk", record_chunk)
+    lines = [
+        (1, json.dumps(event_payload("STU_1")).encode()),
+        (3, b'{"student_id": "STU_2"}'),
+        (4, json.dumps(event_payload("STU_1")).encode()),
+    ]
+
+    stored, keys, line_errors = routes_events._store_ndjson_chunk(None, lines, None)
+
+    assert stored == 2
+    assert stored_chunks == [["STU_1", "STU_1"]]
+    assert keys == {("STU_1", "LMS_INST_A", date(2026, 3, 2))}
+    assert [line_number for line_number, _ in line_errors] == [3]
@@ -1,7 +1,7 @@
 """API routes for student profiles and analytics"""
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import case, func, or_
 from typing import List
 
 from app.api.dependencies import get_db
@@ -9,6 +9,7 @@ from app.schemas import (
     StudentLearningProfileCreate,
     StudentLearningProfileUpdate,
     StudentLearningProfileResponse,
+    StudentProfileBulkRequest,
     StudentAnalytics
 )
 from app.models import (
@@ -21,6 +22,41 @@ from app.models import (
 router = APIRouter(prefix="/students", tags=["Students"])
 
 
+# A tracked day counts as active once the student logged in or spent over a minute.
+_ACTIVE_DAY = or_(
+    StudentBehaviorTracking.total_session_time > 60,
+    StudentBehaviorTracking.login_count > 0,
+)
+
+
+def _apply_profile_stats(
+    profile: StudentLearningProfile,
+    days_tracked: int,
+    days_with_activity: int,
+    total_recs: int,
+    completed_recs: int,
+) -> None:
+    """Refresh days_tracked and completion stats on a profile from raw counts."""
+    profile.days_tracked = days_tracked
+    profile.total_recommendations_received = total_recs
+    profile.total_resources_completed = completed_recs
+    rec_rate = (completed_recs / total_recs * 100.0) if total_recs > 0 else None
+
+    # Activity-based component: % of tracked days with meaningful activity so "working" moves the rate
+    activity_rate = None
+    if days_tracked > 0:
+        activity_rate = min(100.0, (days_with_activity / days_tracked) * 100.0)
+
+    if rec_rate is not None and activity_rate is not None:
+        profile.avg_completion_rate = round(0.5 * rec_rate + 0.5 * activity_rate, 1)
+    elif rec_rate is not None:
+        profile.avg_completion_rate = round(rec_rate, 1)
+    elif activity_rate is not None:
+        profile.avg_completion_rate = round(activity_rate, 1)
+    elif days_tracked > 0:
+        profile.avg_completion_rate = 50.0
+
+
 @router.post("/", response_model=StudentLearningProfileResponse, status_code=status.HTTP_201_CREATED)
 def create_student_profile(
     profile: StudentLearningProfileCreate,
@@ -66,44 +102,88 @@ def get_student_profile(
     days_tracked = db.query(func.count(StudentBehaviorTracking.behavior_id)).filter(
         StudentBehaviorTracking.student_id == student_id
     ).scalar() or 0
-    profile.days_tracked = days_tracked
-    
+
     # Refresh completion stats from recommendations
     recs = db.query(ResourceRecommendation).filter(
         ResourceRecommendation.student_id == student_id
     ).all()
     total_recs = len(recs)
     completed_recs = sum(1 for r in recs if r.completed)
-    profile.total_recommendations_received = total_recs
-    profile.total_resources_completed = completed_recs
-    rec_rate = (completed_recs / total_recs * 100.0) if total_recs > 0 else None
 
-    # Activity-based component: % of tracked days with meaningful activity so "working" moves the rate
-    activity_rate = None
+    days_with_activity = 0
     if days_tracked > 0:
         days_with_activity = db.query(func.count(StudentBehaviorTracking.behavior_id)).filter(
             StudentBehaviorTracking.student_id == student_id,
-            or_(
-                StudentBehaviorTracking.total_session_time > 60,
-                StudentBehaviorTracking.login_count > 0,
-            ),
+            _ACTIVE_DAY,
         ).scalar() or 0
-        activity_rate = min(100.0, (days_with_activity / days_tracked) * 100.0)
 
-    if rec_rate is not None and activity_rate is not None:
-        profile.avg_completion_rate = round(0.5 * rec_rate + 0.5 * activity_rate, 1)
-    elif rec_rate is not None:
-        profile.avg_completion_rate = round(rec_rate, 1)
-    elif activity_rate is not None:
-        profile.avg_completion_rate = round(activity_rate, 1)
-    elif days_tracked > 0:
-        profile.avg_completion_rate = 50.0
+    _apply_profile_stats(profile, days_tracked, days_with_activity, total_recs, completed_recs)
 
     db.commit()
     db.refresh(profile)
     return profile
 
 
+@router.post("/bulk", response_model=List[StudentLearningProfileResponse])
+def get_student_profiles_bulk(
+    request: StudentProfileBulkRequest,
+    db: Session = Depends(get_db)
+):
+    """Get many student profiles at once, refreshed the same way as GET /{student_id}.
+
+    Unknown student IDs are skipped rather than failing the whole request.
+    """
+    student_ids = list(dict.fromkeys(request.student_ids))
+    profiles = db.query(StudentLearningProfile).filter(
+        StudentLearningProfile.student_id.in_(student_ids)
+    ).all()
+    if not profiles:
+        return []
+
+    found_ids = [profile.student_id for profile in profiles]
+    behavior_counts = dict(
+        db.query(
+            StudentBehaviorTracking.student_id,
+            func.count(StudentBehaviorTracking.behavior_id),
+        ).filter(
+            StudentBehaviorTracking.student_id.in_(found_ids)
+        ).group_by(StudentBehaviorTracking.student_id).all()
+    )
+    active_counts = dict(
+        db.query(
+            StudentBehaviorTracking.student_id,
+            func.count(StudentBehaviorTracking.behavior_id),
+        ).filter(
+            StudentBehaviorTracking.student_id.in_(found_ids),
+            _ACTIVE_DAY,
+        ).group_by(StudentBehaviorTracking.student_id).all()
+    )
+    recommendation_counts = {
+        student_id: (total or 0, completed or 0)
+        for student_id, total, completed in db.query(
+            ResourceRecommendation.student_id,
+            func.count(ResourceRecommendation.recommendation_id),
+            func.sum(case((ResourceRecommendation.completed.is_(True), 1), else_=0)),
+        ).filter(
+            ResourceRecommendation.student_id.in_(found_ids)
+        ).group_by(ResourceRecommendation.student_id).all()
+    }
+
+    for profile in profiles:
+        total_recs, completed_recs = recommendation_counts.get(profile.student_id, (0, 0))
+        _apply_profile_stats(
+            profile,
+            behavior_counts.get(profile.student_id, 0),
+            active_counts.get(profile.student_id, 0),
+            int(total_recs),
+            int(completed_recs),
+        )
+
+    db.commit()
+    order = {student_id: index for index, student_id in enumerate(student_ids)}
+    return sorted(profiles, key=lambda profile: order[profile.student_id])
+
+
 @router.put("/{student_id}", response_model=StudentLearningProfileResponse)
 def update_student_profile(
     student_id: str,
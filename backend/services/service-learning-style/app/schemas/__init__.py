@@ -4,6 +4,7 @@ from app.schemas.learning_style import (
     StudentLearningProfileCreate,
     StudentLearningProfileUpdate,
     StudentLearningProfileResponse,
+    StudentProfileBulkRequest,
     LearningStylePrediction,
     
     # Resources
@@ -41,6 +42,7 @@ __all__ = [
     "StudentLearningProfileCreate",
     "StudentLearningProfileUpdate",
     "StudentLearningProfileResponse",
+    "StudentProfileBulkRequest",
     "LearningStylePrediction",
     
     # Resources
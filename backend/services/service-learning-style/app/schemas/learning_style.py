@@ -93,6 +93,10 @@ class StudentLearningProfileResponse(BaseModel):
         from_attributes = True
 
 
+class StudentProfileBulkRequest(BaseModel):
+    student_ids: List[str] = Field(..., min_length=1, max_length=500)
+
+
 class LearningStylePrediction(BaseModel):
     student_id: str
     predicted_style: LearningStyleEnum
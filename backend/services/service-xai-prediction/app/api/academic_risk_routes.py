@@ -2,16 +2,29 @@
 Academic Risk Prediction Routes
 """
 
+from itertools import groupby
+
 from app.api.dependencies import get_db, get_temp_students_db
+from app.core.database import AsyncSessionLocal, AsyncTempStudentsSessionLocal
 from app.core.logging import get_logger
+from app.core.pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    decode_datetime,
+    encode_cursor,
+)
 from app.models import (
+    AcademicRiskLatestRecord,
     AcademicRiskPredictionRecord,
     TemporaryStudentPredictionRecord,
     TemporaryStudentRecord,
 )
 from app.schemas.academic_risk import (
+    AcademicRiskBatchRequest,
+    AcademicRiskBatchResponse,
     AcademicRiskRequest,
     AcademicRiskResponse,
+    CounterfactualExplanation,
     RiskTimelinePoint,
     RiskTimelineResponse,
     StudentInsightsRequest,
@@ -22,10 +35,19 @@ from app.schemas.academic_risk import (
 )
 from app.schemas.student_lookup import ConnectedStudentSearchResponse, ConnectedStudentSummary
 from app.services.academic_risk_service import academic_risk_service
+from app.services.inference_executor import inference_executor
+from app.services.latest_predictions import (
+    academic_risk_summary,
+    temporary_student_summary,
+    upsert_latest_academic_risk,
+)
+from app.services.persistence_queue import PersistenceSink, persistence_queue
 from app.services.student_insights_service import student_insights_service
 from app.services.sync_service import SyncServiceError, sync_service
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import desc
+from sqlalchemy import desc, func, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 logger = get_logger(__name__)
@@ -47,69 +69,32 @@ TIMELINE_FIELDS = {
     status_code=status.HTTP_200_OK,
 )
 async def get_academic_risk_stats(
-    db: Session = Depends(get_db),
-    temp_db: Session = Depends(get_temp_students_db),
+    db: AsyncSession = Depends(get_db),
+    temp_db: AsyncSession = Depends(get_temp_students_db),
 ):
     """Return XAI academic-risk summary values for dashboard use."""
-    records = (
-        db.query(AcademicRiskPredictionRecord)
-        .order_by(desc(AcademicRiskPredictionRecord.created_at))
-        .all()
+    total_students, avg_grade, avg_risk_score, high_risk_students = await academic_risk_summary(
+        db
     )
 
-    latest_by_student: dict[str, AcademicRiskPredictionRecord] = {}
-    for record in records:
-        if record.student_id not in latest_by_student:
-            latest_by_student[record.student_id] = record
-
-    avg_grades: list[float] = []
-    avg_risk_scores: list[float] = []
-    high_risk_students = 0
-
-    for record in latest_by_student.values():
-        payload = record.request_payload if isinstance(record.request_payload, dict) else {}
-        avg_grade = payload.get("avg_grade")
-        if avg_grade is not None:
-            try:
-                avg_grades.append(float(avg_grade))
-            except (TypeError, ValueError):
-                pass
-
-        if record.risk_score is not None:
-            avg_risk_scores.append(float(record.risk_score))
-
-        if (record.risk_level or "").lower() in {"high", "at-risk", "at risk"}:
-            high_risk_students += 1
-
-    average_performance = (
-        round(sum(avg_grades) / len(avg_grades), 2) if avg_grades else None
-    )
-    average_risk_score = (
-        round(sum(avg_risk_scores) / len(avg_risk_scores), 4) if avg_risk_scores else None
-    )
+    average_performance = round(avg_grade, 2) if avg_grade is not None else None
+    average_risk_score = round(avg_risk_score, 4) if avg_risk_score is not None else None
 
     if average_performance is None:
-        temporary_records = temp_db.query(TemporaryStudentRecord).all()
-        temporary_avg_grades = [
-            float(record.avg_grade)
-            for record in temporary_records
-            if record.avg_grade is not None
-        ]
-        if temporary_avg_grades:
-            average_performance = round(
-                sum(temporary_avg_grades) / len(temporary_avg_grades), 2
-            )
-
-        if not latest_by_student:
-            latest_by_student = {record.student_id: record for record in temporary_records}
-            high_risk_students = sum(
-                1
-                for record in temporary_records
-                if (record.latest_risk_level or "").lower() in {"high", "at-risk", "at risk"}
-            )
+        (
+            temporary_students,
+            temporary_avg_grade,
+            temporary_high_risk,
+        ) = await temporary_student_summary(temp_db)
+        if temporary_avg_grade is not None:
+            average_performance = round(temporary_avg_grade, 2)
+
+        if not total_students:
+            total_students = temporary_students
+            high_risk_students = temporary_high_risk
 
     return {
-        "total_students_analyzed": len(latest_by_student),
+        "total_students_analyzed": total_students,
         "average_performance": average_performance,
         "average_risk_score": average_risk_score,
         "high_risk_students": high_risk_students,
@@ -125,7 +110,8 @@ async def search_connected_students(
     query: str = Query("", description="Student ID search term"),
     limit: int = Query(10, ge=1, le=50),
     institute_id: str = Query("LMS_INST_A"),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_db),
 ):
     """Search students available to the connected XAI flow."""
     try:
@@ -133,14 +119,27 @@ async def search_connected_students(
             query=query,
             limit=limit,
             institute_id=institute_id,
+            cursor=cursor,
         )
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
     except SyncServiceError as exc:
-        fallback = search_local_prediction_history(
-            db=db,
-            query=query,
-            limit=limit,
-            institute_id=institute_id,
-        )
+        try:
+            fallback = await search_local_prediction_history(
+                db=db,
+                query=query,
+                limit=limit,
+                institute_id=institute_id,
+                cursor=cursor,
+            )
+        except InvalidCursorError:
+            # An upstream cursor does not address local history; restart at page one.
+            fallback = await search_local_prediction_history(
+                db=db,
+                query=query,
+                limit=limit,
+                institute_id=institute_id,
+            )
         fallback_students = (
             fallback.students
             if hasattr(fallback, "students")
@@ -165,7 +164,7 @@ async def search_connected_students(
 async def get_connected_student_request(
     student_id: str,
     days: int = Query(14, ge=1, le=90),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Build the academic-risk request for a connected student."""
     try:
@@ -174,7 +173,7 @@ async def get_connected_student_request(
             days=days,
         )
     except SyncServiceError as exc:
-        fallback_request = get_local_prediction_request(
+        fallback_request = await get_local_prediction_request(
             db=db,
             student_id=student_id,
         )
@@ -199,8 +198,8 @@ async def get_student_risk_timeline(
         "auto",
         description="Timeline source: connected, temporary, or auto",
     ),
-    db: Session = Depends(get_db),
-    temp_db: Session = Depends(get_temp_students_db),
+    db: AsyncSession = Depends(get_db),
+    temp_db: AsyncSession = Depends(get_temp_students_db),
 ):
     """Return persisted XAI risk history for one student."""
     normalized_source = source.strip().lower()
@@ -223,7 +222,7 @@ async def get_student_risk_timeline(
                 student_id,
                 exc.detail,
             )
-        connected_timeline = _build_connected_timeline(db, student_id, limit)
+        connected_timeline = await _build_connected_timeline(db, student_id, limit)
         if connected_timeline is not None:
             return connected_timeline
         if normalized_source == "connected":
@@ -232,7 +231,7 @@ async def get_student_risk_timeline(
                 detail=f"No connected-student XAI timeline found for '{student_id}'",
             )
 
-    temporary_timeline = _build_temporary_timeline(temp_db, student_id, limit)
+    temporary_timeline = await _build_temporary_timeline(temp_db, student_id, limit)
     if temporary_timeline is not None:
         return temporary_timeline
 
@@ -249,8 +248,8 @@ async def get_student_risk_timeline(
 )
 async def get_student_insights(
     payload: StudentInsightsRequest,
-    db: Session = Depends(get_db),
-    temp_db: Session = Depends(get_temp_students_db),
+    db: AsyncSession = Depends(get_db),
+    temp_db: AsyncSession = Depends(get_temp_students_db),
 ):
     """Return integrated XAI insights for similar cases, interventions, and cohort context."""
     source = payload.source.strip().lower()
@@ -280,13 +279,18 @@ async def get_student_insights(
     status_code=status.HTTP_200_OK,
 )
 async def predict_academic_risk(
-    request: AcademicRiskRequest, db: Session = Depends(get_db)
+    request: AcademicRiskRequest,
+    include_counterfactual: bool = Query(
+        True,
+        description="Run the counterfactual search; it can also be fetched later on demand",
+    ),
 ):
     """
     Predict student academic dropout risk using OULAD model
 
     Args:
         request: Student academic performance features
+        include_counterfactual: Whether to compute the counterfactual explanation
 
     Returns:
         Risk prediction with personalized recommendations
@@ -294,18 +298,74 @@ async def predict_academic_risk(
     logger.info(f"Academic risk prediction request for student: {request.student_id}")
 
     # Make prediction
-    response = await academic_risk_service.predict(request)
+    response = await academic_risk_service.predict(
+        request,
+        include_counterfactual=include_counterfactual,
+    )
 
     logger.info(
         f"Prediction complete: {response.risk_level} "
         f"(confidence: {response.confidence:.2%}, risk_score: {response.risk_score:.2%})"
     )
 
-    persist_academic_risk_prediction(db=db, request=request, response=response)
+    await persist_academic_risk_prediction(request=request, response=response)
 
     return response
 
 
+@router.post(
+    "/academic-risk/predict/batch",
+    response_model=AcademicRiskBatchResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def predict_academic_risk_batch(
+    payload: AcademicRiskBatchRequest,
+    include_counterfactual: bool = Query(
+        False,
+        description="Run the counterfactual search for every student in the batch",
+    ),
+):
+    """
+    Predict academic dropout risk for many students with one model call.
+
+    Args:
+        payload: Student academic performance features, one entry per student
+        include_counterfactual: Whether to compute counterfactual explanations
+
+    Returns:
+        One risk prediction per request, in request order
+    """
+    logger.info("Batch academic risk prediction request for %d students", len(payload.requests))
+
+    responses = await academic_risk_service.predict_batch(
+        payload.requests,
+        include_counterfactual=include_counterfactual,
+    )
+
+    await persist_academic_risk_predictions(results=list(zip(payload.requests, responses)))
+
+    return AcademicRiskBatchResponse(total=len(responses), predictions=responses)
+
+
+@router.post(
+    "/academic-risk/{student_id}/counterfactual",
+    response_model=CounterfactualExplanation,
+    status_code=status.HTTP_200_OK,
+)
+async def get_academic_risk_counterfactual(
+    student_id: str,
+    request: AcademicRiskRequest,
+):
+    """Compute the counterfactual explanation for a prediction on demand."""
+    if request.student_id != student_id:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="student_id in the path and request body must match",
+        )
+
+    return await academic_risk_service.explain_counterfactual(request)
+
+
 @router.post(
     "/academic-risk/temporary-students/predict",
     response_model=AcademicRiskResponse,
@@ -313,7 +373,6 @@ async def predict_academic_risk(
 )
 async def predict_temporary_student_academic_risk(
     request: AcademicRiskRequest,
-    temp_db: Session = Depends(get_temp_students_db),
 ):
     """
     Predict academic risk for a temporary/manual student submission.
@@ -335,11 +394,7 @@ async def predict_temporary_student_academic_risk(
         response.risk_score * 100,
     )
 
-    persist_temporary_student_record(
-        db=temp_db,
-        request=request,
-        response=response,
-    )
+    await persist_temporary_student_record(request=request, response=response)
 
     return response
 
@@ -352,21 +407,34 @@ async def predict_temporary_student_academic_risk(
 async def list_temporary_students(
     query: str = Query("", description="Temporary student ID search term"),
     limit: int = Query(10, ge=1, le=50),
-    temp_db: Session = Depends(get_temp_students_db),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    temp_db: AsyncSession = Depends(get_temp_students_db),
 ):
     """List saved temporary-student records for the manual XAI flow."""
     search_term = query.strip()
-    records_query = temp_db.query(TemporaryStudentRecord).order_by(
+    statement = select(TemporaryStudentRecord).order_by(
         desc(TemporaryStudentRecord.updated_at),
-        desc(TemporaryStudentRecord.created_at),
+        desc(TemporaryStudentRecord.id),
     )
 
     if search_term:
-        records_query = records_query.filter(
-            TemporaryStudentRecord.student_id.ilike(f"%{search_term}%")
+        statement = statement.where(TemporaryStudentRecord.student_id.ilike(f"%{search_term}%"))
+    if cursor:
+        try:
+            updated_at, record_id = decode_cursor(cursor, 2)
+            after = (decode_datetime(updated_at), int(record_id))
+        except (InvalidCursorError, TypeError, ValueError) as exc:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="cursor is not valid"
+            ) from exc
+        statement = statement.where(
+            tuple_(TemporaryStudentRecord.updated_at, TemporaryStudentRecord.id) < after
         )
 
-    records = records_query.limit(limit).all()
+    # One extra row tells us whether another page exists.
+    records = (await temp_db.scalars(statement.limit(limit + 1))).all()
+    has_more = len(records) > limit
+    records = records[:limit]
 
     students = [
         TemporaryStudentSummary(
@@ -393,6 +461,9 @@ async def list_temporary_students(
         total=len(students),
         limit=limit,
         students=students,
+        next_cursor=(
+            encode_cursor(records[-1].updated_at, records[-1].id) if has_more else None
+        ),
     )
 
 
@@ -403,14 +474,14 @@ async def list_temporary_students(
 )
 async def get_temporary_student_record(
     student_id: str,
-    temp_db: Session = Depends(get_temp_students_db),
+    temp_db: AsyncSession = Depends(get_temp_students_db),
 ):
     """Return the saved form payload and prediction for a temporary student."""
-    record = (
-        temp_db.query(TemporaryStudentRecord)
-        .filter(TemporaryStudentRecord.student_id == student_id)
+    record = await temp_db.scalar(
+        select(TemporaryStudentRecord)
+        .where(TemporaryStudentRecord.student_id == student_id)
         .order_by(desc(TemporaryStudentRecord.updated_at))
-        .first()
+        .limit(1)
     )
 
     if record is None:
@@ -468,127 +539,202 @@ async def get_academic_risk_model_info():
         "classes": metadata.get("classes", []),
         "accuracy": accuracy,
         "description": "Binary classification model for predicting student dropout risk based on academic performance",
+        "model_version": academic_risk_service.model_version,
+        "inference_backend": (
+            "compiled" if academic_risk_service.compiled_model is not None else "xgboost"
+        ),
+        "prediction_cache": academic_risk_service.cache_stats(),
+        "inference_executor": inference_executor.stats(),
+        "coalescer": academic_risk_service.coalescer.stats(),
     }
 
 
-def persist_academic_risk_prediction(
-    db: Session, request: AcademicRiskRequest, response: AcademicRiskResponse
+def _write_academic_risk_predictions(
+    db: Session,
+    items: list[tuple[dict, AcademicRiskRequest, AcademicRiskResponse]],
 ) -> None:
-    """Persist academic risk output; failures are logged but do not block the API."""
-    try:
-        metrics = academic_risk_service.metadata.get("metrics")
-        if not metrics:
-            metrics = {"accuracy": academic_risk_service.metadata.get("accuracy")}
-
-        record = AcademicRiskPredictionRecord(
-            student_id=request.student_id,
-            request_payload=request.model_dump(mode="json"),
-            response_payload=response.model_dump(mode="json"),
-            model_metrics=metrics,
-            risk_level=response.risk_level,
-            risk_score=response.risk_score,
-            confidence=response.confidence,
-            model_version=str(academic_risk_service.metadata.get("version", "")) or None,
+    db.execute(insert(AcademicRiskPredictionRecord), [row for row, _, _ in items])
+    for model_version, group in groupby(items, key=lambda item: item[0]["model_version"]):
+        upsert_latest_academic_risk(
+            db, [(request, response) for _, request, response in group], model_version
         )
-        db.add(record)
-        db.commit()
-    except Exception as exc:
-        db.rollback()
-        logger.warning(f"Could not persist academic risk prediction record: {exc}")
 
 
-def persist_temporary_student_record(
-    db: Session,
-    request: AcademicRiskRequest,
-    response: AcademicRiskResponse,
+def _record_academic_risk_predictions(
+    items: list[tuple[dict, AcademicRiskRequest, AcademicRiskResponse]],
 ) -> None:
-    """Upsert manual temporary-student submissions into the dedicated temp DB."""
-    try:
-        history_record = TemporaryStudentPredictionRecord(
-            student_id=request.student_id,
-            request_payload=request.model_dump(mode="json"),
-            response_payload=response.model_dump(mode="json"),
-            risk_level=response.risk_level,
-            risk_score=response.risk_score,
-            confidence=response.confidence,
-        )
-        db.add(history_record)
+    for _, request, response in items:
+        student_insights_service.record_prediction("connected", request, response)
+
+
+ACADEMIC_RISK_SINK = PersistenceSink(
+    name="academic_risk",
+    session_factory=AsyncSessionLocal,
+    write=_write_academic_risk_predictions,
+    on_written=_record_academic_risk_predictions,
+)
+
+
+async def persist_academic_risk_prediction(
+    request: AcademicRiskRequest, response: AcademicRiskResponse
+) -> None:
+    """Queue academic risk output for persistence; failures are logged but do not block the API."""
+    await persist_academic_risk_predictions(results=[(request, response)])
 
-        record = (
-            db.query(TemporaryStudentRecord)
-            .filter(TemporaryStudentRecord.student_id == request.student_id)
-            .first()
-        )
 
-        if record is None:
-            record = TemporaryStudentRecord(
-                student_id=request.student_id,
-                avg_grade=request.avg_grade,
-                grade_consistency=request.grade_consistency,
-                grade_range=request.grade_range,
-                num_assessments=request.num_assessments,
-                assessment_completion_rate=request.assessment_completion_rate,
-                studied_credits=request.studied_credits,
-                num_of_prev_attempts=request.num_of_prev_attempts,
-                low_performance=request.low_performance,
-                low_engagement=request.low_engagement,
-                has_previous_attempts=request.has_previous_attempts,
-                request_payload=request.model_dump(mode="json"),
-                response_payload=response.model_dump(mode="json"),
-                latest_risk_level=response.risk_level,
-                latest_risk_score=response.risk_score,
-                latest_confidence=response.confidence,
+async def persist_academic_risk_predictions(
+    results: list[tuple[AcademicRiskRequest, AcademicRiskResponse]],
+) -> None:
+    """Queue many academic risk outputs for write-behind persistence."""
+    if not results:
+        return
+
+    metrics = academic_risk_service.metadata.get("metrics")
+    if not metrics:
+        metrics = {"accuracy": academic_risk_service.metadata.get("accuracy")}
+    model_version = str(academic_risk_service.metadata.get("version", "")) or None
+
+    await persistence_queue.submit_many(
+        ACADEMIC_RISK_SINK,
+        [
+            (
+                {
+                    "student_id": request.student_id,
+                    "request_payload": request.model_dump(mode="json"),
+                    "response_payload": response.model_dump(mode="json"),
+                    "model_metrics": metrics,
+                    "risk_level": response.risk_level,
+                    "risk_score": response.risk_score,
+                    "confidence": response.confidence,
+                    "model_version": model_version,
+                },
+                request,
+                response,
             )
-            db.add(record)
-        else:
-            record.avg_grade = request.avg_grade
-            record.grade_consistency = request.grade_consistency
-            record.grade_range = request.grade_range
-            record.num_assessments = request.num_assessments
-            record.assessment_completion_rate = request.assessment_completion_rate
-            record.studied_credits = request.studied_credits
-            record.num_of_prev_attempts = request.num_of_prev_attempts
-            record.low_performance = request.low_performance
-            record.low_engagement = request.low_engagement
-            record.has_previous_attempts = request.has_previous_attempts
-            record.request_payload = request.model_dump(mode="json")
-            record.response_payload = response.model_dump(mode="json")
-            record.latest_risk_level = response.risk_level
-            record.latest_risk_score = response.risk_score
-            record.latest_confidence = response.confidence
-
-        db.commit()
-    except Exception as exc:
-        db.rollback()
-        logger.warning("Could not persist temporary student record: %s", exc)
+            for request, response in results
+        ],
+    )
 
 
-def search_local_prediction_history(
+def _write_temporary_student_records(
     db: Session,
+    items: list[tuple[AcademicRiskRequest, AcademicRiskResponse]],
+) -> None:
+    db.execute(
+        insert(TemporaryStudentPredictionRecord),
+        [
+            {
+                "student_id": request.student_id,
+                "request_payload": request.model_dump(mode="json"),
+                "response_payload": response.model_dump(mode="json"),
+                "risk_level": response.risk_level,
+                "risk_score": response.risk_score,
+                "confidence": response.confidence,
+            }
+            for request, response in items
+        ],
+    )
+
+    # ON CONFLICT cannot touch the same row twice, so keep the last submission per student.
+    latest: dict[str, dict] = {}
+    for request, response in items:
+        latest[request.student_id] = {
+            "student_id": request.student_id,
+            "avg_grade": request.avg_grade,
+            "grade_consistency": request.grade_consistency,
+            "grade_range": request.grade_range,
+            "num_assessments": request.num_assessments,
+            "assessment_completion_rate": request.assessment_completion_rate,
+            "studied_credits": request.studied_credits,
+            "num_of_prev_attempts": request.num_of_prev_attempts,
+            "low_performance": request.low_performance,
+            "low_engagement": request.low_engagement,
+            "has_previous_attempts": request.has_previous_attempts,
+            "request_payload": request.model_dump(mode="json"),
+            "response_payload": response.model_dump(mode="json"),
+            "latest_risk_level": response.risk_level,
+            "latest_risk_score": response.risk_score,
+            "latest_confidence": response.confidence,
+        }
+
+    statement = pg_insert(TemporaryStudentRecord).values(list(latest.values()))
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[TemporaryStudentRecord.student_id],
+            set_={
+                **{
+                    column: statement.excluded[column]
+                    for column in next(iter(latest.values()))
+                    if column != "student_id"
+                },
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+def _record_temporary_student_records(
+    items: list[tuple[AcademicRiskRequest, AcademicRiskResponse]],
+) -> None:
+    for request, response in items:
+        student_insights_service.record_prediction("temporary", request, response)
+
+
+TEMPORARY_STUDENT_SINK = PersistenceSink(
+    name="temporary_student",
+    session_factory=AsyncTempStudentsSessionLocal,
+    write=_write_temporary_student_records,
+    on_written=_record_temporary_student_records,
+)
+
+
+async def persist_temporary_student_record(
+    request: AcademicRiskRequest,
+    response: AcademicRiskResponse,
+) -> None:
+    """Queue an upsert of a manual temporary-student submission into the temp DB."""
+    await persistence_queue.submit(TEMPORARY_STUDENT_SINK, (request, response))
+
+
+async def search_local_prediction_history(
+    db: AsyncSession,
     query: str,
     limit: int,
     institute_id: str,
+    cursor: str | None = None,
 ) -> ConnectedStudentSearchResponse:
-    """Fallback search using existing academic-risk prediction history."""
+    """Fallback search over the latest stored academic-risk prediction per student.
+
+    Pages are ordered newest first and resumed with a ``(predicted_at,
+    student_id)`` keyset cursor; the ``ilike`` filter is served by the
+    trigram index on ``student_id``.
+    """
     search_term = query.strip()
-    records_query = db.query(AcademicRiskPredictionRecord).order_by(
-        desc(AcademicRiskPredictionRecord.created_at)
+    statement = select(AcademicRiskLatestRecord).order_by(
+        desc(AcademicRiskLatestRecord.predicted_at),
+        desc(AcademicRiskLatestRecord.student_id),
     )
 
     if search_term:
-        records_query = records_query.filter(
-            AcademicRiskPredictionRecord.student_id.ilike(f"%{search_term}%")
+        statement = statement.where(
+            AcademicRiskLatestRecord.student_id.ilike(f"%{search_term}%")
+        )
+    if cursor:
+        predicted_at, student_id = decode_cursor(cursor, 2)
+        if not isinstance(student_id, str):
+            raise InvalidCursorError("cursor is not valid")
+        statement = statement.where(
+            tuple_(AcademicRiskLatestRecord.predicted_at, AcademicRiskLatestRecord.student_id)
+            < (decode_datetime(predicted_at), student_id)
         )
 
-    records = records_query.limit(max(limit * 10, 100)).all()
+    # One extra row tells us whether another page exists.
+    records = (await db.scalars(statement.limit(limit + 1))).all()
+    has_more = len(records) > limit
+    records = records[:limit]
 
-    seen: set[str] = set()
     students: list[ConnectedStudentSummary] = []
     for record in records:
-        if record.student_id in seen:
-            continue
-        seen.add(record.student_id)
-
         payload = record.request_payload if isinstance(record.request_payload, dict) else {}
         completion_rate = payload.get("assessment_completion_rate")
         if completion_rate is not None:
@@ -608,32 +754,32 @@ def search_local_prediction_history(
                 learning_style=None,
                 avg_completion_rate=completion_rate,
                 has_learning_profile=False,
-                last_updated=record.created_at.isoformat() if record.created_at else None,
+                last_updated=record.predicted_at.isoformat() if record.predicted_at else None,
             )
         )
 
-        if len(students) >= limit:
-            break
-
     return ConnectedStudentSearchResponse(
         query=query,
         total=len(students),
         limit=limit,
         institute_id=institute_id,
         students=students,
+        next_cursor=(
+            encode_cursor(records[-1].predicted_at, records[-1].student_id) if has_more else None
+        ),
     )
 
 
-def get_local_prediction_request(
-    db: Session,
+async def get_local_prediction_request(
+    db: AsyncSession,
     student_id: str,
 ) -> AcademicRiskRequest | None:
     """Fallback request builder from the latest stored academic-risk request payload."""
-    record = (
-        db.query(AcademicRiskPredictionRecord)
-        .filter(AcademicRiskPredictionRecord.student_id == student_id)
+    record = await db.scalar(
+        select(AcademicRiskPredictionRecord)
+        .where(AcademicRiskPredictionRecord.student_id == student_id)
         .order_by(desc(AcademicRiskPredictionRecord.created_at))
-        .first()
+        .limit(1)
     )
 
     if record is None or not isinstance(record.request_payload, dict):
@@ -645,18 +791,19 @@ def get_local_prediction_request(
         return None
 
 
-def _build_connected_timeline(
-    db: Session,
+async def _build_connected_timeline(
+    db: AsyncSession,
     student_id: str,
     limit: int,
 ) -> RiskTimelineResponse | None:
     records = (
-        db.query(AcademicRiskPredictionRecord)
-        .filter(AcademicRiskPredictionRecord.student_id == student_id)
-        .order_by(desc(AcademicRiskPredictionRecord.created_at))
-        .limit(limit)
-        .all()
-    )
+        await db.scalars(
+            select(AcademicRiskPredictionRecord)
+            .where(AcademicRiskPredictionRecord.student_id == student_id)
+            .order_by(desc(AcademicRiskPredictionRecord.created_at))
+            .limit(limit)
+        )
+    ).all()
 
     if not records:
         return None
@@ -674,18 +821,19 @@ def _build_connected_timeline(
     )
 
 
-def _build_temporary_timeline(
-    temp_db: Session,
+async def _build_temporary_timeline(
+    temp_db: AsyncSession,
     student_id: str,
     limit: int,
 ) -> RiskTimelineResponse | None:
     history_records = (
-        temp_db.query(TemporaryStudentPredictionRecord)
-        .filter(TemporaryStudentPredictionRecord.student_id == student_id)
-        .order_by(desc(TemporaryStudentPredictionRecord.created_at))
-        .limit(limit)
-        .all()
-    )
+        await temp_db.scalars(
+            select(TemporaryStudentPredictionRecord)
+            .where(TemporaryStudentPredictionRecord.student_id == student_id)
+            .order_by(desc(TemporaryStudentPredictionRecord.created_at))
+            .limit(limit)
+        )
+    ).all()
 
     if history_records:
         points = _build_timeline_points(history_records)
@@ -700,14 +848,14 @@ def _build_temporary_timeline(
             points=points,
         )
 
-    temporary_record = (
-        temp_db.query(TemporaryStudentRecord)
-        .filter(TemporaryStudentRecord.student_id == student_id)
+    temporary_record = await temp_db.scalar(
+        select(TemporaryStudentRecord)
+        .where(TemporaryStudentRecord.student_id == student_id)
         .order_by(
             desc(TemporaryStudentRecord.updated_at),
             desc(TemporaryStudentRecord.created_at),
         )
-        .first()
+        .limit(1)
     )
 
     if temporary_record is None:
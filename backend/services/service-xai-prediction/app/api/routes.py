@@ -1,5 +1,5 @@
-from app.api.dependencies import get_db
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 from app.core.logging import get_logger
 from app.models import XAIPredictionRecord
 from app.schemas import (
@@ -9,8 +9,10 @@ from app.schemas import (
     PredictionResponse,
 )
 from app.services.ml_service import ml_service
+from app.services.persistence_queue import PersistenceSink, persistence_queue
 from app.services.sync_service import SyncServiceError, sync_service
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, HTTPException, Query, status
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 logger = get_logger(__name__)
@@ -31,9 +33,7 @@ async def health_check():
 @router.post(
     "/predict", response_model=PredictionResponse, status_code=status.HTTP_200_OK
 )
-async def predict_student_outcome(
-    request: PredictionRequest, db: Session = Depends(get_db)
-):
+async def predict_student_outcome(request: PredictionRequest):
     """
     Predict student academic outcome with explainable AI
 
@@ -65,7 +65,7 @@ async def predict_student_outcome(
         f"(probability: {prediction.probability:.2%}, risk: {prediction.risk_level})"
     )
 
-    persist_prediction(db=db, request=request, response=response)
+    await persist_prediction(request=request, response=response)
 
     return response
 
@@ -77,7 +77,6 @@ async def predict_student_outcome(
 )
 async def sync_and_predict_student_outcome(
     student_id: str,
-    db: Session = Depends(get_db),
     days: int = Query(
         14,
         ge=1,
@@ -110,7 +109,7 @@ async def sync_and_predict_student_outcome(
         recommendations=recommendations,
     )
 
-    persist_prediction(db=db, request=request, response=response)
+    await persist_prediction(request=request, response=response)
 
     return response
 
@@ -127,29 +126,35 @@ async def get_model_info():
     )
 
 
-def persist_prediction(
-    db: Session, request: PredictionRequest, response: PredictionResponse
-) -> None:
-    """Persist prediction output; failures are logged but do not block the API."""
-    try:
-        metrics = ml_service.metadata.get("metrics")
-        if not metrics:
-            metrics = {"accuracy": ml_service.metadata.get("accuracy")}
-
-        record = XAIPredictionRecord(
-            student_id=request.student_id,
-            request_payload=request.model_dump(mode="json"),
-            prediction_payload=response.prediction.model_dump(mode="json"),
-            explanation_payload=response.explanation.model_dump(mode="json"),
-            recommendations=response.recommendations,
-            model_metrics=metrics,
-            predicted_class=response.prediction.predicted_class,
-            probability=response.prediction.probability,
-            risk_level=response.prediction.risk_level,
-            model_version=str(ml_service.metadata.get("version", "")) or None,
-        )
-        db.add(record)
-        db.commit()
-    except Exception as exc:
-        db.rollback()
-        logger.warning(f"Could not persist XAI prediction record: {exc}")
+def _write_predictions(db: Session, rows: list[dict]) -> None:
+    db.execute(insert(XAIPredictionRecord), rows)
+
+
+PREDICTION_SINK = PersistenceSink(
+    name="xai_prediction",
+    session_factory=AsyncSessionLocal,
+    write=_write_predictions,
+)
+
+
+async def persist_prediction(request: PredictionRequest, response: PredictionResponse) -> None:
+    """Queue prediction output for write-behind persistence; failures are logged only."""
+    metrics = ml_service.metadata.get("metrics")
+    if not metrics:
+        metrics = {"accuracy": ml_service.metadata.get("accuracy")}
+
+    await persistence_queue.submit(
+        PREDICTION_SINK,
+        {
+            "student_id": request.student_id,
+            "request_payload": request.model_dump(mode="json"),
+            "prediction_payload": response.prediction.model_dump(mode="json"),
+            "explanation_payload": response.explanation.model_dump(mode="json"),
+            "recommendations": response.recommendations,
+            "model_metrics": metrics,
+            "predicted_class": response.prediction.predicted_class,
+            "probability": response.prediction.probability,
+            "risk_level": response.prediction.risk_level,
+            "model_version": str(ml_service.metadata.get("version", "")) or None,
+        },
+    )
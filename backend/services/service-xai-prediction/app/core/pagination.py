@@ -0,0 +1,40 @@
+"""Opaque cursors for keyset-paginated list endpoints."""
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor this service did not issue."""
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last returned row as an opaque cursor."""
+    payload = [
+        value.isoformat() if isinstance(value, datetime) else value for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[Any]:
+    """Decode a cursor produced by ``encode_cursor`` with ``size`` key values."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursorError("cursor is not valid") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError("cursor is not valid")
+    return values
+
+
+def decode_datetime(value: Any) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError) as exc:
+        raise InvalidCursorError("cursor is not valid") from exc
@@ -20,9 +20,12 @@ from app.core.config import settings
 from app.core.database import (
     Base,
     TempStudentsBase,
+    dispose_async_engines,
     engine,
     ensure_database_exists,
+    ensure_indexes,
     ensure_temp_students_database_exists,
+    ensure_trigram_extension,
     temp_students_engine,
 )
 from app.core.logging import get_logger, setup_logging
@@ -59,10 +62,24 @@ async def lifespan(app: FastAPI):
         logger.info(f"Temporary students database ready: {temp_database_name}")
         Base.metadata.create_all(bind=engine)
         TempStudentsBase.metadata.create_all(bind=temp_students_engine)
+        from app.services.latest_predictions import ensure_latest_academic_risk_projection
+
+        ensure_latest_academic_risk_projection(engine)
         logger.info("Database tables initialized for XAI service")
     except Exception as e:
         logger.warning(f"Database initialization skipped: {e}")
 
+    # Search indexes are optional: without pg_trgm, student-ID search is an unindexed ILIKE.
+    for bind, base in ((engine, Base), (temp_students_engine, TempStudentsBase)):
+        try:
+            ensure_trigram_extension(bind)
+        except Exception as e:
+            logger.warning(f"pg_trgm unavailable; student search runs unindexed: {e}")
+        try:
+            ensure_indexes(bind, base)
+        except Exception as e:
+            logger.warning(f"Index creation skipped: {e}")
+
     # Verify model loading
     try:
         from app.services.ml_service import ml_service
@@ -75,12 +92,28 @@ async def lifespan(app: FastAPI):
         logger.error(f"Startup failed: {str(e)}")
         raise
 
+    from app.services.http_client import upstream_http_client
+
+    await upstream_http_client.start()
+
+    from app.services.persistence_queue import persistence_queue
+
+    persistence_queue.start()
+
     logger.info("Service ready!")
 
     yield
 
     logger.info(f"Shutting down {settings.SERVICE_NAME}")
 
+    await persistence_queue.stop(timeout=settings.PERSISTENCE_DRAIN_TIMEOUT_SECONDS)
+
+    from app.services.inference_executor import inference_executor
+
+    inference_executor.shutdown()
+    await upstream_http_client.close()
+    await dispose_async_engines()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -120,13 +153,31 @@ app.include_router(academic_risk_routes.router, prefix=settings.API_PREFIX)
 # Health Check (without prefix for Docker/Infrastructure)
 @app.get("/health", tags=["health"])
 async def health_check():
+    from app.services.http_client import upstream_http_client
+    from app.services.inference_executor import inference_executor
     from app.services.ml_service import ml_service
+    from app.services.persistence_queue import persistence_queue
+    from app.services.student_insights_service import student_insights_service
+    from app.services.sync_service import sync_service
 
     return {
         "status": "healthy",
         "service": settings.SERVICE_NAME,
         "version": settings.VERSION,
         "model_loaded": ml_service.model is not None,
+        "inference_executor": inference_executor.stats(),
+        "upstream_http": upstream_http_client.stats(),
+        "upstream_cache": sync_service.cache.stats(),
+        "similarity_index": {
+            ":".join(filter(None, cohort_key)): index.stats()
+            for cohort_key, index in student_insights_service.similarity_indexes.items()
+        },
+        "cohort_stats": {
+            ":".join(filter(None, cohort_key)): cohort.stats()
+            for cohort_key, cohort in student_insights_service.cohort_stats.items()
+        },
+        "insights_cache": student_insights_service.insights_cache.stats(),
+        "persistence_queue": persistence_queue.stats(),
     }
 
 
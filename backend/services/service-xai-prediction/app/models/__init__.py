@@ -1,6 +1,7 @@
 """Model exports for the XAI service."""
 
 from app.models.prediction_records import (
+    AcademicRiskLatestRecord,
     AcademicRiskPredictionRecord,
     TemporaryStudentPredictionRecord,
     TemporaryStudentRecord,
@@ -10,6 +11,7 @@ from app.models.prediction_records import (
 __all__ = [
     "XAIPredictionRecord",
     "AcademicRiskPredictionRecord",
+    "AcademicRiskLatestRecord",
     "TemporaryStudentRecord",
     "TemporaryStudentPredictionRecord",
 ]
@@ -1,10 +1,10 @@
 """SQLAlchemy models for XAI prediction persistence."""
 
-from sqlalchemy import Column, DateTime, Float, Integer, String
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 
-from app.core.database import Base, TempStudentsBase
+from app.core.database import Base, TempStudentsBase, trigram_extension_installed
 
 
 class XAIPredictionRecord(Base):
@@ -33,6 +33,13 @@ class AcademicRiskPredictionRecord(Base):
     """Persist academic risk prediction requests/responses."""
 
     __tablename__ = "xai_academic_risk_prediction_records"
+    __table_args__ = (
+        Index(
+            "ix_xai_academic_risk_prediction_records_student_created",
+            "student_id",
+            "created_at",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     student_id = Column(String(64), nullable=False, index=True)
@@ -49,10 +56,49 @@ class AcademicRiskPredictionRecord(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
 
+class AcademicRiskLatestRecord(Base):
+    """Latest academic risk prediction per student, upserted alongside the history."""
+
+    __tablename__ = "xai_academic_risk_latest"
+    __table_args__ = (
+        Index("ix_xai_academic_risk_latest_predicted_student", "predicted_at", "student_id"),
+        # Substring search on student IDs; skipped where pg_trgm is unavailable
+        Index(
+            "ix_xai_academic_risk_latest_student_trgm",
+            "student_id",
+            postgresql_using="gin",
+            postgresql_ops={"student_id": "gin_trgm_ops"},
+        ).ddl_if(callable_=trigram_extension_installed),
+    )
+
+    student_id = Column(String(64), primary_key=True)
+
+    avg_grade = Column(Float, nullable=True)
+    request_payload = Column(JSONB, nullable=False)
+    response_payload = Column(JSONB, nullable=False)
+
+    risk_level = Column(String(32), nullable=False, index=True)
+    risk_score = Column(Float, nullable=False)
+    confidence = Column(Float, nullable=False)
+    model_version = Column(String(64), nullable=True)
+
+    predicted_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
 class TemporaryStudentRecord(TempStudentsBase):
     """Persist manual temporary-student submissions separately from connected students."""
 
     __tablename__ = "temporary_students"
+    __table_args__ = (
+        Index("ix_temporary_students_updated_id", "updated_at", "id"),
+        # Substring search on student IDs; skipped where pg_trgm is unavailable
+        Index(
+            "ix_temporary_students_student_trgm",
+            "student_id",
+            postgresql_using="gin",
+            postgresql_ops={"student_id": "gin_trgm_ops"},
+        ).ddl_if(callable_=trigram_extension_installed),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     student_id = Column(String(64), nullable=False, unique=True, index=True)
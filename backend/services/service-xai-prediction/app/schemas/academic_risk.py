@@ -131,6 +131,24 @@ class CounterfactualExplanation(BaseModel):
     changes: List[CounterfactualChange] = Field(default_factory=list)
 
 
+class AcademicRiskBatchRequest(BaseModel):
+    """Request schema for scoring many students in one call."""
+
+    requests: List[AcademicRiskRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=1000,
+        description="Student feature payloads to score together",
+    )
+
+
+class AcademicRiskBatchResponse(BaseModel):
+    """Response schema for batch academic risk prediction."""
+
+    total: int = Field(..., ge=0)
+    predictions: List[AcademicRiskResponse] = Field(default_factory=list)
+
+
 class TemporaryStudentSummary(BaseModel):
     """Summary view for saved temporary-student records."""
 
@@ -149,6 +167,9 @@ class TemporaryStudentListResponse(BaseModel):
     total: int
     limit: int
     students: List[TemporaryStudentSummary]
+    next_cursor: Optional[str] = Field(
+        default=None, description="Pass back as ``cursor`` to fetch the next page"
+    )
 
 
 class TemporaryStudentRecordResponse(BaseModel):
@@ -335,6 +356,7 @@ class StudentInsightsResponse(BaseModel):
     fairness_evaluation: Optional[FairnessEvaluation] = None
     explanation_stability: Optional[ExplanationStabilityEvaluation] = None
     case_outcome_explorer: Optional[CaseOutcomeExplorer] = None
+    degraded_sections: List[str] = Field(default_factory=list)
 
 
 AcademicRiskResponse.model_rebuild()
@@ -28,3 +28,6 @@ class ConnectedStudentSearchResponse(BaseModel):
     limit: int = 0
     institute_id: str
     students: List[ConnectedStudentSummary] = Field(default_factory=list)
+    next_cursor: Optional[str] = Field(
+        default=None, description="Pass back as ``cursor`` to fetch the next page"
+    )
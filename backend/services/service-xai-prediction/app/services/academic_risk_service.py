@@ -1,21 +1,52 @@
+import asyncio
 import json
 import logging
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, List, Tuple
 
 import numpy as np
 import xgboost as xgb
+from app.core.cache import LRUTTLCache
+from app.core.config import settings
 from app.schemas.academic_risk import (
     AcademicRiskRequest,
     AcademicRiskResponse,
     CounterfactualChange,
     CounterfactualExplanation,
 )
+from app.services.inference_executor import inference_executor
+from app.services.prediction_coalescer import PredictionCoalescer
+from app.services.tree_ensemble import CompiledTreeEnsemble, UnsupportedModelError
 
 logger = logging.getLogger(__name__)
 
 RISK_LEVELS = ["Safe", "Medium Risk", "At-Risk"]
 RISK_LEVEL_RANK = {level: index for index, level in enumerate(RISK_LEVELS)}
+COUNTERFACTUAL_MAX_STEPS = 8
+
+
+@dataclass
+class _CounterfactualState:
+    """One partial path explored by the counterfactual search."""
+
+    request: AcademicRiskRequest
+    outcome: str
+    score: float
+    confidence: float
+    changes: dict[str, tuple[Any, str]]
+
+
+@dataclass(frozen=True)
+class _ModelSnapshot:
+    """The model attributes one scoring batch runs against."""
+
+    model: xgb.Booster | None
+    compiled_model: CompiledTreeEnsemble | None
+    feature_names: list[str] | None
+    namespace: str
 
 
 class AcademicRiskService:
@@ -23,60 +54,187 @@ class AcademicRiskService:
 
     def __init__(self):
         self.model = None
+        self.compiled_model: CompiledTreeEnsemble | None = None
         self.metadata = None
         self.feature_names = None
+        self.model_dir = Path(__file__).parent.parent.parent / "saved_models"
+        self.model_version = "demo"
+        self._model_file_signature: tuple[int, int] | None = None
+        # Guards swapping the model attributes against scoring threads reading them
+        self._model_lock = threading.Lock()
+        self._last_model_check = time.monotonic()
+        self._model_refresh: asyncio.Task | None = None
+        self.prediction_cache = LRUTTLCache(
+            max_entries=settings.PREDICTION_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.PREDICTION_CACHE_TTL_SECONDS,
+        )
+        self.coalescer = PredictionCoalescer(
+            self._run_coalesced_batch,
+            window_seconds=settings.PREDICTION_COALESCE_WINDOW_MS / 1000,
+            max_batch_size=settings.PREDICTION_COALESCE_MAX_BATCH,
+        )
         self._load_model()
 
     def _load_model(self):
-        """Load the trained OULAD academic risk model"""
-        try:
-            # Path to saved models
-            base_path = Path(__file__).parent.parent.parent / "saved_models"
+        """Load the trained OULAD academic risk model.
 
-            logger.info(f"Loading OULAD model from: {base_path}")
+        The booster, compiled ensemble and metadata are built first and then
+        swapped in together under ``_model_lock``, so scoring threads never see
+        a half-loaded model.
+        """
+        signature = self._read_model_file_signature()
+        try:
+            loaded = self._read_model_files(signature)
+        except Exception as e:
+            logger.error(f"Error loading OULAD model: {str(e)}")
+            logger.info("Falling back to demo mode")
+            loaded = None
 
-            if not base_path.exists():
-                logger.warning(f"Model directory not found: {base_path}")
-                logger.info("Academic risk service will run in demo mode")
+        with self._model_lock:
+            # Cached scores belong to the previous model, whatever happened above.
+            self.prediction_cache.clear()
+            self._model_file_signature = signature
+            if loaded is None:
                 self._setup_demo_mode()
                 return
+            (
+                self.model,
+                self.compiled_model,
+                self.metadata,
+                self.feature_names,
+                self.model_version,
+            ) = loaded
+
+    def _read_model_files(self, signature: tuple[int, int] | None) -> tuple | None:
+        """Read the booster and its metadata, or return None to run in demo mode."""
+        # Path to saved models
+        base_path = self.model_dir
+
+        logger.info(f"Loading OULAD model from: {base_path}")
+
+        if not base_path.exists():
+            logger.warning(f"Model directory not found: {base_path}")
+            logger.info("Academic risk service will run in demo mode")
+            return None
+
+        # Load XGBoost model using Booster API
+        model_path = base_path / "academic_risk_model.json"
+        if not model_path.exists():
+            logger.warning(f"Model file not found: {model_path}")
+            return None
+
+        # Load as Booster (raw model)
+        model = xgb.Booster()
+        model.load_model(str(model_path))
+        logger.info("✓ OULAD model loaded successfully")
+        model_version = "demo"
+        if signature is not None:
+            mtime_ns, size = signature
+            model_version = f"{mtime_ns:x}-{size:x}"
+
+        compiled_model = self._compile_model(model, model_path)
+
+        # Load metadata
+        metadata_path = base_path / "model_metadata.json"
+        if metadata_path.exists():
+            with open(metadata_path, "r") as f:
+                metadata = json.load(f)
+            feature_names = metadata.get("feature_names", self._get_default_features())
+            accuracy = metadata.get("metrics", {}).get("accuracy", 0)
+            if not accuracy:
+                accuracy = metadata.get("accuracy", 0)
+            logger.info(f"✓ Loaded {len(feature_names)} features")
+            logger.info(f"✓ Model accuracy: {accuracy*100:.1f}%")
+        else:
+            feature_names = self._get_default_features()
+            metadata = {
+                "model_type": "XGBoost",
+                "feature_names": feature_names,
+            }
 
-            # Load XGBoost model using Booster API
-            model_path = base_path / "academic_risk_model.json"
-            if not model_path.exists():
-                logger.warning(f"Model file not found: {model_path}")
-                self._setup_demo_mode()
-                return
+        return model, compiled_model, metadata, feature_names, model_version
 
-            # Load as Booster (raw model)
-            self.model = xgb.Booster()
-            self.model.load_model(str(model_path))
-            logger.info("✓ OULAD model loaded successfully")
-
-            # Load metadata
-            metadata_path = base_path / "model_metadata.json"
-            if metadata_path.exists():
-                with open(metadata_path, "r") as f:
-                    self.metadata = json.load(f)
-                self.feature_names = self.metadata.get(
-                    "feature_names", self._get_default_features()
-                )
-                accuracy = self.metadata.get("metrics", {}).get("accuracy", 0)
-                if not accuracy:
-                    accuracy = self.metadata.get("accuracy", 0)
-                logger.info(f"✓ Loaded {len(self.feature_names)} features")
-                logger.info(f"✓ Model accuracy: {accuracy*100:.1f}%")
-            else:
-                self.feature_names = self._get_default_features()
-                self.metadata = {
-                    "model_type": "XGBoost",
-                    "feature_names": self.feature_names,
-                }
+    def _compile_model(
+        self, model: xgb.Booster, model_path: Path
+    ) -> CompiledTreeEnsemble | None:
+        """Build the NumPy fast path, keeping it only if it reproduces the booster."""
+        if settings.ACADEMIC_RISK_INFERENCE_BACKEND != "compiled":
+            return None
 
-        except Exception as e:
-            logger.error(f"Error loading OULAD model: {str(e)}")
-            logger.info("Falling back to demo mode")
-            self._setup_demo_mode()
+        try:
+            compiled = CompiledTreeEnsemble.from_file(model_path)
+            error = compiled.max_abs_error(model, compiled.validation_rows())
+        except (UnsupportedModelError, KeyError, ValueError) as exc:
+            logger.warning(f"Compiled inference unavailable, using XGBoost: {exc}")
+            return None
+
+        if error > settings.COMPILED_MODEL_TOLERANCE:
+            logger.warning(
+                f"Compiled inference differs from XGBoost by {error:.2e}; using XGBoost"
+            )
+            return None
+
+        logger.info(f"✓ Compiled tree ensemble validated (max error {error:.1e})")
+        return compiled
+
+    def _read_model_file_signature(self) -> tuple[int, int] | None:
+        try:
+            stat = (self.model_dir / "academic_risk_model.json").stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh_model_if_changed(self) -> None:
+        """Reload the model when the file in ``saved_models/`` has been replaced."""
+        if self._read_model_file_signature() != self._model_file_signature:
+            logger.info("Academic risk model file changed; reloading")
+            self._load_model()
+
+    def _schedule_model_refresh(self) -> None:
+        """Check the model file in the background, at most once per interval.
+
+        Loading and compiling a booster takes far longer than a request, so
+        it runs in a worker thread; requests keep scoring with the current
+        snapshot until ``_load_model`` swaps the new one in.
+        """
+        interval = settings.MODEL_RELOAD_CHECK_SECONDS
+        now = time.monotonic()
+        if interval <= 0 or now - self._last_model_check < interval:
+            return
+        if self._model_refresh is not None and not self._model_refresh.done():
+            return
+
+        self._last_model_check = now
+        self._model_refresh = asyncio.get_running_loop().create_task(
+            self._refresh_model_in_background()
+        )
+
+    async def _refresh_model_in_background(self) -> None:
+        try:
+            await asyncio.to_thread(self._refresh_model_if_changed)
+        except Exception as exc:
+            logger.error(f"Academic risk model refresh failed: {exc}")
+
+    def reload_model(self) -> None:
+        """Reload the model from disk and drop every cached prediction."""
+        self._last_model_check = time.monotonic()
+        self._load_model()
+
+    def cache_stats(self) -> dict[str, Any]:
+        return {"model_version": self.model_version, **self.prediction_cache.stats()}
+
+    def _cache_namespace(self) -> str:
+        # Tests and demo fallbacks can swap the model out; never share their entries.
+        return self.model_version if self.model is not None else "demo"
+
+    def _model_snapshot(self) -> _ModelSnapshot:
+        with self._model_lock:
+            return _ModelSnapshot(
+                model=self.model,
+                compiled_model=self.compiled_model,
+                feature_names=self.feature_names,
+                namespace=self._cache_namespace(),
+            )
 
     def _get_default_features(self) -> List[str]:
         """Get default feature names"""
@@ -96,6 +254,8 @@ class AcademicRiskService:
     def _setup_demo_mode(self):
         """Setup demo mode without a real model"""
         self.model = None
+        self.compiled_model = None
+        self.model_version = "demo"
         self.feature_names = self._get_default_features()
         self.metadata = {
             "model_type": "Demo Mode",
@@ -104,26 +264,35 @@ class AcademicRiskService:
         }
         logger.info("Running academic risk service in demo mode")
 
+    @staticmethod
+    def _feature_row(request: AcademicRiskRequest) -> list[float]:
+        """Return the model feature values for one request in training order."""
+        return [
+            request.avg_grade,
+            request.grade_consistency,
+            request.grade_range,
+            request.num_assessments,
+            request.assessment_completion_rate,
+            request.studied_credits,
+            request.num_of_prev_attempts,
+            request.low_performance,
+            request.low_engagement,
+            request.has_previous_attempts,
+        ]
+
+    def _prepare_feature_matrix(self, requests: List[AcademicRiskRequest]) -> np.ndarray:
+        """Stack the feature rows of many requests into one (n, features) matrix."""
+        return np.array(
+            [self._feature_row(request) for request in requests],
+            dtype=np.float32,
+        ).reshape(len(requests), -1)
+
     def _prepare_features(self, request: AcademicRiskRequest) -> xgb.DMatrix:
         """Prepare features as DMatrix for XGBoost Booster"""
-        features = np.array(
-            [
-                [
-                    request.avg_grade,
-                    request.grade_consistency,
-                    request.grade_range,
-                    request.num_assessments,
-                    request.assessment_completion_rate,
-                    request.studied_credits,
-                    request.num_of_prev_attempts,
-                    request.low_performance,
-                    request.low_engagement,
-                    request.has_previous_attempts,
-                ]
-            ]
-        )
         # Create DMatrix with feature names
-        return xgb.DMatrix(features, feature_names=self.feature_names)
+        return xgb.DMatrix(
+            self._prepare_feature_matrix([request]), feature_names=self.feature_names
+        )
 
     def _generate_recommendations(
         self, request: AcademicRiskRequest, prediction: int, risk_score: float
@@ -383,23 +552,72 @@ class AcademicRiskService:
 
         return factors[:5]  # Top 5 factors
 
+    def _run_prediction_batch(
+        self, requests: List[AcademicRiskRequest]
+    ) -> List[Tuple[int, np.ndarray]]:
+        """Score many requests with a single model call.
+
+        Returns one ``(predicted class index, class probabilities)`` pair per
+        request, in the same order as ``requests``.
+        """
+        if not requests:
+            return []
+
+        # One snapshot per batch, so a reload mid-batch cannot mix two models.
+        snapshot = self._model_snapshot()
+        # Content-addressed cache: identical feature vectors score identically.
+        keys = [("score", snapshot.namespace, tuple(self._feature_row(request))) for request in requests]
+        results: list[Tuple[int, np.ndarray] | None] = [
+            self.prediction_cache.get(key) for key in keys
+        ]
+        missing = [index for index, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+
+        scored = self._score_uncached([requests[index] for index in missing], snapshot)
+        for index, result in zip(missing, scored):
+            self.prediction_cache.set(keys[index], result)
+            results[index] = result
+        return results
+
+    def _score_uncached(
+        self, requests: List[AcademicRiskRequest], snapshot: _ModelSnapshot
+    ) -> List[Tuple[int, np.ndarray]]:
+        if snapshot.model is None:
+            return [self._demo_predict(request) for request in requests]
+
+        features = self._prepare_feature_matrix(requests)
+        if snapshot.compiled_model is not None:
+            raw_predictions = snapshot.compiled_model.predict(features)
+        else:
+            raw_predictions = np.asarray(
+                snapshot.model.predict(
+                    xgb.DMatrix(features, feature_names=snapshot.feature_names)
+                )
+            )
+
+        if raw_predictions.ndim == 2 and raw_predictions.shape[1] == 3:
+            probabilities = raw_predictions.astype(float)
+            predictions = np.argmax(probabilities, axis=1)
+            return [
+                (int(prediction), row)
+                for prediction, row in zip(predictions, probabilities)
+            ]
+
+        prob_at_risk = np.clip(raw_predictions.reshape(-1).astype(float), 0.0, 1.0)
+        return [
+            (1 if prob > 0.5 else 0, np.array([1.0 - prob, prob]))
+            for prob in prob_at_risk
+        ]
+
     def _run_prediction_model_or_demo(
         self, request: AcademicRiskRequest
     ) -> Tuple[int, np.ndarray]:
         """Return the predicted class index and raw class probabilities."""
+        prediction, probabilities = self._run_prediction_batch([request])[0]
+
         if self.model is not None:
-            dmatrix = self._prepare_features(request)
-            raw_predictions = self.model.predict(dmatrix)
-
-            if len(raw_predictions[0]) == 3:
-                probabilities = np.array(
-                    [
-                        float(raw_predictions[0][0]),
-                        float(raw_predictions[0][1]),
-                        float(raw_predictions[0][2]),
-                    ]
-                )
-                prediction = int(np.argmax(probabilities))
+            if len(probabilities) == 3:
                 logger.info(
                     "Model prediction (multi-class) - Student: %s, Prob Safe: %.4f, "
                     "Prob Medium: %.4f, Prob At-Risk: %.4f, Predicted: %s",
@@ -409,21 +627,15 @@ class AcademicRiskService:
                     probabilities[2],
                     prediction,
                 )
-                return prediction, probabilities
-
-            prob_at_risk = float(raw_predictions[0])
-            prob_at_risk = max(0.0, min(1.0, prob_at_risk))
-            probabilities = np.array([1.0 - prob_at_risk, prob_at_risk])
-            prediction = 1 if prob_at_risk > 0.5 else 0
-            logger.info(
-                "Model prediction (binary) - Student: %s, Prob At-Risk: %.4f, Prob Safe: %.4f",
-                request.student_id,
-                prob_at_risk,
-                probabilities[0],
-            )
-            return prediction, probabilities
+            else:
+                logger.info(
+                    "Model prediction (binary) - Student: %s, Prob At-Risk: %.4f, Prob Safe: %.4f",
+                    request.student_id,
+                    probabilities[1],
+                    probabilities[0],
+                )
 
-        return self._demo_predict(request)
+        return prediction, probabilities
 
     def _summarize_prediction(
         self, prediction: int, probabilities: np.ndarray
@@ -554,12 +766,166 @@ class AcademicRiskService:
 
         return candidates
 
-    def _build_counterfactual(self, request: AcademicRiskRequest) -> CounterfactualExplanation:
-        """Find a small set of changes that moves the student to a safer class."""
+    def _score_requests_memoized(
+        self,
+        requests: List[AcademicRiskRequest],
+        memo: dict[tuple, tuple[str, float, float, dict[str, float]]],
+        max_new_rows: int | None = None,
+    ) -> List[tuple[str, float, float, dict[str, float]] | None]:
+        """Score requests in one batched call, reusing rows already in ``memo``.
+
+        At most ``max_new_rows`` unseen feature vectors are sent to the model;
+        requests beyond that budget come back as ``None``.
+        """
+        keys = [tuple(self._feature_row(request)) for request in requests]
+        pending: dict[tuple, AcademicRiskRequest] = {}
+        for key, request in zip(keys, requests):
+            if key in memo or key in pending:
+                continue
+            if max_new_rows is not None and len(pending) >= max_new_rows:
+                continue
+            pending[key] = request
+
+        if pending:
+            scored = self._run_prediction_batch(list(pending.values()))
+            for key, (prediction, probabilities) in zip(pending, scored):
+                memo[key] = self._summarize_prediction(prediction, probabilities)
+
+        return [memo.get(key) for key in keys]
+
+    def _search_counterfactual_path(
+        self,
+        start: _CounterfactualState,
+        target_rank: int,
+        memo: dict[tuple, tuple[str, float, float, dict[str, float]]],
+        beam_width: int,
+        evaluation_budget: list[int],
+    ) -> _CounterfactualState:
+        """Walk towards ``target_rank`` keeping the ``beam_width`` best paths per step.
+
+        Every candidate update of every path in the beam is scored in a single
+        batched model call. A beam width of 1 is the classic greedy search.
+        """
+        frontier = [start]
+
+        for _ in range(COUNTERFACTUAL_MAX_STEPS):
+            expansions: list[tuple[_CounterfactualState, str, AcademicRiskRequest, str]] = []
+            for state in frontier:
+                for feature, candidate_request, rationale in self._build_candidate_updates(
+                    state.request
+                ):
+                    expansions.append(
+                        (state, feature, self._normalize_request(candidate_request), rationale)
+                    )
+
+            if not expansions:
+                break
+
+            evaluations_before = len(memo)
+            scored = self._score_requests_memoized(
+                [candidate_request for _, _, candidate_request, _ in expansions],
+                memo,
+                max_new_rows=evaluation_budget[0],
+            )
+            evaluation_budget[0] -= len(memo) - evaluations_before
+
+            improvements: list[_CounterfactualState] = []
+            for (parent, feature, candidate_request, rationale), summary in zip(
+                expansions, scored
+            ):
+                if summary is None:
+                    continue
+
+                candidate_outcome, candidate_score, candidate_confidence, _ = summary
+                parent_rank = RISK_LEVEL_RANK[parent.outcome]
+                candidate_rank = RISK_LEVEL_RANK[candidate_outcome]
+                is_better = candidate_rank < parent_rank or (
+                    candidate_rank == parent_rank and candidate_score < parent.score - 1e-6
+                )
+                if not is_better:
+                    continue
+
+                changes = dict(parent.changes)
+                changes[feature] = (getattr(candidate_request, feature), rationale)
+                improvements.append(
+                    _CounterfactualState(
+                        request=candidate_request,
+                        outcome=candidate_outcome,
+                        score=candidate_score,
+                        confidence=candidate_confidence,
+                        changes=changes,
+                    )
+                )
+
+            if not improvements:
+                break
+
+            # Ties on (rank, score) go to the first-seen candidate, like the greedy search.
+            ranked = sorted(
+                enumerate(improvements),
+                key=lambda item: (RISK_LEVEL_RANK[item[1].outcome], item[1].score, item[0]),
+            )
+            next_frontier: list[_CounterfactualState] = []
+            seen_rows: set[tuple] = set()
+            for _, state in ranked:
+                row = tuple(self._feature_row(state.request))
+                if row in seen_rows:
+                    continue
+                seen_rows.add(row)
+                next_frontier.append(state)
+                if len(next_frontier) >= beam_width:
+                    break
+
+            frontier = next_frontier
+            if RISK_LEVEL_RANK[frontier[0].outcome] <= target_rank:
+                break
+
+        return frontier[0]
+
+    def _build_counterfactual(
+        self,
+        request: AcademicRiskRequest,
+        beam_width: int | None = None,
+        max_evaluations: int | None = None,
+    ) -> CounterfactualExplanation:
+        """Find a small set of changes that moves the student to a safer class.
+
+        Scored feature vectors are memoized for the whole request, so the
+        "Medium Risk" fallback search reuses rows already scored for "Safe".
+        """
+        beam_width = max(1, beam_width or settings.COUNTERFACTUAL_BEAM_WIDTH)
+        max_evaluations = (
+            max_evaluations
+            if max_evaluations is not None
+            else settings.COUNTERFACTUAL_MAX_EVALUATIONS
+        )
+
         base_request = self._normalize_request(request)
-        prediction, probabilities = self._run_prediction_model_or_demo(base_request)
-        current_outcome, current_score, current_confidence, _ = self._summarize_prediction(
-            prediction, probabilities
+        cache_key = (
+            "counterfactual",
+            self._cache_namespace(),
+            tuple(self._feature_row(base_request)),
+            beam_width,
+            max_evaluations,
+        )
+        cached = self.prediction_cache.get(cache_key)
+        if cached is not None:
+            return cached.model_copy(deep=True)
+
+        explanation = self._search_counterfactual(base_request, beam_width, max_evaluations)
+        self.prediction_cache.set(cache_key, explanation)
+        return explanation.model_copy(deep=True)
+
+    def _search_counterfactual(
+        self,
+        base_request: AcademicRiskRequest,
+        beam_width: int,
+        max_evaluations: int,
+    ) -> CounterfactualExplanation:
+        evaluation_budget = [max_evaluations]
+        memo: dict[tuple, tuple[str, float, float, dict[str, float]]] = {}
+        current_outcome, current_score, current_confidence, current_probabilities = (
+            self._score_requests_memoized([base_request], memo)[0]
         )
 
         if current_outcome == "Safe":
@@ -575,85 +941,31 @@ class AcademicRiskService:
             )
 
         target_outcomes = ["Safe"]
-        if len(probabilities) == 3 and current_outcome == "At-Risk":
+        if len(current_probabilities) == 3 and current_outcome == "At-Risk":
             target_outcomes.append("Medium Risk")
 
+        start = _CounterfactualState(
+            request=base_request,
+            outcome=current_outcome,
+            score=current_score,
+            confidence=current_confidence,
+            changes={},
+        )
+
         best_partial: CounterfactualExplanation | None = None
         for target_outcome in target_outcomes:
             target_rank = RISK_LEVEL_RANK[target_outcome]
-            working_request = base_request
-            working_prediction = prediction
-            working_probabilities = probabilities
-            working_outcome = current_outcome
-            working_score = current_score
-            working_confidence = current_confidence
-            changes: dict[str, CounterfactualChange] = {}
-
-            for _ in range(8):
-                best_option: tuple[
-                    str,
-                    AcademicRiskRequest,
-                    str,
-                    int,
-                    np.ndarray,
-                    str,
-                    float,
-                    float,
-                ] | None = None
-
-                for feature, candidate_request, rationale in self._build_candidate_updates(
-                    working_request
-                ):
-                    candidate_request = self._normalize_request(candidate_request)
-                    candidate_prediction, candidate_probabilities = self._run_prediction_model_or_demo(
-                        candidate_request
-                    )
-                    candidate_outcome, candidate_score, candidate_confidence, _ = (
-                        self._summarize_prediction(candidate_prediction, candidate_probabilities)
-                    )
-
-                    current_rank = RISK_LEVEL_RANK[working_outcome]
-                    candidate_rank = RISK_LEVEL_RANK[candidate_outcome]
-                    is_better = candidate_rank < current_rank or (
-                        candidate_rank == current_rank and candidate_score < working_score - 1e-6
-                    )
-                    if not is_better:
-                        continue
-
-                    if best_option is None or (
-                        candidate_rank,
-                        candidate_score,
-                    ) < (
-                        RISK_LEVEL_RANK[best_option[5]],
-                        best_option[6],
-                    ):
-                        best_option = (
-                            feature,
-                            candidate_request,
-                            rationale,
-                            candidate_prediction,
-                            candidate_probabilities,
-                            candidate_outcome,
-                            candidate_score,
-                            candidate_confidence,
-                        )
-
-                if best_option is None:
-                    break
-
-                (
-                    feature,
-                    working_request,
-                    rationale,
-                    working_prediction,
-                    working_probabilities,
-                    working_outcome,
-                    working_score,
-                    working_confidence,
-                ) = best_option
+            final_state = self._search_counterfactual_path(
+                start=start,
+                target_rank=target_rank,
+                memo=memo,
+                beam_width=beam_width,
+                evaluation_budget=evaluation_budget,
+            )
 
+            ordered_changes: list[CounterfactualChange] = []
+            for feature, (suggested_value, rationale) in final_state.changes.items():
                 original_value = getattr(base_request, feature)
-                suggested_value = getattr(working_request, feature)
                 direction = "maintain"
                 delta: float | None = None
                 if isinstance(original_value, (int, float)) and isinstance(
@@ -667,19 +979,18 @@ class AcademicRiskService:
                 elif original_value != suggested_value:
                     direction = "toggle"
 
-                changes[feature] = CounterfactualChange(
-                    feature=feature,
-                    current_value=original_value,
-                    suggested_value=suggested_value,
-                    direction=direction,
-                    delta=delta,
-                    rationale=rationale,
+                ordered_changes.append(
+                    CounterfactualChange(
+                        feature=feature,
+                        current_value=original_value,
+                        suggested_value=suggested_value,
+                        direction=direction,
+                        delta=delta,
+                        rationale=rationale,
+                    )
                 )
 
-                if RISK_LEVEL_RANK[working_outcome] <= target_rank:
-                    break
-
-            ordered_changes = list(changes.values())
+            working_outcome = final_state.outcome
             achieved_target = RISK_LEVEL_RANK[working_outcome] <= target_rank
 
             if ordered_changes:
@@ -703,8 +1014,8 @@ class AcademicRiskService:
                 achievable=achieved_target,
                 summary=summary,
                 estimated_risk_level=working_outcome,
-                estimated_risk_score=working_score,
-                estimated_confidence=working_confidence,
+                estimated_risk_score=final_state.score,
+                estimated_confidence=final_state.confidence,
                 changes=ordered_changes,
             )
 
@@ -736,35 +1047,102 @@ class AcademicRiskService:
             changes=[],
         )
 
-    async def predict(self, request: AcademicRiskRequest) -> AcademicRiskResponse:
-        """Make academic risk prediction."""
+    def _build_response(
+        self,
+        normalized_request: AcademicRiskRequest,
+        prediction: int,
+        probabilities: np.ndarray,
+        include_counterfactual: bool = True,
+        include_guidance: bool = True,
+    ) -> AcademicRiskResponse:
+        """Assemble the public response for an already-scored request.
+
+        ``include_guidance=False`` leaves recommendations and risk factors empty
+        for callers that only read the risk level and score.
+        """
+        risk_level, risk_score, confidence, probs_dict = self._summarize_prediction(
+            prediction, probabilities
+        )
+
+        return AcademicRiskResponse(
+            student_id=normalized_request.student_id,
+            risk_level=risk_level,
+            risk_score=risk_score,
+            confidence=confidence,
+            probabilities=probs_dict,
+            recommendations=(
+                self._generate_recommendations(normalized_request, prediction, risk_score)
+                if include_guidance
+                else []
+            ),
+            top_risk_factors=(
+                self._get_top_risk_factors(normalized_request, prediction)
+                if include_guidance
+                else []
+            ),
+            counterfactual=(
+                self._build_counterfactual(normalized_request)
+                if include_counterfactual
+                else None
+            ),
+        )
+
+    async def _dispatch(self, method: str, *args: Any) -> Any:
+        """Run a synchronous scoring method on the inference executor.
+
+        Process pools cannot share this instance, so workers call the method on
+        their own module-level singleton instead, reloading it first whenever
+        this process has moved to a different model file.
+        """
+        self._schedule_model_refresh()
+        if inference_executor.uses_process_pool and self is academic_risk_service:
+            return await inference_executor.run(
+                _call_academic_risk_service, self._model_file_signature, method, *args
+            )
+        return await inference_executor.run(getattr(self, method), *args)
+
+    async def predict(
+        self,
+        request: AcademicRiskRequest,
+        include_counterfactual: bool = True,
+    ) -> AcademicRiskResponse:
+        """Make academic risk prediction.
+
+        Set ``include_counterfactual=False`` to skip the counterfactual search;
+        it can be requested later through ``explain_counterfactual``.
+
+        When coalescing is on, only the model scoring joins the shared batch.
+        Each counterfactual search then runs as its own executor task, so one
+        batch never runs several searches back to back.
+        """
+        if settings.PREDICTION_COALESCE_WINDOW_MS > 0:
+            response = await self.coalescer.submit(("predict_batch_sync", False), request)
+            if not include_counterfactual:
+                return response
+            counterfactual = await self.explain_counterfactual(request)
+            return response.model_copy(update={"counterfactual": counterfactual})
+        return await self._dispatch("predict_sync", request, include_counterfactual)
+
+    def predict_sync(
+        self,
+        request: AcademicRiskRequest,
+        include_counterfactual: bool = True,
+    ) -> AcademicRiskResponse:
         try:
             normalized_request = self._normalize_request(request)
             prediction, probabilities = self._run_prediction_model_or_demo(normalized_request)
-            risk_level, risk_score, confidence, probs_dict = self._summarize_prediction(
-                prediction, probabilities
-            )
-
-            response = AcademicRiskResponse(
-                student_id=normalized_request.student_id,
-                risk_level=risk_level,
-                risk_score=risk_score,
-                confidence=confidence,
-                probabilities=probs_dict,
-                recommendations=self._generate_recommendations(
-                    normalized_request, prediction, risk_score
-                ),
-                top_risk_factors=self._get_top_risk_factors(
-                    normalized_request, prediction
-                ),
-                counterfactual=self._build_counterfactual(normalized_request),
+            response = self._build_response(
+                normalized_request,
+                prediction,
+                probabilities,
+                include_counterfactual=include_counterfactual,
             )
 
             logger.info(
                 "Prediction for %s: %s (confidence: %.2f%%)",
                 normalized_request.student_id,
-                risk_level,
-                confidence * 100,
+                response.risk_level,
+                response.confidence * 100,
             )
 
             return response
@@ -772,6 +1150,88 @@ class AcademicRiskService:
             logger.error(f"Prediction error: {str(e)}")
             raise
 
+    async def predict_batch(
+        self,
+        requests: List[AcademicRiskRequest],
+        include_counterfactual: bool = True,
+    ) -> List[AcademicRiskResponse]:
+        """Make academic risk predictions for many students with one model call."""
+        return await self._dispatch("predict_batch_sync", requests, include_counterfactual)
+
+    def predict_batch_sync(
+        self,
+        requests: List[AcademicRiskRequest],
+        include_counterfactual: bool = True,
+    ) -> List[AcademicRiskResponse]:
+        try:
+            normalized_requests = [self._normalize_request(request) for request in requests]
+            scored = self._run_prediction_batch(normalized_requests)
+            responses = [
+                self._build_response(
+                    normalized_request,
+                    prediction,
+                    probabilities,
+                    include_counterfactual=include_counterfactual,
+                )
+                for normalized_request, (prediction, probabilities) in zip(
+                    normalized_requests, scored
+                )
+            ]
+
+            logger.info("Batch prediction complete for %d students", len(responses))
+
+            return responses
+        except Exception as e:
+            logger.error(f"Batch prediction error: {str(e)}")
+            raise
+
+    async def score(self, request: AcademicRiskRequest) -> AcademicRiskResponse:
+        """Lightweight risk scoring without counterfactuals, recommendations or risk factors."""
+        if settings.PREDICTION_COALESCE_WINDOW_MS > 0:
+            return await self.coalescer.submit(("score_batch_sync",), request)
+        return (await self.score_batch([request]))[0]
+
+    async def _run_coalesced_batch(
+        self, key: tuple[Any, ...], requests: List[AcademicRiskRequest]
+    ) -> List[AcademicRiskResponse]:
+        method, *options = key
+        return await self._dispatch(method, requests, *options)
+
+    async def score_batch(
+        self, requests: List[AcademicRiskRequest]
+    ) -> List[AcademicRiskResponse]:
+        """Lightweight batch scoring for internal callers that only need risk level and score."""
+        return await self._dispatch("score_batch_sync", requests)
+
+    def score_batch_sync(
+        self, requests: List[AcademicRiskRequest]
+    ) -> List[AcademicRiskResponse]:
+        normalized_requests = [self._normalize_request(request) for request in requests]
+        scored = self._run_prediction_batch(normalized_requests)
+        return [
+            self._build_response(
+                normalized_request,
+                prediction,
+                probabilities,
+                include_counterfactual=False,
+                include_guidance=False,
+            )
+            for normalized_request, (prediction, probabilities) in zip(
+                normalized_requests, scored
+            )
+        ]
+
+    async def explain_counterfactual(
+        self, request: AcademicRiskRequest
+    ) -> CounterfactualExplanation:
+        """Compute the counterfactual explanation on demand."""
+        return await self._dispatch("explain_counterfactual_sync", request)
+
+    def explain_counterfactual_sync(
+        self, request: AcademicRiskRequest
+    ) -> CounterfactualExplanation:
+        return self._build_counterfactual(self._normalize_request(request))
+
     def _demo_predict(self, request: AcademicRiskRequest) -> Tuple[int, np.ndarray]:
         """Generate simulated prediction for demo mode"""
         # Simple heuristic-based prediction
@@ -801,5 +1261,15 @@ class AcademicRiskService:
         return prediction, probabilities
 
 
+def _call_academic_risk_service(
+    model_file_signature: tuple[int, int] | None, method: str, *args: Any
+) -> Any:
+    """Process-pool entry point; runs against the worker's own singleton."""
+    if academic_risk_service._model_file_signature != model_file_signature:
+        logger.info("Parent process changed the academic risk model; reloading worker")
+        academic_risk_service.reload_model()
+    return getattr(academic_risk_service, method)(*args)
+
+
 # Initialize service (singleton)
 academic_risk_service = AcademicRiskService()
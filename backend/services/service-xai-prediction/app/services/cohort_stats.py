@@ -0,0 +1,137 @@
+"""Materialized cohort statistics for cohort comparison and fairness checks."""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+COHORT_METRICS = ("avg_grade", "completion_rate", "risk_score")
+
+
+@dataclass(frozen=True)
+class CohortEntry:
+    """The values one student contributes to the cohort aggregates."""
+
+    metrics: dict[str, float]
+    elevated: bool
+    groups: dict[str, str]
+
+
+@dataclass
+class GroupAggregate:
+    size: int = 0
+    risk_total: float = 0.0
+    elevated: int = 0
+
+    @property
+    def average_risk(self) -> float:
+        return self.risk_total / self.size if self.size else 0.0
+
+    @property
+    def elevated_rate(self) -> float:
+        return (self.elevated / self.size) * 100.0 if self.size else 0.0
+
+
+class CohortStats:
+    """Per-(source, institute) cohort aggregates maintained incrementally.
+
+    Each metric is kept as a sorted list so percentile ranks are a bisect, and
+    totals are kept alongside so averages are O(1). Fairness dimensions keep a
+    ``GroupAggregate`` per group label. ``upsert`` replaces a student's previous
+    contribution, so the aggregates stay exact as predictions are re-persisted.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._entries: dict[str, CohortEntry] = {}
+        self._sorted: dict[str, list[float]] = {metric: [] for metric in COHORT_METRICS}
+        self._totals: dict[str, float] = {metric: 0.0 for metric in COHORT_METRICS}
+        self._elevated = 0
+        self._groups: dict[str, dict[str, GroupAggregate]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _apply(self, entry: CohortEntry, sign: int) -> None:
+        for metric in COHORT_METRICS:
+            value = entry.metrics[metric]
+            values = self._sorted[metric]
+            if sign > 0:
+                bisect.insort(values, value)
+            else:
+                del values[bisect.bisect_left(values, value)]
+            self._totals[metric] += sign * value
+
+        self._elevated += sign * int(entry.elevated)
+        risk_score = entry.metrics["risk_score"]
+        for dimension, label in entry.groups.items():
+            groups = self._groups.setdefault(dimension, {})
+            aggregate = groups.setdefault(label, GroupAggregate())
+            aggregate.size += sign
+            aggregate.risk_total += sign * risk_score
+            aggregate.elevated += sign * int(entry.elevated)
+            if aggregate.size == 0:
+                del groups[label]
+
+    def _upsert_locked(self, student_id: str, entry: CohortEntry) -> None:
+        previous = self._entries.get(student_id)
+        if previous is not None:
+            self._apply(previous, -1)
+        self._entries[student_id] = entry
+        self._apply(entry, 1)
+
+    def upsert(self, student_id: str, entry: CohortEntry) -> None:
+        with self._lock:
+            self._upsert_locked(student_id, entry)
+
+    def rebuild(self, entries: dict[str, CohortEntry]) -> None:
+        with self._lock:
+            self._reset()
+            for student_id, entry in entries.items():
+                self._upsert_locked(student_id, entry)
+
+    def summary(self) -> dict[str, Any]:
+        """Cohort size, per-metric averages and the overall elevated-risk rate."""
+        with self._lock:
+            size = len(self._entries)
+            return {
+                "size": size,
+                "averages": {
+                    metric: (self._totals[metric] / size if size else 0.0)
+                    for metric in COHORT_METRICS
+                },
+                "elevated_rate": (self._elevated / size) * 100.0 if size else 0.0,
+            }
+
+    def percentile_rank(self, metric: str, value: float) -> float:
+        """Share of the cohort at or below ``value``, as a percentage."""
+        with self._lock:
+            values = self._sorted[metric]
+            if not values:
+                return 0.0
+            return (bisect.bisect_right(values, value) / len(values)) * 100.0
+
+    def group(self, dimension: str, label: str) -> tuple[int, GroupAggregate | None]:
+        """Return the group count of ``dimension`` and the aggregate for ``label``."""
+        with self._lock:
+            groups = self._groups.get(dimension, {})
+            aggregate = groups.get(label)
+            if aggregate is not None:
+                aggregate = GroupAggregate(
+                    aggregate.size, aggregate.risk_total, aggregate.elevated
+                )
+            return len(groups), aggregate
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "students": len(self._entries),
+                "dimensions": {
+                    dimension: len(groups) for dimension, groups in self._groups.items()
+                },
+            }
@@ -0,0 +1,190 @@
+"""Long-lived, pooled HTTP client for calls to upstream services."""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import weakref
+from typing import Any
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamHTTPClient:
+    """One keep-alive ``httpx.AsyncClient`` shared by every upstream call.
+
+    The client is opened in the FastAPI lifespan and reused for the life of
+    the process. Requests to each upstream origin are additionally capped by
+    a semaphore so a large roster cannot monopolise the connection pool.
+    Connections and semaphores belong to an event loop, so both are recreated
+    transparently when used from a different loop (e.g. in ``asyncio.run``);
+    the client left behind is closed and semaphores of closed loops dropped.
+    """
+
+    def __init__(
+        self,
+        timeout_seconds: float | None = None,
+        max_connections: int | None = None,
+        max_keepalive_connections: int | None = None,
+        keepalive_expiry_seconds: float | None = None,
+        per_upstream_concurrency: int | None = None,
+        http2: bool | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.timeout = httpx.Timeout(
+            timeout_seconds
+            if timeout_seconds is not None
+            else settings.SYNC_TIMEOUT_SECONDS
+        )
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.SYNC_MAX_CONNECTIONS,
+            max_keepalive_connections=(
+                max_keepalive_connections or settings.SYNC_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            keepalive_expiry=(
+                keepalive_expiry_seconds
+                if keepalive_expiry_seconds is not None
+                else settings.SYNC_KEEPALIVE_EXPIRY_SECONDS
+            ),
+        )
+        self.per_upstream_concurrency = max(
+            1, per_upstream_concurrency or settings.SYNC_PER_UPSTREAM_CONCURRENCY
+        )
+        wants_http2 = settings.SYNC_HTTP2 if http2 is None else http2
+        # httpx only speaks HTTP/2 when the optional ``h2`` package is installed.
+        self.http2 = bool(wants_http2) and importlib.util.find_spec("h2") is not None
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._client_loop: asyncio.AbstractEventLoop | None = None
+        self._semaphores: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]
+        ] = weakref.WeakKeyDictionary()
+        self._in_flight: dict[str, int] = {}
+        self._closing: set[asyncio.Task] = set()
+        self.requests_sent = 0
+        self.clients_opened = 0
+        self.clients_retired = 0
+
+    def _build_client(self) -> httpx.AsyncClient:
+        self.clients_opened += 1
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=self.http2,
+            transport=self._transport,
+        )
+
+    async def start(self) -> None:
+        self._get_client()
+        logger.info(
+            "Upstream HTTP client ready (max_connections=%s, http2=%s)",
+            self.limits.max_connections,
+            self.http2,
+        )
+
+    async def close(self) -> None:
+        client, self._client, self._client_loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if (
+            self._client is None
+            or self._client.is_closed
+            or self._client_loop is not loop
+        ):
+            if self._client is not None and not self._client.is_closed:
+                self._retire_client(self._client, self._client_loop)
+            self._client = self._build_client()
+            self._client_loop = loop
+            self._prune_semaphores()
+        return self._client
+
+    def _retire_client(
+        self, client: httpx.AsyncClient, client_loop: asyncio.AbstractEventLoop | None
+    ) -> None:
+        """Close a client that was opened on another event loop."""
+        self.clients_retired += 1
+        if (
+            client_loop is not None
+            and client_loop.is_running()
+            and not client_loop.is_closed()
+        ):
+            # Its connections belong to that loop, so close them there
+            asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+            return
+        task = asyncio.get_running_loop().create_task(self._aclose_quietly(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+        try:
+            await client.aclose()
+        except Exception as exc:
+            # Connections opened on a loop that has since closed can't close cleanly
+            logger.debug("Ignoring error while closing stale upstream client: %s", exc)
+
+    def _prune_semaphores(self) -> None:
+        for loop in [loop for loop in self._semaphores if loop.is_closed()]:
+            del self._semaphores[loop]
+
+    def _semaphore(self, origin: str) -> asyncio.Semaphore:
+        per_loop = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        semaphore = per_loop.get(origin)
+        if semaphore is None:
+            semaphore = per_loop[origin] = asyncio.Semaphore(
+                self.per_upstream_concurrency
+            )
+        return semaphore
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        request_url = httpx.URL(url)
+        origin = f"{request_url.scheme}://{request_url.netloc.decode()}"
+        async with self._semaphore(origin):
+            self._in_flight[origin] = self._in_flight.get(origin, 0) + 1
+            self.requests_sent += 1
+            try:
+                return await self._get_client().request(method, url, **kwargs)
+            finally:
+                self._in_flight[origin] -= 1
+
+    async def get(
+        self, url: str, params: dict[str, Any] | None = None
+    ) -> httpx.Response:
+        return await self.request("GET", url, params=params)
+
+    async def post(self, url: str, json: Any = None) -> httpx.Response:
+        return await self.request("POST", url, json=json)
+
+    def stats(self) -> dict[str, Any]:
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        return {
+            "open": self._client is not None and not self._client.is_closed,
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "pool_connections": len(connections),
+            "idle_connections": sum(
+                1 for connection in connections if connection.is_idle()
+            ),
+            "per_upstream_concurrency": self.per_upstream_concurrency,
+            "in_flight": {
+                origin: count for origin, count in self._in_flight.items() if count
+            },
+            "requests_sent": self.requests_sent,
+            "clients_opened": self.clients_opened,
+            "clients_retired": self.clients_retired,
+        }
+
+
+upstream_http_client = UpstreamHTTPClient()
@@ -0,0 +1,98 @@
+"""Executor that keeps CPU-bound model work off the asyncio event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = {"thread", "process", "inline"}
+
+
+class InferenceExecutor:
+    """Dispatch synchronous inference calls to a thread or process pool.
+
+    ``thread`` suits the XGBoost and compiled paths, which release the GIL for
+    most of their work. ``process`` sidesteps the GIL entirely for the pure
+    Python demo path, at the cost of pickling requests and responses.
+    ``inline`` runs calls directly on the event loop, as before.
+    """
+
+    def __init__(self, mode: str = "thread", max_workers: int = 4) -> None:
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown inference executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max(1, int(max_workers))
+        self._pool: Executor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+
+    @property
+    def uses_process_pool(self) -> bool:
+        return self.mode == "process"
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.mode == "process":
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="xai-inference",
+                    )
+            return self._pool
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run ``func(*args)`` in the pool and await its result."""
+        if self.mode == "inline":
+            return func(*args)
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_pool(), partial(func, *args))
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        with self._lock:
+            self._completed += 1
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "max_workers": self.max_workers,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.max_workers),
+                "completed": self._completed,
+                "failed": self._failed,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+            logger.info("Inference executor shut down")
+
+
+inference_executor = InferenceExecutor(
+    mode=settings.INFERENCE_EXECUTOR_MODE,
+    max_workers=settings.INFERENCE_MAX_WORKERS,
+)
@@ -0,0 +1,166 @@
+"""Latest-per-student projection of academic risk predictions.
+
+``xai_academic_risk_latest`` holds one row per student and is upserted in the
+same transaction as every history insert, so dashboard stats and cohort
+loaders read O(students) rows instead of scanning every prediction ever made.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import Engine, Float, case, cast, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.logging import get_logger
+from app.models import (
+    AcademicRiskLatestRecord,
+    AcademicRiskPredictionRecord,
+    TemporaryStudentRecord,
+)
+from app.schemas.academic_risk import AcademicRiskRequest, AcademicRiskResponse
+
+logger = get_logger(__name__)
+
+HIGH_RISK_LEVELS = ("high", "at-risk", "at risk")
+
+
+def upsert_latest_academic_risk(
+    db: Session,
+    results: list[tuple[AcademicRiskRequest, AcademicRiskResponse]],
+    model_version: str | None,
+) -> None:
+    """Stage an upsert of the latest prediction per student; the caller commits."""
+    latest: dict[str, dict[str, Any]] = {}
+    for request, response in results:
+        # ON CONFLICT cannot touch a row twice, so keep the last result per student.
+        latest[request.student_id] = {
+            "student_id": request.student_id,
+            "avg_grade": request.avg_grade,
+            "request_payload": request.model_dump(mode="json"),
+            "response_payload": response.model_dump(mode="json"),
+            "risk_level": response.risk_level,
+            "risk_score": response.risk_score,
+            "confidence": response.confidence,
+            "model_version": model_version,
+        }
+    if not latest:
+        return
+
+    statement = pg_insert(AcademicRiskLatestRecord).values(list(latest.values()))
+    excluded = statement.excluded
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[AcademicRiskLatestRecord.student_id],
+            set_={
+                "avg_grade": excluded.avg_grade,
+                "request_payload": excluded.request_payload,
+                "response_payload": excluded.response_payload,
+                "risk_level": excluded.risk_level,
+                "risk_score": excluded.risk_score,
+                "confidence": excluded.confidence,
+                "model_version": excluded.model_version,
+                "predicted_at": func.now(),
+            },
+        )
+    )
+
+
+def ensure_latest_academic_risk_projection(engine: Engine) -> int:
+    """Backfill an empty projection from the prediction history.
+
+    The projection starts empty on deployments that predate it. Returns the
+    number of rows backfilled.
+    """
+    with engine.begin() as connection:
+        if connection.execute(
+            select(AcademicRiskLatestRecord.student_id).limit(1)
+        ).first():
+            return 0
+
+        history = AcademicRiskPredictionRecord
+        latest_history = (
+            select(
+                history.student_id,
+                cast(history.request_payload["avg_grade"].astext, Float),
+                history.request_payload,
+                history.response_payload,
+                history.risk_level,
+                history.risk_score,
+                history.confidence,
+                history.model_version,
+                history.created_at,
+            )
+            .distinct(history.student_id)
+            .order_by(history.student_id, history.created_at.desc(), history.id.desc())
+        )
+        result = connection.execute(
+            insert(AcademicRiskLatestRecord).from_select(
+                [
+                    "student_id",
+                    "avg_grade",
+                    "request_payload",
+                    "response_payload",
+                    "risk_level",
+                    "risk_score",
+                    "confidence",
+                    "model_version",
+                    "predicted_at",
+                ],
+                latest_history,
+            )
+        )
+    if result.rowcount:
+        logger.info(f"Backfilled {result.rowcount} latest academic risk rows")
+    return max(result.rowcount or 0, 0)
+
+
+def _high_risk_count(risk_level_column) -> Any:
+    return func.coalesce(
+        func.sum(
+            case((func.lower(risk_level_column).in_(HIGH_RISK_LEVELS), 1), else_=0)
+        ),
+        0,
+    )
+
+
+async def academic_risk_summary(
+    db: AsyncSession,
+) -> tuple[int, float | None, float | None, int]:
+    """Return ``(students, avg grade, avg risk, high-risk)`` from the projection."""
+    result = await db.execute(
+        select(
+            func.count(AcademicRiskLatestRecord.student_id),
+            func.avg(AcademicRiskLatestRecord.avg_grade),
+            func.avg(AcademicRiskLatestRecord.risk_score),
+            _high_risk_count(AcademicRiskLatestRecord.risk_level),
+        )
+    )
+    students, avg_grade, avg_risk, high_risk = result.one()
+    return (
+        int(students or 0),
+        float(avg_grade) if avg_grade is not None else None,
+        float(avg_risk) if avg_risk is not None else None,
+        int(high_risk or 0),
+    )
+
+
+async def temporary_student_summary(
+    temp_db: AsyncSession,
+) -> tuple[int, float | None, int]:
+    """Return ``(students, avg grade, high-risk students)`` for temporary students."""
+    result = await temp_db.execute(
+        select(
+            func.count(TemporaryStudentRecord.id),
+            func.avg(TemporaryStudentRecord.avg_grade),
+            _high_risk_count(TemporaryStudentRecord.latest_risk_level),
+        )
+    )
+    students, avg_grade, high_risk = result.one()
+    return (
+        int(students or 0),
+        float(avg_grade) if avg_grade is not None else None,
+        int(high_risk or 0),
+    )
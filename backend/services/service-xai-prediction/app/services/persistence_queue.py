@@ -0,0 +1,210 @@
+"""Write-behind persistence for prediction records."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PersistenceSink:
+    """Where one kind of queued item is written.
+
+    ``write`` stages a whole batch on a fresh async session from
+    ``session_factory`` through ``run_sync``, so sink code keeps the plain
+    ``Session`` API; the queue commits. ``on_written`` runs once the batch is
+    committed.
+    """
+
+    name: str
+    session_factory: Callable[[], AsyncSession]
+    write: Callable[[Session, list[Any]], None]
+    on_written: Callable[[list[Any]], None] | None = None
+
+
+class PersistenceQueue:
+    """Bounded queue that persists prediction records behind the response.
+
+    Request handlers ``submit`` items and return without a database round
+    trip; a background flusher collects whatever arrives within
+    ``flush_interval_seconds`` (up to ``max_batch_size`` items), groups it per
+    sink and commits each group in one transaction. A full queue makes
+    ``submit`` wait for the flusher, failed batches are retried with
+    exponential backoff, and ``stop`` drains what is left on shutdown.
+    When the flusher is not running (or ``submit`` is called from another
+    event loop) items are written immediately instead.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        flush_interval_seconds: float = 0.05,
+        max_batch_size: int = 500,
+        max_retries: int = 3,
+        retry_backoff_seconds: float = 0.1,
+    ) -> None:
+        self.max_size = max(1, int(max_size))
+        self.flush_interval_seconds = max(0.0, flush_interval_seconds)
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_retries = max(0, int(max_retries))
+        self.retry_backoff_seconds = max(0.0, retry_backoff_seconds)
+        self._queue: asyncio.Queue[tuple[PersistenceSink, Any]] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._flusher: asyncio.Task | None = None
+        self._stopping = False
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed = 0
+        self.dropped = 0
+        self.backpressure_waits = 0
+        self.direct_writes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._flusher is not None and not self._flusher.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._stopping = False
+        self._flusher = self._loop.create_task(self._flush_loop())
+        logger.info("Persistence queue started")
+
+    async def stop(self, timeout: float | None = 10.0) -> None:
+        """Flush queued items for at most ``timeout`` seconds, then stop the flusher."""
+        if self._flusher is None or self._queue is None:
+            return
+        self._stopping = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            self.dropped += self._queue.qsize()
+            logger.warning(
+                f"Persistence queue drain timed out; "
+                f"{self._queue.qsize()} records were not written"
+            )
+        self._flusher.cancel()
+        await asyncio.gather(self._flusher, return_exceptions=True)
+        self._flusher = None
+        self._queue = None
+        self._loop = None
+        logger.info("Persistence queue stopped")
+
+    async def submit(self, sink: PersistenceSink, item: Any) -> None:
+        await self.submit_many(sink, [item])
+
+    async def submit_many(self, sink: PersistenceSink, items: Iterable[Any]) -> None:
+        items = list(items)
+        if not items:
+            return
+        queue = self._queue
+        if (
+            not self.running
+            or queue is None
+            or self._loop is not asyncio.get_running_loop()
+        ):
+            self.direct_writes += len(items)
+            await self._write_with_retries(sink, items)
+            return
+
+        for item in items:
+            if queue.full():
+                self.backpressure_waits += 1
+            await queue.put((sink, item))
+            self.enqueued += 1
+
+    async def _flush_loop(self) -> None:
+        queue = self._queue
+        assert queue is not None
+        while True:
+            batch = [await queue.get()]
+            if not self._stopping and queue.qsize() + 1 < self.max_batch_size:
+                await asyncio.sleep(self.flush_interval_seconds)
+            while len(batch) < self.max_batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _flush(self, batch: list[tuple[PersistenceSink, Any]]) -> None:
+        grouped: dict[PersistenceSink, list[Any]] = {}
+        for sink, item in batch:
+            grouped.setdefault(sink, []).append(item)
+        for sink, items in grouped.items():
+            await self._write_with_retries(sink, items)
+
+    async def _write_with_retries(
+        self, sink: PersistenceSink, items: list[Any]
+    ) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._write(sink, items)
+                break
+            except Exception as exc:
+                if attempt == self.max_retries:
+                    self.failed += len(items)
+                    logger.warning(
+                        f"Could not persist {len(items)} {sink.name} records "
+                        f"after {attempt + 1} attempts: {exc}"
+                    )
+                    return
+                self.retries += 1
+                await asyncio.sleep(self.retry_backoff_seconds * (2**attempt))
+
+        self.written += len(items)
+        self.batches += 1
+        if sink.on_written is not None:
+            try:
+                sink.on_written(items)
+            except Exception as exc:
+                logger.warning(f"Post-write hook for {sink.name} records failed: {exc}")
+
+    @staticmethod
+    async def _write(sink: PersistenceSink, items: list[Any]) -> None:
+        async with sink.session_factory() as db:
+            try:
+                await db.run_sync(sink.write, items)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_size": self.max_size,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "backpressure_waits": self.backpressure_waits,
+            "direct_writes": self.direct_writes,
+        }
+
+
+persistence_queue = PersistenceQueue(
+    max_size=settings.PERSISTENCE_QUEUE_MAX_SIZE,
+    flush_interval_seconds=settings.PERSISTENCE_FLUSH_INTERVAL_MS / 1000.0,
+    max_batch_size=settings.PERSISTENCE_MAX_BATCH,
+    max_retries=settings.PERSISTENCE_MAX_RETRIES,
+    retry_backoff_seconds=settings.PERSISTENCE_RETRY_BACKOFF_MS / 1000.0,
+)
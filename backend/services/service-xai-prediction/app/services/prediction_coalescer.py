@@ -0,0 +1,125 @@
+"""Micro-batching for concurrent single-student predictions."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+BatchRunner = Callable[[Hashable, list[Any]], Awaitable[list[Any]]]
+
+
+@dataclass
+class _PendingBatch:
+    items: list[Any] = field(default_factory=list)
+    futures: list[asyncio.Future] = field(default_factory=list)
+    timer: asyncio.TimerHandle | None = None
+
+
+class PredictionCoalescer:
+    """Collect single-item calls for a short window and run them as one batch.
+
+    Callers that share a ``key`` and arrive within ``window_seconds`` of the
+    first one are handed to ``run_batch`` together; a batch is flushed early
+    once it reaches ``max_batch_size``. Each caller receives its own result.
+    State is kept per event loop so the coalescer is safe to share between
+    the app loop and short-lived loops such as those created by ``asyncio.run``.
+    """
+
+    def __init__(
+        self,
+        run_batch: BatchRunner,
+        window_seconds: float = 0.002,
+        max_batch_size: int = 64,
+    ) -> None:
+        self.run_batch = run_batch
+        self.window_seconds = max(0.0, window_seconds)
+        self.max_batch_size = max(1, int(max_batch_size))
+        self._pending: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[Hashable, _PendingBatch]
+        ] = weakref.WeakKeyDictionary()
+        self._tasks: set[asyncio.Task] = set()
+        self.batches_run = 0
+        self.items_run = 0
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        pending = self._pending.setdefault(loop, {})
+
+        batch = pending.get(key)
+        if batch is None:
+            batch = pending[key] = _PendingBatch()
+            batch.timer = loop.call_later(self.window_seconds, self._flush, loop, key)
+
+        future = loop.create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        if len(batch.items) >= self.max_batch_size:
+            self._flush(loop, key)
+
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop, key: Hashable) -> None:
+        batch = self._pending.get(loop, {}).pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = loop.create_task(self._run(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: Hashable, batch: _PendingBatch) -> None:
+        self.batches_run += 1
+        self.items_run += len(batch.items)
+        try:
+            results = await self.run_batch(key, batch.items)
+        except asyncio.CancelledError:
+            for future in batch.futures:
+                future.cancel()
+            raise
+        except Exception as exc:
+            if len(batch.items) == 1:
+                self._set_exception(batch.futures[0], exc)
+                return
+            # Retry one by one so a single bad request does not fail its neighbours.
+            logger.warning(
+                f"Coalesced batch of {len(batch.items)} failed, "
+                f"retrying individually: {exc}"
+            )
+            for item, future in zip(batch.items, batch.futures):
+                try:
+                    [result] = await self.run_batch(key, [item])
+                except Exception as item_exc:
+                    self._set_exception(future, item_exc)
+                else:
+                    self._set_result(future, result)
+            return
+
+        for future, result in zip(batch.futures, results):
+            self._set_result(future, result)
+
+    @staticmethod
+    def _set_result(future: asyncio.Future, result: Any) -> None:
+        if not future.done():
+            future.set_result(result)
+
+    @staticmethod
+    def _set_exception(future: asyncio.Future, exc: BaseException) -> None:
+        if not future.done():
+            future.set_exception(exc)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "window_ms": round(self.window_seconds * 1000, 3),
+            "max_batch_size": self.max_batch_size,
+            "batches_run": self.batches_run,
+            "items_run": self.items_run,
+            "average_batch_size": round(self.items_run / self.batches_run, 2)
+            if self.batches_run
+            else 0.0,
+        }
@@ -0,0 +1,268 @@
+"""In-memory nearest-neighbour index for similar-student search."""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import replace
+from typing import TYPE_CHECKING, Any, Iterable
+
+import numpy as np
+
+from app.schemas.academic_risk import AcademicRiskRequest, AcademicRiskResponse
+
+if TYPE_CHECKING:
+    from app.services.student_insights_service import InsightCandidate
+
+# Column scale factors for the weighted L1 distance:
+# avg_grade, completion rate, grade consistency, grade range, assessments, risk score.
+_NUMERIC_WEIGHTS = np.array(
+    [0.30 / 100.0, 0.25, 0.15 / 100.0, 0.10 / 100.0, 0.10 / 20.0, 0.10],
+    dtype=np.float64,
+)
+# Mismatch penalties for low_engagement, low_performance, has_previous_attempts.
+_FLAG_PENALTIES = np.array([0.05, 0.05, 0.03], dtype=np.float64)
+_BAND_GAP_PENALTY = 0.12
+_SAFE_TO_AT_RISK_PENALTY = 0.18
+_AT_RISK_TO_SAFE_PENALTY = 0.10
+_LEARNING_STYLE_BONUS = 0.05
+
+
+def risk_band_index(risk_level: str) -> int:
+    """Map a risk label to 0 (safe), 1 (medium) or 2 (at-risk)."""
+    normalized = (risk_level or "").strip().lower()
+    if "safe" in normalized:
+        return 0
+    if "medium" in normalized:
+        return 1
+    return 2
+
+
+class SimilarityIndex:
+    """Vectorised similar-student lookup over every known student of one cohort.
+
+    Each student is stored as one row of pre-scaled numeric features, flag bits,
+    a risk band and an encoded learning style, so a query is a handful of NumPy
+    operations over the whole matrix instead of a Python loop per candidate.
+    Rows are upserted as predictions are seen and the whole index is rebuilt
+    from storage once it is older than ``refresh_seconds``.
+    """
+
+    def __init__(
+        self, refresh_seconds: float = 300.0, initial_capacity: int = 256
+    ) -> None:
+        self.refresh_seconds = max(0.0, refresh_seconds)
+        self._lock = threading.Lock()
+        self._capacity = max(1, initial_capacity)
+        self._allocate(self._capacity)
+        self._size = 0
+        self._rows: dict[str, int] = {}
+        self._candidates: list[InsightCandidate] = []
+        self._style_codes: dict[str, int] = {}
+        self.built_at: float | None = None
+        self.queries = 0
+
+    def _allocate(self, capacity: int) -> None:
+        self._numeric = np.zeros((capacity, len(_NUMERIC_WEIGHTS)), dtype=np.float64)
+        self._flags = np.zeros((capacity, len(_FLAG_PENALTIES)), dtype=np.int8)
+        self._bands = np.zeros(capacity, dtype=np.int8)
+        self._styles = np.full(capacity, -1, dtype=np.int32)
+
+    def _grow(self) -> None:
+        numeric, flags, bands, styles = (
+            self._numeric,
+            self._flags,
+            self._bands,
+            self._styles,
+        )
+        self._capacity *= 2
+        self._allocate(self._capacity)
+        self._numeric[: self._size] = numeric[: self._size]
+        self._flags[: self._size] = flags[: self._size]
+        self._bands[: self._size] = bands[: self._size]
+        self._styles[: self._size] = styles[: self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, student_id: object) -> bool:
+        with self._lock:
+            return student_id in self._rows
+
+    def is_stale(self) -> bool:
+        return (
+            self.built_at is None
+            or time.monotonic() - self.built_at >= self.refresh_seconds
+        )
+
+    @staticmethod
+    def _numeric_row(
+        request: AcademicRiskRequest, prediction: AcademicRiskResponse
+    ) -> np.ndarray:
+        return (
+            np.array(
+                [
+                    request.avg_grade,
+                    request.assessment_completion_rate,
+                    request.grade_consistency,
+                    request.grade_range,
+                    request.num_assessments,
+                    prediction.risk_score,
+                ],
+                dtype=np.float64,
+            )
+            * _NUMERIC_WEIGHTS
+        )
+
+    @staticmethod
+    def _flag_row(request: AcademicRiskRequest) -> list[int]:
+        return [
+            request.low_engagement,
+            request.low_performance,
+            request.has_previous_attempts,
+        ]
+
+    def _style_code(self, learning_style: str | None, register: bool) -> int:
+        if not learning_style:
+            return -1
+        code = self._style_codes.get(learning_style)
+        if code is None and register:
+            code = self._style_codes[learning_style] = len(self._style_codes)
+        return -1 if code is None else code
+
+    @staticmethod
+    def _with_known_profile(
+        candidate: InsightCandidate, known: InsightCandidate
+    ) -> InsightCandidate:
+        # Storage-backed rows do not carry profile data; keep what live syncs provided.
+        if (candidate.learning_style or not known.learning_style) and (
+            candidate.engagement_level or not known.engagement_level
+        ):
+            return candidate
+        return replace(
+            candidate,
+            learning_style=candidate.learning_style or known.learning_style,
+            engagement_level=candidate.engagement_level or known.engagement_level,
+        )
+
+    def _upsert_locked(self, candidate: InsightCandidate) -> InsightCandidate:
+        row = self._rows.get(candidate.student_id)
+        if row is None:
+            if self._size == self._capacity:
+                self._grow()
+            row = self._rows[candidate.student_id] = self._size
+            self._candidates.append(candidate)
+            self._size += 1
+        else:
+            candidate = self._with_known_profile(candidate, self._candidates[row])
+            self._candidates[row] = candidate
+
+        self._numeric[row] = self._numeric_row(candidate.request, candidate.prediction)
+        self._flags[row] = self._flag_row(candidate.request)
+        self._bands[row] = risk_band_index(candidate.prediction.risk_level)
+        self._styles[row] = self._style_code(candidate.learning_style, register=True)
+        return candidate
+
+    def upsert(self, candidate: InsightCandidate) -> InsightCandidate:
+        """Insert or replace ``candidate``; returns the row as stored."""
+        with self._lock:
+            return self._upsert_locked(candidate)
+
+    def upsert_many(
+        self, candidates: Iterable[InsightCandidate]
+    ) -> list[InsightCandidate]:
+        with self._lock:
+            return [self._upsert_locked(candidate) for candidate in candidates]
+
+    def candidates(self) -> list[InsightCandidate]:
+        with self._lock:
+            return list(self._candidates)
+
+    def rebuild(self, candidates: Iterable[InsightCandidate]) -> None:
+        """Replace the indexed rows with ``candidates``, keeping known profiles."""
+        with self._lock:
+            previous = {
+                candidate.student_id: candidate for candidate in self._candidates
+            }
+            self._allocate(self._capacity)
+            self._size = 0
+            self._rows = {}
+            self._candidates = []
+            for candidate in candidates:
+                known = previous.get(candidate.student_id)
+                if known is not None:
+                    candidate = self._with_known_profile(candidate, known)
+                self._upsert_locked(candidate)
+            self.built_at = time.monotonic()
+
+    def nearest(
+        self,
+        request: AcademicRiskRequest,
+        prediction: AcademicRiskResponse,
+        learning_style: str | None,
+        limit: int,
+        exclude_student_id: str | None = None,
+    ) -> list[tuple[float, InsightCandidate]]:
+        """Return up to ``limit`` ``(similarity, candidate)`` pairs, best first."""
+        with self._lock:
+            self.queries += 1
+            size = self._size
+            if not size or limit <= 0:
+                return []
+
+            distance = np.abs(
+                self._numeric[:size] - self._numeric_row(request, prediction)
+            ).sum(axis=1)
+            flag_mismatch = self._flags[:size] != np.array(
+                self._flag_row(request), dtype=np.int8
+            )
+            distance += flag_mismatch @ _FLAG_PENALTIES
+
+            current_band = risk_band_index(prediction.risk_level)
+            bands = self._bands[:size].astype(np.int64)
+            distance += _BAND_GAP_PENALTY * np.abs(bands - current_band)
+            if current_band == 0:
+                distance += np.where(bands == 2, _SAFE_TO_AT_RISK_PENALTY, 0.0)
+            elif current_band == 2:
+                distance += np.where(bands == 0, _AT_RISK_TO_SAFE_PENALTY, 0.0)
+
+            similarity = np.maximum(0.0, 1.0 - distance)
+            style_code = self._style_code(learning_style, register=False)
+            if style_code >= 0:
+                same_style = self._styles[:size] == style_code
+                similarity = np.where(
+                    same_style,
+                    np.minimum(0.99, similarity + _LEARNING_STYLE_BONUS),
+                    similarity,
+                )
+
+            excluded_row = (
+                self._rows.get(exclude_student_id) if exclude_student_id else None
+            )
+            if excluded_row is not None:
+                similarity[excluded_row] = -np.inf
+
+            top = min(limit, size)
+            # Keep every row tied with the k-th best so ties resolve like a stable sort.
+            kth_best = -np.partition(-similarity, top - 1)[top - 1]
+            candidate_rows = np.flatnonzero(similarity >= kth_best)
+            ordered = candidate_rows[
+                np.lexsort((candidate_rows, -similarity[candidate_rows]))
+            ][:top]
+            return [
+                (float(similarity[row]), self._candidates[row])
+                for row in ordered
+                if similarity[row] != -np.inf
+            ]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "students": self._size,
+                "queries": self.queries,
+                "age_seconds": (
+                    round(time.monotonic() - self.built_at, 1)
+                    if self.built_at is not None
+                    else None
+                ),
+            }
@@ -3,13 +3,20 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import json
+import logging
 from dataclasses import dataclass
 from typing import Any
 
-from sqlalchemy import desc
-from sqlalchemy.orm import Session
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import LRUTTLCache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, AsyncTempStudentsSessionLocal
 from app.models import (
+    AcademicRiskLatestRecord,
     AcademicRiskPredictionRecord,
     TemporaryStudentPredictionRecord,
     TemporaryStudentRecord,
@@ -32,8 +39,17 @@ from app.schemas.academic_risk import (
     StudentInsightsResponse,
 )
 from app.services.academic_risk_service import academic_risk_service
+from app.services.cohort_stats import CohortEntry, CohortStats
+from app.services.similarity_index import SimilarityIndex
 from app.services.sync_service import SyncServiceError, sync_service
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_INSTITUTE_ID = "LMS_INST_A"
+
+# Similarity indexes and cohort stats are partitioned per (source, institute_id)
+CohortKey = tuple[str, str]
+
 
 @dataclass
 class InsightCandidate:
@@ -44,65 +60,167 @@ class InsightCandidate:
     engagement_level: str | None = None
 
 
+@dataclass
+class WhatIfOutcome:
+    """Model response to one perturbed request, relative to the current prediction."""
+
+    request: AcademicRiskRequest
+    prediction: AcademicRiskResponse
+    risk_delta: float
+    level_changed: bool
+
+
+@dataclass
+class StabilityProbe:
+    label: str
+    field: str
+    delta: float
+    unit: str
+    request: AcademicRiskRequest
+
+
 class StudentInsightsService:
     """Build higher-level integrated XAI insights for the results page."""
 
+    def __init__(self) -> None:
+        # One index and cohort per (source, institute), created on first use, so
+        # candidates and cohort aggregates never cross institutes.
+        self.similarity_indexes: dict[CohortKey, SimilarityIndex] = {}
+        self.cohort_stats: dict[CohortKey, CohortStats] = {}
+        self.insights_cache = LRUTTLCache(
+            max_entries=settings.INSIGHTS_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.INSIGHTS_CACHE_TTL_SECONDS,
+        )
+        # Bumped whenever a partition's cohort changes, which retires its cached insights.
+        self._cohort_generations: dict[CohortKey, int] = {}
+        # At most one background rebuild per partition
+        self._refresh_tasks: dict[CohortKey, asyncio.Task] = {}
+
     async def build_insights(
         self,
         payload: StudentInsightsRequest,
-        db: Session,
-        temp_db: Session,
+        db: AsyncSession,
+        temp_db: AsyncSession,
     ) -> StudentInsightsResponse:
         source = payload.source.strip().lower()
         current_request = payload.request_payload
         current_prediction = payload.prediction
+        cohort_key = self._cohort_key(source, payload.institute_id)
+        # One entry per student and partition, valid while its stamp still matches.
+        cache_key = (cohort_key, current_request.student_id)
+        cache_stamp = self._insights_cache_stamp(payload, cohort_key)
+        cached = self.insights_cache.get(cache_key)
+        if cached is not None and cached[0] == cache_stamp:
+            return cached[1].model_copy(deep=True)
+
+        deadline = self._insights_deadline()
+        degraded_sections: list[str] = []
 
         if source == "connected":
-            candidates, learning_style = await self._load_connected_candidates(
-                payload=payload,
-                db=db,
-            )
+            try:
+                candidates, learning_style = await asyncio.wait_for(
+                    self._load_connected_candidates(payload=payload, db=db),
+                    timeout=self._remaining(deadline),
+                )
+            except asyncio.TimeoutError:
+                # Fall back to the materialized index and cohort stats without a live roster.
+                logger.warning(
+                    "Connected roster load for %s exceeded the insights budget",
+                    current_request.student_id,
+                )
+                candidates = [
+                    InsightCandidate(
+                        student_id=current_request.student_id,
+                        request=current_request,
+                        prediction=current_prediction,
+                    )
+                ]
+                learning_style = None
         else:
-            candidates, learning_style = self._load_temporary_candidates(
+            candidates, learning_style = await self._load_temporary_candidates(
                 payload=payload,
                 temp_db=temp_db,
             )
 
+        refresh = self._schedule_refresh(cohort_key)
+        if refresh is not None and self._similarity_index(cohort_key).built_at is None:
+            # A partition's first build may use what is left of the budget; later
+            # rebuilds finish in the background while requests read the current index.
+            await asyncio.wait({refresh}, timeout=self._remaining(deadline))
+        cache_stamp = self._insights_cache_stamp(payload, cohort_key)
+        self._index_candidates(cohort_key, candidates)
+
         ranked_similar_candidates = self._rank_similar_candidates(
+            cohort_key=cohort_key,
             current_request=current_request,
             current_prediction=current_prediction,
             current_learning_style=learning_style,
-            candidates=candidates,
         )
-        similar_cases = self._build_similar_cases(ranked_similar_candidates)
-        interventions = await self._build_ranked_interventions(
-            current_request=current_request,
-            current_prediction=current_prediction,
-            learning_style=learning_style,
+        scenarios = self._intervention_scenarios(current_request, learning_style)
+        probes = self._stability_probes(current_request)
+
+        # Model passes and case-history lookups are independent; run them side by side.
+        what_if_task = asyncio.ensure_future(
+            self._run_what_if(
+                current_prediction,
+                [scenario[2] for scenario in scenarios] + [probe.request for probe in probes],
+            )
+        )
+        explorer_task = asyncio.ensure_future(
+            self._build_case_outcome_explorer(
+                source=source,
+                ranked_candidates=ranked_similar_candidates[:3],
+                db=db,
+                temp_db=temp_db,
+                deadline=deadline,
+            )
         )
+
+        similar_cases = self._build_similar_cases(ranked_similar_candidates)
         cohort_comparison = self._build_cohort_comparison(
             current_request=current_request,
             current_prediction=current_prediction,
-            candidates=candidates,
+            cohort=self._cohort_stats(cohort_key),
         )
         fairness_evaluation = self._build_fairness_evaluation(
             current_request=current_request,
             current_prediction=current_prediction,
             current_learning_style=learning_style,
-            candidates=candidates,
-        )
-        explanation_stability = await self._build_explanation_stability(
-            current_request=current_request,
-            current_prediction=current_prediction,
-        )
-        case_outcome_explorer = await self._build_case_outcome_explorer(
-            source=source,
-            ranked_candidates=ranked_similar_candidates[:3],
-            db=db,
-            temp_db=temp_db,
+            current_engagement_level=candidates[0].engagement_level,
+            cohort=self._cohort_stats(cohort_key),
         )
 
-        return StudentInsightsResponse(
+        await asyncio.wait({what_if_task}, timeout=self._remaining(deadline))
+        # The explorer enforces the deadline itself so it can return the cases it resolved.
+        await asyncio.wait({explorer_task})
+
+        interventions: list[RankedIntervention] = []
+        explanation_stability: ExplanationStabilityEvaluation | None = None
+        outcomes = self._section_result(what_if_task, "what-if scoring")
+        if outcomes is None:
+            degraded_sections.extend(["interventions", "explanation_stability"])
+        else:
+            interventions = self._build_ranked_interventions(
+                current_request=current_request,
+                current_prediction=current_prediction,
+                scenarios=scenarios,
+                outcomes=outcomes[: len(scenarios)],
+            )
+            explanation_stability = self._build_explanation_stability(
+                probes=probes,
+                outcomes=outcomes[len(scenarios) :],
+            )
+
+        case_outcome_explorer: CaseOutcomeExplorer | None = None
+        explorer_result = self._section_result(explorer_task, "case outcome explorer")
+        if explorer_result is None:
+            degraded_sections.append("case_outcome_explorer")
+        else:
+            case_outcome_explorer, explorer_complete = explorer_result
+            if not explorer_complete:
+                degraded_sections.append("case_outcome_explorer")
+
+        response = StudentInsightsResponse(
             student_id=current_request.student_id,
             source=source,
             similar_cases=similar_cases,
@@ -111,16 +229,97 @@ class StudentInsightsService:
             fairness_evaluation=fairness_evaluation,
             explanation_stability=explanation_stability,
             case_outcome_explorer=case_outcome_explorer,
+            degraded_sections=degraded_sections,
         )
+        # Partial responses are not cached, nor ones built while the cohort changed.
+        if not degraded_sections and cache_stamp == self._insights_cache_stamp(
+            payload, cohort_key
+        ):
+            self.insights_cache.set(cache_key, (cache_stamp, response.model_copy(deep=True)))
+        return response
+
+    def _insights_cache_stamp(
+        self,
+        payload: StudentInsightsRequest,
+        cohort_key: CohortKey,
+    ) -> tuple[Any, ...]:
+        request_fingerprint = hashlib.sha256(
+            json.dumps(payload.request_payload.model_dump(mode="json"), sort_keys=True).encode()
+        ).hexdigest()
+        return (
+            request_fingerprint,
+            academic_risk_service.model_version,
+            self._cohort_generations.get(cohort_key, 0),
+        )
+
+    @staticmethod
+    def _cohort_key(source: str, institute_id: str | None) -> CohortKey:
+        if source != "connected":
+            # Temporary-student records are not tied to an institute
+            return ("temporary", "")
+        return ("connected", institute_id or DEFAULT_INSTITUTE_ID)
+
+    def _similarity_index(self, cohort_key: CohortKey) -> SimilarityIndex:
+        index = self.similarity_indexes.get(cohort_key)
+        if index is None:
+            index = self.similarity_indexes[cohort_key] = SimilarityIndex(
+                refresh_seconds=settings.SIMILARITY_INDEX_REFRESH_SECONDS
+            )
+        return index
+
+    def _cohort_stats(self, cohort_key: CohortKey) -> CohortStats:
+        cohort = self.cohort_stats.get(cohort_key)
+        if cohort is None:
+            cohort = self.cohort_stats[cohort_key] = CohortStats()
+        return cohort
+
+    def invalidate_cached_insights(
+        self, cohort_key: CohortKey, student_id: str | None = None
+    ) -> None:
+        """Retire the cached insights built against one partition's cohort.
+
+        Other students' entries in the partition are rebuilt on their next
+        request; ``student_id``'s own entry is dropped straight away.
+        """
+        self._cohort_generations[cohort_key] = self._cohort_generations.get(cohort_key, 0) + 1
+        if student_id is not None:
+            self.insights_cache.pop((cohort_key, student_id))
+
+    @staticmethod
+    def _insights_deadline() -> float | None:
+        budget_ms = settings.INSIGHTS_LATENCY_BUDGET_MS
+        if budget_ms <= 0:
+            return None
+        return asyncio.get_running_loop().time() + (budget_ms / 1000.0)
+
+    @staticmethod
+    def _remaining(deadline: float | None) -> float | None:
+        if deadline is None:
+            return None
+        return max(0.0, deadline - asyncio.get_running_loop().time())
+
+    @staticmethod
+    def _section_result(task: asyncio.Future, section: str) -> Any:
+        """Return a finished section's result, or ``None`` if it failed or missed the budget."""
+        if not task.done():
+            task.cancel()
+            logger.warning("Insights section '%s' exceeded the latency budget", section)
+            return None
+        if task.cancelled():
+            return None
+        if task.exception() is not None:
+            logger.warning("Insights section '%s' failed: %s", section, task.exception())
+            return None
+        return task.result()
 
     async def _load_connected_candidates(
         self,
         payload: StudentInsightsRequest,
-        db: Session,
+        db: AsyncSession,
     ) -> tuple[list[InsightCandidate], str | None]:
         current_request = payload.request_payload
         current_prediction = payload.prediction
-        institute_id = payload.institute_id or "LMS_INST_A"
+        institute_id = payload.institute_id or DEFAULT_INSTITUTE_ID
         learning_style: str | None = None
 
         profile = await sync_service.fetch_learning_profile(current_request.student_id)
@@ -163,7 +362,16 @@ class StudentInsightsService:
         except SyncServiceError:
             pass
 
-        candidates.extend(self._build_connected_candidates_from_history(db, current_request.student_id))
+        try:
+            roster_ids = await sync_service.roster_student_ids(institute_id)
+        except SyncServiceError:
+            # History rows cannot be attributed to an institute without its roster.
+            return self._dedupe_candidates(candidates), learning_style
+        candidates.extend(
+            await self._build_connected_candidates_from_history(
+                db, current_request.student_id, student_ids=roster_ids
+            )
+        )
         return self._dedupe_candidates(candidates), learning_style
 
     async def _build_connected_candidates_from_roster(
@@ -172,68 +380,81 @@ class StudentInsightsService:
         profile_map: dict[str, dict[str, Any]],
         current_student_id: str,
     ) -> list[InsightCandidate]:
-        tasks = [
-            self._build_connected_candidate(raw_student, profile_map.get(student_id))
+        roster_students = [
+            (student_id, raw_student)
             for raw_student in roster
             if (student_id := self._extract_student_id(raw_student))
             and student_id != current_student_id
         ]
-
-        if not tasks:
+        if not roster_students:
             return []
 
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        candidates: list[InsightCandidate] = []
-        for result in results:
-            if isinstance(result, InsightCandidate):
-                candidates.append(result)
-        return candidates
+        try:
+            requests_by_student = await sync_service.build_academic_risk_requests_bulk(
+                [student_id for student_id, _ in roster_students],
+                days=14,
+            )
+        except SyncServiceError:
+            return []
 
-    async def _build_connected_candidate(
-        self,
-        raw_student: dict[str, Any],
-        profile: dict[str, Any] | None,
-    ) -> InsightCandidate | None:
-        student_id = self._extract_student_id(raw_student)
-        if student_id is None:
-            return None
+        scored_students = [
+            (student_id, raw_student, requests_by_student[student_id])
+            for student_id, raw_student in roster_students
+            if student_id in requests_by_student
+        ]
+        if not scored_students:
+            return []
 
         try:
-            request = await sync_service.build_academic_risk_request(student_id=student_id, days=14)
-            prediction = await academic_risk_service.predict(request)
+            predictions = await academic_risk_service.predict_batch(
+                [request for _, _, request in scored_students],
+                include_counterfactual=False,
+            )
         except Exception:
-            return None
+            return []
 
-        return InsightCandidate(
-            student_id=student_id,
-            request=request,
-            prediction=prediction,
-            learning_style=(
-                self._normalize_optional_string(profile.get("learning_style"))
-                if isinstance(profile, dict)
-                else None
-            ),
-            engagement_level=self._normalize_optional_string(raw_student.get("engagement_level")),
-        )
+        candidates: list[InsightCandidate] = []
+        for (student_id, raw_student, request), prediction in zip(
+            scored_students, predictions, strict=False
+        ):
+            profile = profile_map.get(student_id)
+            candidates.append(
+                InsightCandidate(
+                    student_id=student_id,
+                    request=request,
+                    prediction=prediction,
+                    learning_style=(
+                        self._normalize_optional_string(profile.get("learning_style"))
+                        if isinstance(profile, dict)
+                        else None
+                    ),
+                    engagement_level=self._normalize_optional_string(
+                        raw_student.get("engagement_level")
+                    ),
+                )
+            )
+        return candidates
 
-    def _build_connected_candidates_from_history(
+    async def _build_connected_candidates_from_history(
         self,
-        db: Session,
-        current_student_id: str,
+        db: AsyncSession,
+        current_student_id: str | None,
+        student_ids: set[str] | None = None,
     ) -> list[InsightCandidate]:
-        records = (
-            db.query(AcademicRiskPredictionRecord)
-            .order_by(desc(AcademicRiskPredictionRecord.created_at))
-            .all()
+        if student_ids is not None and not student_ids:
+            return []
+        statement = select(AcademicRiskLatestRecord).order_by(
+            desc(AcademicRiskLatestRecord.predicted_at)
         )
-
-        latest_by_student: dict[str, AcademicRiskPredictionRecord] = {}
-        for record in records:
-            if record.student_id not in latest_by_student and record.student_id != current_student_id:
-                latest_by_student[record.student_id] = record
+        if current_student_id is not None:
+            statement = statement.where(AcademicRiskLatestRecord.student_id != current_student_id)
+        if student_ids is not None:
+            # Only the roster's rows (and their payloads) are loaded, not every student's
+            statement = statement.where(AcademicRiskLatestRecord.student_id.in_(student_ids))
+        records = (await db.scalars(statement)).all()
 
         candidates: list[InsightCandidate] = []
-        for record in latest_by_student.values():
+        for record in records:
             if not isinstance(record.request_payload, dict) or not isinstance(record.response_payload, dict):
                 continue
             try:
@@ -252,10 +473,10 @@ class StudentInsightsService:
 
         return candidates
 
-    def _load_temporary_candidates(
+    async def _load_temporary_candidates(
         self,
         payload: StudentInsightsRequest,
-        temp_db: Session,
+        temp_db: AsyncSession,
     ) -> tuple[list[InsightCandidate], str | None]:
         current_request = payload.request_payload
         current_prediction = payload.prediction
@@ -268,18 +489,31 @@ class StudentInsightsService:
             )
         ]
 
-        records = (
-            temp_db.query(TemporaryStudentRecord)
-            .order_by(
-                desc(TemporaryStudentRecord.updated_at),
-                desc(TemporaryStudentRecord.created_at),
+        candidates.extend(
+            await self._build_temporary_candidates(
+                temp_db,
+                current_student_id=current_request.student_id,
+                limit=30,
             )
-            .limit(30)
-            .all()
         )
+        return self._dedupe_candidates(candidates), None
 
-        for record in records:
-            if record.student_id == current_request.student_id:
+    async def _build_temporary_candidates(
+        self,
+        temp_db: AsyncSession,
+        current_student_id: str | None,
+        limit: int | None = None,
+    ) -> list[InsightCandidate]:
+        statement = select(TemporaryStudentRecord).order_by(
+            desc(TemporaryStudentRecord.updated_at),
+            desc(TemporaryStudentRecord.created_at),
+        )
+        if limit is not None:
+            statement = statement.limit(limit)
+
+        candidates: list[InsightCandidate] = []
+        for record in (await temp_db.scalars(statement)).all():
+            if record.student_id == current_student_id:
                 continue
             if not isinstance(record.request_payload, dict) or not isinstance(record.response_payload, dict):
                 continue
@@ -297,32 +531,130 @@ class StudentInsightsService:
                     engagement_level=self._derive_engagement_level(request),
                 )
             )
-
-        return self._dedupe_candidates(candidates), None
+        return candidates
 
     def _rank_similar_candidates(
         self,
+        cohort_key: CohortKey,
         current_request: AcademicRiskRequest,
         current_prediction: AcademicRiskResponse,
         current_learning_style: str | None,
-        candidates: list[InsightCandidate],
+        limit: int = 3,
     ) -> list[tuple[float, InsightCandidate]]:
-        ranked_candidates: list[tuple[float, InsightCandidate]] = []
-
-        for candidate in candidates:
-            if candidate.student_id == current_request.student_id:
-                continue
+        return self._similarity_index(cohort_key).nearest(
+            request=current_request,
+            prediction=current_prediction,
+            learning_style=current_learning_style,
+            limit=limit,
+            exclude_student_id=current_request.student_id,
+        )
 
-            similarity = self._similarity_score(
-                current_request=current_request,
-                current_prediction=current_prediction,
-                current_learning_style=current_learning_style,
-                candidate=candidate,
+    def _schedule_refresh(self, cohort_key: CohortKey) -> asyncio.Task | None:
+        """Start rebuilding a stale partition in the background, or join the running rebuild."""
+        if not self._similarity_index(cohort_key).is_stale():
+            return None
+        task = self._refresh_tasks.get(cohort_key)
+        if task is None or task.done() or task.get_loop().is_closed():
+            task = self._refresh_tasks[cohort_key] = asyncio.ensure_future(
+                self._refresh_materialized_views(cohort_key)
             )
-            ranked_candidates.append((similarity, candidate))
+        return task
+
+    async def _refresh_materialized_views(self, cohort_key: CohortKey) -> None:
+        """Rebuild the similarity index and cohort stats from storage.
+
+        Runs on its own session rather than the request's. Stored connected
+        predictions carry no institute, so the institute's roster decides which
+        of them belong to its partition.
+        """
+        index_name, institute_id = cohort_key
+        index = self._similarity_index(cohort_key)
+        session_factory = (
+            AsyncSessionLocal if index_name == "connected" else AsyncTempStudentsSessionLocal
+        )
+
+        async with session_factory() as session:
+            try:
+                if index_name == "connected":
+                    roster_ids = await sync_service.roster_student_ids(institute_id)
+                    stored = await self._build_connected_candidates_from_history(
+                        session, current_student_id=None, student_ids=roster_ids
+                    )
+                else:
+                    stored = await self._build_temporary_candidates(
+                        session, current_student_id=None
+                    )
+            except SyncServiceError as exc:
+                logger.warning(
+                    f"Could not refresh {index_name} similarity index for {institute_id}: {exc}"
+                )
+                return
+            except Exception as exc:
+                await session.rollback()
+                logger.warning(f"Could not refresh {index_name} similarity index: {exc}")
+                return
+
+        index.rebuild(stored)
+        self.invalidate_cached_insights(cohort_key)
+        self._cohort_stats(cohort_key).rebuild(
+            {candidate.student_id: self._cohort_entry(candidate) for candidate in index.candidates()}
+        )
 
-        ranked_candidates.sort(key=lambda item: item[0], reverse=True)
-        return ranked_candidates
+    def _index_candidates(self, cohort_key: CohortKey, candidates: list[InsightCandidate]) -> None:
+        cohort = self._cohort_stats(cohort_key)
+        for candidate in self._similarity_index(cohort_key).upsert_many(candidates):
+            cohort.upsert(candidate.student_id, self._cohort_entry(candidate))
+
+    def _cohort_entry(self, candidate: InsightCandidate) -> CohortEntry:
+        return CohortEntry(
+            metrics={
+                "avg_grade": candidate.request.avg_grade,
+                "completion_rate": candidate.request.assessment_completion_rate * 100.0,
+                "risk_score": candidate.prediction.risk_score,
+            },
+            elevated=self._is_elevated_risk(candidate.prediction),
+            groups={
+                "Learning Style": candidate.learning_style or "Unknown",
+                "Engagement Level": candidate.engagement_level
+                or self._derive_engagement_level(candidate.request),
+                "Performance Band": self._performance_band(candidate.request.avg_grade),
+                "Attempt History": self._attempt_history_group(candidate.request),
+            },
+        )
+
+    def record_prediction(
+        self,
+        source: str,
+        request: AcademicRiskRequest,
+        prediction: AcademicRiskResponse,
+        institute_id: str | None = None,
+    ) -> None:
+        """Keep the index, cohort stats and insights cache current as predictions are persisted.
+
+        Without ``institute_id`` a connected student is updated in every
+        institute partition that already holds them; a student not seen yet
+        joins their institute's partition at its next refresh.
+        """
+        engagement_level = (
+            self._derive_engagement_level(request) if source == "temporary" else None
+        )
+        candidate = InsightCandidate(
+            student_id=request.student_id,
+            request=request,
+            prediction=prediction,
+            engagement_level=engagement_level,
+        )
+        if source == "connected" and institute_id is None:
+            cohort_keys = [
+                key
+                for key, index in self.similarity_indexes.items()
+                if key[0] == "connected" and request.student_id in index
+            ]
+        else:
+            cohort_keys = [self._cohort_key(source, institute_id)]
+        for cohort_key in cohort_keys:
+            self._index_candidates(cohort_key, [candidate])
+            self.invalidate_cached_insights(cohort_key, request.student_id)
 
     def _build_similar_cases(
         self,
@@ -345,21 +677,37 @@ class StudentInsightsService:
             )
         return similar_cases
 
-    async def _build_ranked_interventions(
+    async def _run_what_if(
+        self,
+        current_prediction: AcademicRiskResponse,
+        requests: list[AcademicRiskRequest],
+    ) -> list[WhatIfOutcome]:
+        """Score every perturbed request in one batch and report its shift from the current prediction."""
+        if not requests:
+            return []
+        predictions = await academic_risk_service.score_batch(requests)
+        return [
+            WhatIfOutcome(
+                request=request,
+                prediction=prediction,
+                risk_delta=prediction.risk_score - current_prediction.risk_score,
+                level_changed=prediction.risk_level != current_prediction.risk_level,
+            )
+            for request, prediction in zip(requests, predictions, strict=True)
+        ]
+
+    def _build_ranked_interventions(
         self,
         current_request: AcademicRiskRequest,
         current_prediction: AcademicRiskResponse,
-        learning_style: str | None,
+        scenarios: list[tuple[str, str, AcademicRiskRequest, str, list[str]]],
+        outcomes: list[WhatIfOutcome],
     ) -> list[RankedIntervention]:
-        scenarios = self._intervention_scenarios(current_request, learning_style)
         ranked: list[RankedIntervention] = []
 
-        for title, effort, scenario_request, rationale, evidence in scenarios:
-            simulated_prediction = await academic_risk_service.predict(scenario_request)
-            expected_reduction = max(
-                current_prediction.risk_score - simulated_prediction.risk_score,
-                0.0,
-            )
+        for (title, effort, _, rationale, evidence), outcome in zip(scenarios, outcomes, strict=True):
+            simulated_prediction = outcome.prediction
+            expected_reduction = max(-outcome.risk_delta, 0.0)
             confidence = min(
                 0.95,
                 0.55 + (0.08 * len(evidence)) + (expected_reduction * 0.6),
@@ -414,27 +762,20 @@ class StudentInsightsService:
         self,
         current_request: AcademicRiskRequest,
         current_prediction: AcademicRiskResponse,
-        candidates: list[InsightCandidate],
+        cohort: CohortStats,
     ) -> CohortComparison | None:
-        if not candidates:
+        summary = cohort.summary()
+        if not summary["size"]:
             return None
 
-        unique_candidates = self._dedupe_candidates(candidates)
-        risk_scores = [candidate.prediction.risk_score for candidate in unique_candidates]
-        avg_grades = [candidate.request.avg_grade for candidate in unique_candidates]
-        completion_rates = [
-            candidate.request.assessment_completion_rate * 100.0
-            for candidate in unique_candidates
-        ]
-
-        avg_risk = self._average(risk_scores)
-        avg_grade = self._average(avg_grades)
-        avg_completion = self._average(completion_rates)
+        avg_risk = summary["averages"]["risk_score"]
+        avg_grade = summary["averages"]["avg_grade"]
+        avg_completion = summary["averages"]["completion_rate"]
 
-        risk_percentile = self._percentile_rank(risk_scores, current_prediction.risk_score)
-        performance_percentile = self._percentile_rank(avg_grades, current_request.avg_grade)
-        completion_percentile = self._percentile_rank(
-            completion_rates,
+        risk_percentile = cohort.percentile_rank("risk_score", current_prediction.risk_score)
+        performance_percentile = cohort.percentile_rank("avg_grade", current_request.avg_grade)
+        completion_percentile = cohort.percentile_rank(
+            "completion_rate",
             current_request.assessment_completion_rate * 100.0,
         )
 
@@ -469,7 +810,7 @@ class StudentInsightsService:
         ]
 
         return CohortComparison(
-            cohort_size=len(unique_candidates),
+            cohort_size=summary["size"],
             summary=self._build_cohort_summary(
                 current_prediction=current_prediction,
                 avg_risk=avg_risk,
@@ -490,64 +831,40 @@ class StudentInsightsService:
         current_request: AcademicRiskRequest,
         current_prediction: AcademicRiskResponse,
         current_learning_style: str | None,
-        candidates: list[InsightCandidate],
+        current_engagement_level: str | None,
+        cohort: CohortStats,
     ) -> FairnessEvaluation | None:
-        unique_candidates = self._dedupe_candidates(candidates)
-        if len(unique_candidates) < 2:
+        summary = cohort.summary()
+        if summary["size"] < 2:
             return None
 
-        overall_avg_risk = self._average(
-            [candidate.prediction.risk_score for candidate in unique_candidates]
-        )
-        overall_elevated_rate = self._elevated_risk_rate(unique_candidates)
+        overall_avg_risk = summary["averages"]["risk_score"]
+        overall_elevated_rate = summary["elevated_rate"]
 
         dimensions: list[FairnessDimensionCheck] = []
         alerts: list[FairnessAlert] = []
 
         fairness_dimensions = [
-            (
-                "Learning Style",
-                lambda candidate: candidate.learning_style or "Unknown",
-                current_learning_style or "Unknown",
-            ),
+            ("Learning Style", current_learning_style or "Unknown"),
             (
                 "Engagement Level",
-                lambda candidate: candidate.engagement_level or self._derive_engagement_level(candidate.request),
-                self._derive_engagement_level(current_request, unique_candidates[0].engagement_level),
-            ),
-            (
-                "Performance Band",
-                lambda candidate: self._performance_band(candidate.request.avg_grade),
-                self._performance_band(current_request.avg_grade),
-            ),
-            (
-                "Attempt History",
-                lambda candidate: self._attempt_history_group(candidate.request),
-                self._attempt_history_group(current_request),
+                self._derive_engagement_level(current_request, current_engagement_level),
             ),
+            ("Performance Band", self._performance_band(current_request.avg_grade)),
+            ("Attempt History", self._attempt_history_group(current_request)),
         ]
 
-        for dimension_name, group_getter, current_group in fairness_dimensions:
-            grouped: dict[str, list[InsightCandidate]] = {}
-            for candidate in unique_candidates:
-                label = group_getter(candidate)
-                grouped.setdefault(label, []).append(candidate)
-
-            if len(grouped) < 2:
+        for dimension_name, current_group in fairness_dimensions:
+            group_count, group = cohort.group(dimension_name, current_group)
+            if group_count < 2 or group is None:
                 continue
 
-            group_members = grouped.get(current_group, [])
-            if not group_members:
-                continue
-
-            group_avg_risk = self._average(
-                [candidate.prediction.risk_score for candidate in group_members]
-            )
+            group_avg_risk = group.average_risk
             disparity = group_avg_risk - overall_avg_risk
-            elevated_rate = self._elevated_risk_rate(group_members)
+            elevated_rate = group.elevated_rate
             status = self._fairness_status(
                 disparity=disparity,
-                group_size=len(group_members),
+                group_size=group.size,
                 elevated_rate=elevated_rate,
                 overall_elevated_rate=overall_elevated_rate,
             )
@@ -557,14 +874,14 @@ class StudentInsightsService:
                 group_avg_risk=group_avg_risk,
                 overall_avg_risk=overall_avg_risk,
                 elevated_rate=elevated_rate,
-                group_size=len(group_members),
+                group_size=group.size,
             )
 
             dimensions.append(
                 FairnessDimensionCheck(
                     dimension=dimension_name,
                     current_group=current_group,
-                    group_size=len(group_members),
+                    group_size=group.size,
                     average_risk_score=round(group_avg_risk, 4),
                     cohort_average_risk_score=round(overall_avg_risk, 4),
                     disparity_score=round(disparity, 4),
@@ -602,11 +919,7 @@ class StudentInsightsService:
             alerts=alerts[:3],
         )
 
-    async def _build_explanation_stability(
-        self,
-        current_request: AcademicRiskRequest,
-        current_prediction: AcademicRiskResponse,
-    ) -> ExplanationStabilityEvaluation:
+    def _stability_probes(self, current_request: AcademicRiskRequest) -> list[StabilityProbe]:
         probes = [
             ("Average Grade", "avg_grade", 5.0, "points"),
             ("Grade Consistency", "grade_consistency", 5.0, "points"),
@@ -615,13 +928,8 @@ class StudentInsightsService:
             ("Assessments", "num_assessments", 1.0, "count"),
         ]
 
-        total_runs = 0
-        consistent_runs = 0
-        total_shift = 0.0
-        feature_signals: list[StabilityFeatureSignal] = []
-
+        stability_probes: list[StabilityProbe] = []
         for label, field, delta, unit in probes:
-            probe_results: list[tuple[AcademicRiskResponse, float]] = []
             for direction in (-1.0, 1.0):
                 current_value = float(getattr(current_request, field))
                 updates: dict[str, Any]
@@ -637,21 +945,39 @@ class StudentInsightsService:
                             1.0 if field == "assessment_completion_rate" else 100.0,
                         )
                     }
+                stability_probes.append(
+                    StabilityProbe(
+                        label=label,
+                        field=field,
+                        delta=delta,
+                        unit=unit,
+                        request=self._clone_request(current_request, **updates),
+                    )
+                )
+        return stability_probes
 
-                probe_request = self._clone_request(current_request, **updates)
-                probe_prediction = await academic_risk_service.predict(probe_request)
-                shift = abs(probe_prediction.risk_score - current_prediction.risk_score) * 100.0
-                total_runs += 1
-                total_shift += shift
-                if probe_prediction.risk_level == current_prediction.risk_level:
-                    consistent_runs += 1
-                probe_results.append((probe_prediction, shift))
-
-            max_shift = max((shift for _, shift in probe_results), default=0.0)
-            outcome_changed = any(
-                probe_prediction.risk_level != current_prediction.risk_level
-                for probe_prediction, _ in probe_results
+    def _build_explanation_stability(
+        self,
+        probes: list[StabilityProbe],
+        outcomes: list[WhatIfOutcome],
+    ) -> ExplanationStabilityEvaluation:
+        total_runs = len(outcomes)
+        consistent_runs = sum(1 for outcome in outcomes if not outcome.level_changed)
+        total_shift = sum(abs(outcome.risk_delta) * 100.0 for outcome in outcomes)
+        feature_signals: list[StabilityFeatureSignal] = []
+
+        probes_by_label: dict[str, list[tuple[StabilityProbe, WhatIfOutcome]]] = {}
+        for probe, outcome in zip(probes, outcomes, strict=True):
+            probes_by_label.setdefault(probe.label, []).append((probe, outcome))
+
+        for label, probe_results in probes_by_label.items():
+            probe = probe_results[0][0]
+            field, delta, unit = probe.field, probe.delta, probe.unit
+            max_shift = max(
+                (abs(outcome.risk_delta) * 100.0 for _, outcome in probe_results),
+                default=0.0,
             )
+            outcome_changed = any(outcome.level_changed for _, outcome in probe_results)
             feature_signals.append(
                 StabilityFeatureSignal(
                     feature=label,
@@ -692,20 +1018,60 @@ class StudentInsightsService:
         self,
         source: str,
         ranked_candidates: list[tuple[float, InsightCandidate]],
-        db: Session,
-        temp_db: Session,
-    ) -> CaseOutcomeExplorer | None:
+        db: AsyncSession,
+        temp_db: AsyncSession,
+        deadline: float | None = None,
+    ) -> tuple[CaseOutcomeExplorer | None, bool]:
+        """Build the explorer and report whether every case resolved within ``deadline``."""
         if not ranked_candidates:
-            return None
+            return None, True
 
-        cases: list[CaseOutcomeExplorerEntry] = []
-        for similarity, candidate in ranked_candidates:
-            trajectory, observed_outcome, takeaway = await self._resolve_case_outcome(
-                source=source,
-                candidate=candidate,
-                db=db,
-                temp_db=temp_db,
+        complete = True
+        tasks: list[asyncio.Future | None] = [None] * len(ranked_candidates)
+        try:
+            histories = await asyncio.wait_for(
+                self._load_case_histories(
+                    source=source,
+                    student_ids=[candidate.student_id for _, candidate in ranked_candidates],
+                    db=db,
+                    temp_db=temp_db,
+                ),
+                timeout=self._remaining(deadline),
             )
+        except asyncio.TimeoutError:
+            complete = False
+        except Exception as exc:
+            complete = False
+            logger.warning("Could not load case outcome histories: %s", exc)
+            # Leave the session usable for the rest of the request.
+            await (temp_db if source == "temporary" else db).rollback()
+        else:
+            tasks = [
+                asyncio.ensure_future(
+                    self._resolve_case_outcome(
+                        source=source,
+                        candidate=candidate,
+                        history=histories.get(candidate.student_id, []),
+                    )
+                )
+                for _, candidate in ranked_candidates
+            ]
+            await asyncio.wait(tasks, timeout=self._remaining(deadline))
+
+        cases: list[CaseOutcomeExplorerEntry] = []
+        for (similarity, candidate), task in zip(ranked_candidates, tasks, strict=True):
+            if (
+                task is not None
+                and task.done()
+                and not task.cancelled()
+                and task.exception() is None
+            ):
+                trajectory, observed_outcome, takeaway = task.result()
+            else:
+                if task is not None and not task.done():
+                    task.cancel()
+                    complete = False
+                trajectory, observed_outcome, takeaway = self._insufficient_case_outcome(candidate)
             cases.append(
                 CaseOutcomeExplorerEntry(
                     student_id=candidate.student_id,
@@ -724,43 +1090,62 @@ class StudentInsightsService:
                 )
             )
 
-        return CaseOutcomeExplorer(
-            summary=self._case_outcome_summary(cases),
-            cases=cases,
+        return (
+            CaseOutcomeExplorer(
+                summary=self._case_outcome_summary(cases),
+                cases=cases,
+            ),
+            complete,
         )
 
-    async def _resolve_case_outcome(
+    async def _load_case_histories(
         self,
         source: str,
-        candidate: InsightCandidate,
-        db: Session,
-        temp_db: Session,
-    ) -> tuple[str, str, str]:
+        student_ids: list[str],
+        db: AsyncSession,
+        temp_db: AsyncSession,
+        per_student: int = 4,
+    ) -> dict[str, list[tuple[float, str]]]:
+        """Return each student's last ``per_student`` saved predictions, oldest first."""
         if source == "temporary":
-            records = (
-                temp_db.query(TemporaryStudentPredictionRecord)
-                .filter(TemporaryStudentPredictionRecord.student_id == candidate.student_id)
-                .order_by(desc(TemporaryStudentPredictionRecord.created_at))
-                .limit(4)
-                .all()
-            )
-            return self._summarize_record_history(
-                [(float(record.risk_score), record.risk_level) for record in reversed(records)],
-                candidate,
+            record_model, session = TemporaryStudentPredictionRecord, temp_db
+        else:
+            record_model, session = AcademicRiskPredictionRecord, db
+
+        recent = (
+            select(
+                record_model.student_id,
+                record_model.risk_score,
+                record_model.risk_level,
+                func.row_number()
+                .over(
+                    partition_by=record_model.student_id,
+                    order_by=(desc(record_model.created_at), desc(record_model.id)),
+                )
+                .label("recency"),
             )
-
-        records = (
-            db.query(AcademicRiskPredictionRecord)
-            .filter(AcademicRiskPredictionRecord.student_id == candidate.student_id)
-            .order_by(desc(AcademicRiskPredictionRecord.created_at))
-            .limit(4)
-            .all()
+            .where(record_model.student_id.in_(student_ids))
+            .subquery()
         )
-        if records:
-            return self._summarize_record_history(
-                [(float(record.risk_score), record.risk_level) for record in reversed(records)],
-                candidate,
-            )
+        result = await session.execute(
+            select(recent.c.student_id, recent.c.risk_score, recent.c.risk_level)
+            .where(recent.c.recency <= per_student)
+            .order_by(recent.c.student_id, desc(recent.c.recency))
+        )
+
+        histories: dict[str, list[tuple[float, str]]] = {}
+        for student_id, risk_score, risk_level in result.all():
+            histories.setdefault(student_id, []).append((float(risk_score), risk_level))
+        return histories
+
+    async def _resolve_case_outcome(
+        self,
+        source: str,
+        candidate: InsightCandidate,
+        history: list[tuple[float, str]],
+    ) -> tuple[str, str, str]:
+        if history or source == "temporary":
+            return self._summarize_record_history(history, candidate)
 
         try:
             timeline = await sync_service.build_connected_timeline(
@@ -773,11 +1158,15 @@ class StudentInsightsService:
                 candidate,
             )
         except Exception:
-            return (
-                "insufficient_data",
-                f"Current outcome is {candidate.prediction.risk_level}.",
-                "Only a single comparable prediction is available for this case.",
-            )
+            return self._insufficient_case_outcome(candidate)
+
+    @staticmethod
+    def _insufficient_case_outcome(candidate: InsightCandidate) -> tuple[str, str, str]:
+        return (
+            "insufficient_data",
+            f"Current outcome is {candidate.prediction.risk_level}.",
+            "Only a single comparable prediction is available for this case.",
+        )
 
     def _summarize_record_history(
         self,
@@ -818,57 +1207,6 @@ class StudentInsightsService:
         )
         return trajectory, observed_outcome, takeaway
 
-    def _similarity_score(
-        self,
-        current_request: AcademicRiskRequest,
-        current_prediction: AcademicRiskResponse,
-        current_learning_style: str | None,
-        candidate: InsightCandidate,
-    ) -> float:
-        distance = 0.0
-        distance += abs(current_request.avg_grade - candidate.request.avg_grade) / 100.0 * 0.30
-        distance += (
-            abs(
-                current_request.assessment_completion_rate
-                - candidate.request.assessment_completion_rate
-            )
-            * 0.25
-        )
-        distance += (
-            abs(current_request.grade_consistency - candidate.request.grade_consistency)
-            / 100.0
-            * 0.15
-        )
-        distance += abs(current_request.grade_range - candidate.request.grade_range) / 100.0 * 0.10
-        distance += (
-            abs(current_request.num_assessments - candidate.request.num_assessments)
-            / 20.0
-            * 0.10
-        )
-        distance += abs(current_prediction.risk_score - candidate.prediction.risk_score) * 0.10
-
-        if current_request.low_engagement != candidate.request.low_engagement:
-            distance += 0.05
-        if current_request.low_performance != candidate.request.low_performance:
-            distance += 0.05
-        if current_request.has_previous_attempts != candidate.request.has_previous_attempts:
-            distance += 0.03
-
-        current_band = self._risk_band_index(current_prediction.risk_level)
-        candidate_band = self._risk_band_index(candidate.prediction.risk_level)
-        band_gap = abs(current_band - candidate_band)
-        if band_gap:
-            distance += 0.12 * band_gap
-            if current_band == 0 and candidate_band == 2:
-                distance += 0.18
-            elif current_band == 2 and candidate_band == 0:
-                distance += 0.10
-
-        similarity = max(0.0, 1.0 - distance)
-        if current_learning_style and candidate.learning_style == current_learning_style:
-            similarity = min(0.99, similarity + 0.05)
-        return similarity
-
     def _build_similarity_explanation(
         self,
         current_request: AcademicRiskRequest,
@@ -1069,19 +1407,6 @@ class StudentInsightsService:
         student_id = str(raw_student.get("student_id") or "").strip()
         return student_id or None
 
-    @staticmethod
-    def _average(values: list[float]) -> float:
-        if not values:
-            return 0.0
-        return sum(values) / len(values)
-
-    @staticmethod
-    def _percentile_rank(values: list[float], current_value: float) -> float:
-        if not values:
-            return 0.0
-        count = sum(1 for value in values if value <= current_value)
-        return (count / len(values)) * 100.0
-
     @staticmethod
     def _comparison_direction(student_value: float, cohort_average: float) -> str:
         delta = student_value - cohort_average
@@ -1198,26 +1523,11 @@ class StudentInsightsService:
     def _attempt_history_group(request: AcademicRiskRequest) -> str:
         return "Has previous attempts" if request.num_of_prev_attempts > 0 else "First attempt"
 
-    @staticmethod
-    def _risk_band_index(risk_level: str) -> int:
-        normalized = (risk_level or "").strip().lower()
-        if "safe" in normalized:
-            return 0
-        if "medium" in normalized:
-            return 1
-        return 2
-
     @staticmethod
     def _is_elevated_risk(prediction: AcademicRiskResponse) -> bool:
         normalized = prediction.risk_level.strip().lower()
         return normalized in {"medium risk", "at-risk", "at risk", "high", "high risk"}
 
-    def _elevated_risk_rate(self, candidates: list[InsightCandidate]) -> float:
-        if not candidates:
-            return 0.0
-        elevated = sum(1 for candidate in candidates if self._is_elevated_risk(candidate.prediction))
-        return (elevated / len(candidates)) * 100.0
-
     @staticmethod
     def _fairness_status(
         disparity: float,
@@ -0,0 +1,100 @@
+"""Prefix and n-gram search over a connected institute roster."""
+
+from __future__ import annotations
+
+import bisect
+import time
+from typing import Any
+
+MAX_GRAM_SIZE = 3
+
+
+def search_sort_key(student_id: str, search_query: str) -> tuple[int, str]:
+    """Order exact matches first, then prefix matches, then other substring matches."""
+    normalized = student_id.lower()
+    if normalized == search_query:
+        return (0, student_id)
+    if normalized.startswith(search_query):
+        return (1, student_id)
+    return (2, student_id)
+
+
+def _grams(text: str, size: int) -> set[str]:
+    return {text[start : start + size] for start in range(len(text) - size + 1)}
+
+
+class RosterSearchIndex:
+    """Substring search over one institute's roster without scanning it.
+
+    Every lower-cased student ID is posted under each of its 1-, 2- and
+    3-grams. A query intersects the postings of its own n-grams (of the
+    largest size it allows), verifies the survivors and orders them with
+    ``search_sort_key``, so pages can be resumed from the last returned key.
+    """
+
+    def __init__(self, students: list[dict[str, Any]]) -> None:
+        self.students: dict[str, dict[str, Any]] = {}
+        self._postings: dict[str, set[str]] = {}
+        for raw_student in students:
+            if not isinstance(raw_student, dict):
+                continue
+            student_id = str(raw_student.get("student_id") or "").strip()
+            if not student_id or student_id in self.students:
+                continue
+            self.students[student_id] = raw_student
+            normalized = student_id.lower()
+            for size in range(1, MAX_GRAM_SIZE + 1):
+                for gram in _grams(normalized, size):
+                    self._postings.setdefault(gram, set()).add(student_id)
+        self._sorted_ids = sorted(self.students)
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.students)
+
+    def age_seconds(self) -> float:
+        return time.monotonic() - self.built_at
+
+    def search(self, search_query: str) -> list[str]:
+        """Return every matching student ID, in result order."""
+        if not search_query:
+            return list(self._sorted_ids)
+
+        size = min(MAX_GRAM_SIZE, len(search_query))
+        postings = sorted(
+            (self._postings.get(gram, set()) for gram in _grams(search_query, size)),
+            key=len,
+        )
+        if not postings or not postings[0]:
+            return []
+        candidates = set(postings[0]).intersection(*postings[1:])
+        matches = [
+            student_id
+            for student_id in candidates
+            if search_query in student_id.lower()
+        ]
+        matches.sort(key=lambda student_id: search_sort_key(student_id, search_query))
+        return matches
+
+    def page(
+        self,
+        search_query: str,
+        limit: int,
+        after: tuple[int, str] | None = None,
+    ) -> tuple[list[str], int, tuple[int, str] | None]:
+        """Return ``(ids, total matches, key of the last id when more remain)``."""
+        matches = self.search(search_query)
+        start = 0
+        if after is not None:
+            start = bisect.bisect_right(
+                matches,
+                after,
+                key=lambda student_id: search_sort_key(student_id, search_query),
+            )
+        page_ids = matches[start : start + limit]
+        next_key = (
+            search_sort_key(page_ids[-1], search_query)
+            if page_ids and start + limit < len(matches)
+            else None
+        )
+        return page_ids, len(matches), next_key
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import asyncio
+import json
 from dataclasses import dataclass
 from datetime import date, datetime
 from typing import Any
@@ -10,6 +11,8 @@ from typing import Any
 import httpx
 
 from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.pagination import InvalidCursorError, decode_cursor, encode_cursor
 from app.schemas.academic_risk import (
     AcademicRiskRequest,
     RiskTimelinePoint,
@@ -21,6 +24,15 @@ from app.schemas.student_lookup import (
     ConnectedStudentSummary,
 )
 from app.services.academic_risk_service import academic_risk_service
+from app.services.http_client import upstream_http_client
+from app.services.student_search_index import RosterSearchIndex
+from app.services.upstream_cache import UpstreamCache, build_cache_backend
+
+logger = get_logger(__name__)
+
+# The engagement roster is paged in at most ROSTER_MAX_PAGES * ROSTER_PAGE_SIZE students
+ROSTER_PAGE_SIZE = 1000
+ROSTER_MAX_PAGES = 50
 
 
 @dataclass
@@ -31,12 +43,47 @@ class SyncServiceError(Exception):
     detail: str
 
 
+@dataclass
+class _RunningSeries:
+    """Running sum/min/max of a score series, as consumed by the request mapper."""
+
+    total: float = 0.0
+    count: int = 0
+    minimum: float = float("inf")
+    maximum: float = float("-inf")
+    first_key: float | None = None
+    varied: bool = False
+
+    def add(self, value: float) -> None:
+        self.total += value
+        self.count += 1
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        key = round(value, 4)
+        if self.first_key is None:
+            self.first_key = key
+        elif key != self.first_key:
+            self.varied = True
+
+    @classmethod
+    def of(cls, values: list[float]) -> "_RunningSeries":
+        series = cls()
+        for value in values:
+            series.add(value)
+        return series
+
+
 class XAIFeatureSyncService:
     """Collect and map features from engagement + learning-style services."""
 
     def __init__(self) -> None:
         self.engagement_base_url = settings.ENGAGEMENT_SERVICE_URL.rstrip("/")
         self.learning_style_base_url = settings.LEARNING_STYLE_SERVICE_URL.rstrip("/")
+        self.http = upstream_http_client
+        self.cache = UpstreamCache(build_cache_backend())
+        self._search_indexes: dict[str, RosterSearchIndex] = {}
+        # One in-flight roster rebuild per institute, shared by concurrent callers
+        self._roster_rebuilds: dict[str, asyncio.Task] = {}
 
     async def build_prediction_request(
         self, student_id: str, days: int = 14
@@ -66,6 +113,88 @@ class XAIFeatureSyncService:
             profile=profile,
         )
 
+    async def build_academic_risk_requests_bulk(
+        self, student_ids: list[str], days: int = 14
+    ) -> dict[str, AcademicRiskRequest]:
+        """Build academic-risk requests for many students in a constant number of round-trips.
+
+        Students without engagement data are left out of the result. Falls back to
+        per-student fetches when an upstream does not expose the bulk endpoints.
+        """
+        student_ids = list(dict.fromkeys(student_id for student_id in student_ids if student_id))
+        if not student_ids:
+            return {}
+
+        features_payload, profiles_payload = await asyncio.gather(
+            self._fetch_json_optional_post(
+                url=f"{self.engagement_base_url}/api/v1/students/bulk-features",
+                payload={"student_ids": student_ids, "days": days},
+            ),
+            self._fetch_json_optional_post(
+                url=f"{self.learning_style_base_url}/api/v1/students/bulk",
+                payload={"student_ids": student_ids},
+            ),
+        )
+
+        bundles = features_payload.get("students") if isinstance(features_payload, dict) else None
+        if not isinstance(bundles, list):
+            return await self._build_academic_risk_requests_individually(student_ids, days)
+
+        if isinstance(profiles_payload, list):
+            profile_map = {
+                str(profile.get("student_id")): profile
+                for profile in profiles_payload
+                if isinstance(profile, dict)
+            }
+        else:
+            profile_map = await self._fetch_learning_profiles_individually(student_ids)
+
+        requests: dict[str, AcademicRiskRequest] = {}
+        for bundle in bundles:
+            if not isinstance(bundle, dict) or not isinstance(bundle.get("latest"), dict):
+                continue
+            student_id = str(bundle.get("student_id") or "").strip()
+            if not student_id:
+                continue
+            history = bundle.get("history")
+            metrics = bundle.get("metrics")
+            requests[student_id] = self._map_to_academic_risk_request(
+                student_id=student_id,
+                latest_score=bundle["latest"],
+                history=history if isinstance(history, list) and history else [bundle["latest"]],
+                daily_metrics=metrics if isinstance(metrics, list) else [],
+                profile=profile_map.get(student_id),
+            )
+        return requests
+
+    async def _build_academic_risk_requests_individually(
+        self, student_ids: list[str], days: int
+    ) -> dict[str, AcademicRiskRequest]:
+        results = await asyncio.gather(
+            *(
+                self.build_academic_risk_request(student_id=student_id, days=days)
+                for student_id in student_ids
+            ),
+            return_exceptions=True,
+        )
+        return {
+            student_id: result
+            for student_id, result in zip(student_ids, results, strict=False)
+            if isinstance(result, AcademicRiskRequest)
+        }
+
+    async def _fetch_learning_profiles_individually(
+        self, student_ids: list[str]
+    ) -> dict[str, dict[str, Any]]:
+        profiles = await asyncio.gather(
+            *(self.fetch_learning_profile(student_id) for student_id in student_ids)
+        )
+        return {
+            student_id: profile
+            for student_id, profile in zip(student_ids, profiles, strict=False)
+            if profile is not None
+        }
+
     async def build_connected_timeline(
         self,
         student_id: str,
@@ -86,27 +215,21 @@ class XAIFeatureSyncService:
         normalized_history = self._normalize_entries_by_date(history)
         normalized_metrics = self._normalize_entries_by_date(daily_metrics)
         selected_history = self._select_timeline_entries(normalized_history, limit)
+        timeline = self._build_timeline_requests(
+            student_id=student_id,
+            history=normalized_history,
+            metrics=normalized_metrics,
+            selected=selected_history,
+            profile=profile,
+        )
+        predictions = await academic_risk_service.score_batch(
+            [request for _, request in timeline]
+        )
+
         points: list[RiskTimelinePoint] = []
         previous_request_payload: dict[str, Any] | None = None
-
-        for entry in selected_history:
-            if not isinstance(entry, dict):
-                continue
-
-            entry_date = self._extract_entry_date(entry)
-            history_slice = self._history_until_date(normalized_history, entry_date)
-            metrics_slice = self._metrics_until_date(normalized_metrics, entry_date)
-            request = self._map_to_academic_risk_request(
-                student_id=student_id,
-                latest_score=entry,
-                history=history_slice,
-                daily_metrics=metrics_slice,
-                profile=profile,
-                timeline_mode=True,
-            )
-            prediction = await academic_risk_service.predict(request)
+        for (entry, request), prediction in zip(timeline, predictions, strict=False):
             request_payload = request.model_dump(mode="json")
-
             points.append(
                 RiskTimelinePoint(
                     timestamp=self._timeline_timestamp(entry),
@@ -145,69 +268,128 @@ class XAIFeatureSyncService:
         query: str = "",
         limit: int = 10,
         institute_id: str = "LMS_INST_A",
+        cursor: str | None = None,
     ) -> ConnectedStudentSearchResponse:
         search_query = query.strip().lower()
-        fetch_limit = min(max(limit * 5, 100), 1000)
-        students_data, profile_map = await self.fetch_student_roster(
+        after: tuple[int, str] | None = None
+        if cursor:
+            rank, student_id = decode_cursor(cursor, 2)
+            if not isinstance(rank, int) or not isinstance(student_id, str):
+                raise InvalidCursorError("cursor is not valid")
+            after = (rank, student_id)
+
+        index = await self._roster_search_index(institute_id)
+        page_ids, total, next_key = index.page(search_query, limit, after)
+        profile_map = await self._fetch_learning_profiles(page_ids) if page_ids else {}
+
+        matches = [
+            self._connected_student_summary(index.students[student_id], profile_map.get(student_id))
+            for student_id in page_ids
+        ]
+        if matches:
+            matches = await self._apply_xai_risk_preview(matches)
+
+        return ConnectedStudentSearchResponse(
+            query=query,
+            total=total,
+            limit=limit,
             institute_id=institute_id,
-            limit=fetch_limit,
+            students=matches,
+            next_cursor=encode_cursor(*next_key) if next_key is not None else None,
         )
 
-        matches: list[ConnectedStudentSummary] = []
-        for raw_student in students_data:
-            if not isinstance(raw_student, dict):
-                continue
-            student_id = str(raw_student.get("student_id") or "").strip()
-            if not student_id:
-                continue
-            if search_query and search_query not in student_id.lower():
-                continue
+    async def roster_student_ids(self, institute_id: str) -> set[str]:
+        """Return the IDs on an institute's roster, served from its search index."""
+        return set((await self._roster_search_index(institute_id)).students)
 
-            profile = profile_map.get(student_id)
-            matches.append(
-                ConnectedStudentSummary(
-                    student_id=student_id,
-                    engagement_score=round(
-                        self._to_float(raw_student.get("engagement_score"), 0.0), 2
-                    ),
-                    engagement_level=str(raw_student.get("engagement_level") or "Unknown"),
-                    engagement_trend=raw_student.get("engagement_trend"),
-                    risk_level=str(raw_student.get("risk_level") or "Unknown"),
-                    risk_probability=self._to_optional_probability(
-                        raw_student.get("risk_probability")
-                    ),
-                    learning_style=(
-                        str(profile.get("learning_style"))
-                        if isinstance(profile, dict) and profile.get("learning_style")
-                        else None
-                    ),
-                    avg_completion_rate=self._to_optional_percentage(
-                        profile.get("avg_completion_rate") if isinstance(profile, dict) else None
-                    ),
-                    has_learning_profile=profile is not None,
-                    last_updated=(
-                        str(raw_student.get("last_updated"))
-                        if raw_student.get("last_updated") is not None
-                        else None
-                    ),
-                )
-            )
+    async def _roster_search_index(self, institute_id: str) -> RosterSearchIndex:
+        """Return the institute's roster index, rebuilding it once the roster TTL has passed."""
+        index = self._search_indexes.get(institute_id)
+        if index is not None and index.age_seconds() < settings.UPSTREAM_CACHE_ROSTER_TTL_SECONDS:
+            return index
 
-        if search_query:
-            matches.sort(key=lambda student: self._search_sort_key(student.student_id, search_query))
-        else:
-            matches.sort(key=lambda student: student.student_id)
-
-        top_matches = matches[:limit]
-        if top_matches:
-            top_matches = await self._apply_xai_risk_preview(top_matches)
+        rebuild = self._roster_rebuilds.get(institute_id)
+        if rebuild is None or rebuild.done() or rebuild.get_loop().is_closed():
+            rebuild = self._roster_rebuilds[institute_id] = asyncio.ensure_future(
+                self._rebuild_roster_search_index(institute_id)
+            )
+        try:
+            # Shielded so one caller giving up does not cancel the others' rebuild
+            return await asyncio.shield(rebuild)
+        except SyncServiceError:
+            if index is None:
+                raise
+            logger.warning(f"Serving a stale roster search index for {institute_id}")
+            return index
+
+    async def _rebuild_roster_search_index(self, institute_id: str) -> RosterSearchIndex:
+        students = await self._fetch_full_roster(institute_id)
+        index = self._search_indexes[institute_id] = RosterSearchIndex(students)
+        return index
+
+    async def _fetch_full_roster(self, institute_id: str) -> list[dict[str, Any]]:
+        students: list[dict[str, Any]] = []
+        for page in range(ROSTER_MAX_PAGES):
+            payload = await self._fetch_json(
+                url=f"{self.engagement_base_url}/api/v1/students/list",
+                service_name="engagement",
+                not_found_detail="No students found in engagement service",
+                params={
+                    "limit": ROSTER_PAGE_SIZE,
+                    "offset": page * ROSTER_PAGE_SIZE,
+                    "institute_id": institute_id,
+                },
+            )
+            page_students = payload.get("students") if isinstance(payload, dict) else None
+            if not isinstance(page_students, list):
+                raise SyncServiceError(
+                    status_code=502,
+                    detail="Unexpected response format for engagement student list",
+                )
+            students.extend(page_students)
+            if len(page_students) < ROSTER_PAGE_SIZE:
+                break
+        return students
+
+    async def _fetch_learning_profiles(self, student_ids: list[str]) -> dict[str, dict[str, Any]]:
+        profiles_payload = await self._fetch_json_optional_post(
+            url=f"{self.learning_style_base_url}/api/v1/students/bulk",
+            payload={"student_ids": student_ids},
+        )
+        if not isinstance(profiles_payload, list):
+            return await self._fetch_learning_profiles_individually(student_ids)
+        return {
+            str(profile.get("student_id")): profile
+            for profile in profiles_payload
+            if isinstance(profile, dict)
+        }
 
-        return ConnectedStudentSearchResponse(
-            query=query,
-            total=len(matches),
-            limit=limit,
-            institute_id=institute_id,
-            students=top_matches,
+    def _connected_student_summary(
+        self,
+        raw_student: dict[str, Any],
+        profile: dict[str, Any] | None,
+    ) -> ConnectedStudentSummary:
+        return ConnectedStudentSummary(
+            student_id=str(raw_student.get("student_id")).strip(),
+            engagement_score=round(self._to_float(raw_student.get("engagement_score"), 0.0), 2),
+            engagement_level=str(raw_student.get("engagement_level") or "Unknown"),
+            engagement_trend=raw_student.get("engagement_trend"),
+            risk_level=str(raw_student.get("risk_level") or "Unknown"),
+            risk_probability=self._to_optional_probability(raw_student.get("risk_probability")),
+            learning_style=(
+                str(profile.get("learning_style"))
+                if isinstance(profile, dict) and profile.get("learning_style")
+                else None
+            ),
+            avg_completion_rate=self._to_optional_percentage(
+                profile.get("avg_completion_rate") if isinstance(profile, dict) else None
+            ),
+            has_learning_profile=profile is not None,
+            last_updated=(
+                str(raw_student.get("last_updated"))
+                if raw_student.get("last_updated") is not None
+                else None
+            ),
         )
 
     async def fetch_student_roster(
@@ -215,20 +397,16 @@ class XAIFeatureSyncService:
         institute_id: str,
         limit: int = 200,
     ) -> tuple[list[dict[str, Any]], dict[str, dict[str, Any]]]:
-        timeout = httpx.Timeout(settings.SYNC_TIMEOUT_SECONDS)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            students_payload = await self._fetch_json(
-                client=client,
-                url=f"{self.engagement_base_url}/api/v1/students/list",
-                service_name="engagement",
-                not_found_detail="No students found in engagement service",
-                params={"limit": limit, "institute_id": institute_id},
-            )
-            profiles_payload = await self._fetch_json_optional(
-                client=client,
-                url=f"{self.learning_style_base_url}/api/v1/students/",
-                params={"limit": limit},
-            )
+        students_payload = await self._fetch_json(
+            url=f"{self.engagement_base_url}/api/v1/students/list",
+            service_name="engagement",
+            not_found_detail="No students found in engagement service",
+            params={"limit": limit, "institute_id": institute_id},
+        )
+        profiles_payload = await self._fetch_json_optional(
+            url=f"{self.learning_style_base_url}/api/v1/students/",
+            params={"limit": limit},
+        )
 
         students_data = (
             students_payload.get("students") if isinstance(students_payload, dict) else None
@@ -251,12 +429,9 @@ class XAIFeatureSyncService:
         return students_data, profile_map
 
     async def fetch_learning_profile(self, student_id: str) -> dict[str, Any] | None:
-        timeout = httpx.Timeout(settings.SYNC_TIMEOUT_SECONDS)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            profile = await self._fetch_json_optional(
-                client=client,
-                url=f"{self.learning_style_base_url}/api/v1/students/{student_id}",
-            )
+        profile = await self._fetch_json_optional(
+            url=f"{self.learning_style_base_url}/api/v1/students/{student_id}",
+        )
 
         if profile is not None and not isinstance(profile, dict):
             return None
@@ -291,45 +466,40 @@ class XAIFeatureSyncService:
 
     async def _build_student_preview(self, student_id: str) -> tuple[str, float]:
         request = await self.build_academic_risk_request(student_id=student_id, days=14)
-        prediction = await academic_risk_service.predict(request)
+        prediction = await academic_risk_service.score(request)
         return prediction.risk_level, prediction.risk_score
 
     async def _fetch_upstream_data(
         self, student_id: str, days: int
     ) -> tuple[dict[str, Any], list[dict[str, Any]], dict[str, Any]]:
-        timeout = httpx.Timeout(settings.SYNC_TIMEOUT_SECONDS)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            latest_url = (
-                f"{self.engagement_base_url}/api/v1/engagement/students/{student_id}/latest"
-            )
-            metrics_url = (
-                f"{self.engagement_base_url}/api/v1/engagement/students/{student_id}/metrics"
-            )
-            profile_url = f"{self.learning_style_base_url}/api/v1/students/{student_id}"
+        latest_url = (
+            f"{self.engagement_base_url}/api/v1/engagement/students/{student_id}/latest"
+        )
+        metrics_url = (
+            f"{self.engagement_base_url}/api/v1/engagement/students/{student_id}/metrics"
+        )
+        profile_url = f"{self.learning_style_base_url}/api/v1/students/{student_id}"
 
-            latest_task = self._fetch_json(
-                client=client,
-                url=latest_url,
-                service_name="engagement",
-                not_found_detail=f"Engagement data not found for student {student_id}",
-            )
-            metrics_task = self._fetch_json(
-                client=client,
-                url=metrics_url,
-                service_name="engagement",
-                not_found_detail=f"Engagement metrics not found for student {student_id}",
-                params={"days": days},
-            )
-            profile_task = self._fetch_json(
-                client=client,
-                url=profile_url,
-                service_name="learning-style",
-                not_found_detail=f"Learning profile not found for student {student_id}",
-            )
+        latest_task = self._fetch_json(
+            url=latest_url,
+            service_name="engagement",
+            not_found_detail=f"Engagement data not found for student {student_id}",
+        )
+        metrics_task = self._fetch_json(
+            url=metrics_url,
+            service_name="engagement",
+            not_found_detail=f"Engagement metrics not found for student {student_id}",
+            params={"days": days},
+        )
+        profile_task = self._fetch_json(
+            url=profile_url,
+            service_name="learning-style",
+            not_found_detail=f"Learning profile not found for student {student_id}",
+        )
 
-            latest_score, metrics_data, profile = await asyncio.gather(
-                latest_task, metrics_task, profile_task
-            )
+        latest_score, metrics_data, profile = await asyncio.gather(
+            latest_task, metrics_task, profile_task
+        )
 
         if not isinstance(metrics_data, list):
             raise SyncServiceError(
@@ -342,35 +512,29 @@ class XAIFeatureSyncService:
     async def _fetch_academic_upstream_data(
         self, student_id: str, days: int
     ) -> tuple[dict[str, Any], list[dict[str, Any]], list[dict[str, Any]], dict[str, Any] | None]:
-        timeout = httpx.Timeout(settings.SYNC_TIMEOUT_SECONDS)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            latest_task = self._fetch_json(
-                client=client,
-                url=f"{self.engagement_base_url}/api/v1/engagement/students/{student_id}/latest",
-                service_name="engagement",
-                not_found_detail=f"Engagement data not found for student {student_id}",
-            )
-            history_task = self._fetch_json_optional(
-                client=client,
-                url=f"{self.engagement_base_url}/api/v1/engagement/students/{student_id}/history",
-                params={"days": days},
-            )
-            metrics_task = self._fetch_json_optional(
-                client=client,
-                url=f"{self.engagement_base_url}/api/v1/engagement/students/{student_id}/metrics",
-                params={"days": days},
-            )
-            profile_task = self._fetch_json_optional(
-                client=client,
-                url=f"{self.learning_style_base_url}/api/v1/students/{student_id}",
-            )
+        latest_task = self._fetch_json(
+            url=f"{self.engagement_base_url}/api/v1/engagement/students/{student_id}/latest",
+            service_name="engagement",
+            not_found_detail=f"Engagement data not found for student {student_id}",
+        )
+        history_task = self._fetch_json_optional(
+            url=f"{self.engagement_base_url}/api/v1/engagement/students/{student_id}/history",
+            params={"days": days},
+        )
+        metrics_task = self._fetch_json_optional(
+            url=f"{self.engagement_base_url}/api/v1/engagement/students/{student_id}/metrics",
+            params={"days": days},
+        )
+        profile_task = self._fetch_json_optional(
+            url=f"{self.learning_style_base_url}/api/v1/students/{student_id}",
+        )
 
-            latest_score, history, metrics, profile = await asyncio.gather(
-                latest_task,
-                history_task,
-                metrics_task,
-                profile_task,
-            )
+        latest_score, history, metrics, profile = await asyncio.gather(
+            latest_task,
+            history_task,
+            metrics_task,
+            profile_task,
+        )
 
         if history is None:
             history = [latest_score]
@@ -392,16 +556,62 @@ class XAIFeatureSyncService:
 
         return latest_score, history, metrics, profile
 
+    def _cache_ttl(self, url: str) -> float:
+        """Per-endpoint TTL: roster lists, learning profiles, or engagement data."""
+        if url.endswith("/students/list") or url.endswith("/api/v1/students/"):
+            return settings.UPSTREAM_CACHE_ROSTER_TTL_SECONDS
+        if url.startswith(self.learning_style_base_url):
+            return settings.UPSTREAM_CACHE_PROFILE_TTL_SECONDS
+        return settings.UPSTREAM_CACHE_ENGAGEMENT_TTL_SECONDS
+
+    @staticmethod
+    def _cache_key(method: str, url: str, payload: dict[str, Any] | None) -> str:
+        return f"{method} {url} {json.dumps(payload or {}, sort_keys=True, default=str)}"
+
     async def _fetch_json(
         self,
-        client: httpx.AsyncClient,
+        url: str,
+        service_name: str,
+        not_found_detail: str,
+        params: dict[str, Any] | None = None,
+    ) -> Any:
+        return await self.cache.get_or_fetch(
+            self._cache_key("GET", url, params),
+            lambda: self._get_json(url, service_name, not_found_detail, params),
+            ttl_seconds=self._cache_ttl(url),
+        )
+
+    async def _fetch_json_optional(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+    ) -> Any | None:
+        return await self.cache.get_or_fetch(
+            self._cache_key("GET", url, params),
+            lambda: self._get_json_optional(url, params),
+            ttl_seconds=self._cache_ttl(url),
+        )
+
+    async def _fetch_json_optional_post(
+        self,
+        url: str,
+        payload: dict[str, Any],
+    ) -> Any | None:
+        return await self.cache.get_or_fetch(
+            self._cache_key("POST", url, payload),
+            lambda: self._post_json_optional(url, payload),
+            ttl_seconds=self._cache_ttl(url),
+        )
+
+    async def _get_json(
+        self,
         url: str,
         service_name: str,
         not_found_detail: str,
         params: dict[str, Any] | None = None,
     ) -> Any:
         try:
-            response = await client.get(url, params=params)
+            response = await self.http.get(url, params=params)
         except httpx.RequestError as exc:
             raise SyncServiceError(
                 status_code=502,
@@ -424,14 +634,13 @@ class XAIFeatureSyncService:
                 detail=f"Invalid JSON returned by {service_name} service",
             ) from exc
 
-    async def _fetch_json_optional(
+    async def _get_json_optional(
         self,
-        client: httpx.AsyncClient,
         url: str,
         params: dict[str, Any] | None = None,
     ) -> Any | None:
         try:
-            response = await client.get(url, params=params)
+            response = await self.http.get(url, params=params)
         except httpx.RequestError:
             return None
 
@@ -445,6 +654,24 @@ class XAIFeatureSyncService:
         except ValueError:
             return None
 
+    async def _post_json_optional(
+        self,
+        url: str,
+        payload: dict[str, Any],
+    ) -> Any | None:
+        try:
+            response = await self.http.post(url, json=payload)
+        except httpx.RequestError:
+            return None
+
+        if response.status_code >= 400:
+            return None
+
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
     def _map_to_prediction_request(
         self,
         student_id: str,
@@ -489,6 +716,87 @@ class XAIFeatureSyncService:
             learning_style=str(profile.get("learning_style") or ""),
         )
 
+    def _build_timeline_requests(
+        self,
+        student_id: str,
+        history: list[dict[str, Any]],
+        metrics: list[dict[str, Any]],
+        selected: list[dict[str, Any]],
+        profile: dict[str, Any] | None,
+    ) -> list[tuple[dict[str, Any], AcademicRiskRequest]]:
+        """Map every selected history entry to a request in one pass over the history.
+
+        Equivalent to calling ``_map_to_academic_risk_request`` with
+        ``timeline_mode=True`` on the history and metrics up to each entry's
+        date, but keeps running aggregates instead of re-slicing per point.
+        ``history`` and ``metrics`` must be date-sorted, as returned by
+        ``_normalize_entries_by_date``.
+        """
+        selected_ids = {id(entry) for entry in selected}
+        assignment = _RunningSeries()
+        engagement = _RunningSeries()
+        positive_assignment = _RunningSeries()
+        positive_engagement = _RunningSeries()
+        num_assessments = 0
+        assessed_days = 0
+        metric_index = 0
+
+        requests: list[tuple[dict[str, Any], AcademicRiskRequest]] = []
+        for entry in history:
+            raw_assignment = entry.get("assignment_score")
+            assignment_value = self._to_float(raw_assignment, 0.0)
+            engagement_value = self._to_float(entry.get("engagement_score"), 0.0)
+            if raw_assignment is not None:
+                assignment.add(assignment_value)
+            engagement.add(engagement_value)
+            if assignment_value > 0:
+                positive_assignment.add(assignment_value)
+            if engagement_value > 0:
+                positive_engagement.add(engagement_value)
+
+            if id(entry) not in selected_ids:
+                continue
+
+            entry_date = self._extract_entry_date(entry)
+            while (
+                metric_index < len(metrics)
+                and self._extract_entry_date(metrics[metric_index]) <= entry_date
+            ):
+                metric = metrics[metric_index]
+                attempts = int(metric.get("quiz_attempts") or 0) + int(
+                    metric.get("assignments_submitted") or 0
+                )
+                num_assessments += attempts
+                assessed_days += int(attempts > 0)
+                metric_index += 1
+
+            if assignment.count and assignment.varied:
+                series = assignment
+            elif engagement.count and engagement.varied:
+                series = engagement
+            elif positive_assignment.count:
+                series = positive_assignment
+            elif positive_engagement.count:
+                series = positive_engagement
+            else:
+                series = _RunningSeries.of([50.0])
+
+            requests.append(
+                (
+                    entry,
+                    self._academic_risk_request_from_aggregates(
+                        student_id=student_id,
+                        latest_score=entry,
+                        series=series,
+                        num_assessments=num_assessments,
+                        assessed_days=assessed_days,
+                        metric_days=metric_index,
+                        profile=profile,
+                    ),
+                )
+            )
+        return requests
+
     def _map_to_academic_risk_request(
         self,
         student_id: str,
@@ -499,12 +807,6 @@ class XAIFeatureSyncService:
         timeline_mode: bool = False,
     ) -> AcademicRiskRequest:
         score_series = self._extract_score_series(history, timeline_mode=timeline_mode)
-        avg_grade = round(sum(score_series) / len(score_series), 2) if score_series else 50.0
-        grade_range = round((max(score_series) - min(score_series)), 2) if len(score_series) > 1 else 0.0
-        grade_consistency = round(
-            self._clamp(100.0 - grade_range, 0.0, 100.0),
-            2,
-        )
 
         num_assessments = sum(
             int(metric.get("quiz_attempts") or 0) + int(metric.get("assignments_submitted") or 0)
@@ -522,15 +824,42 @@ class XAIFeatureSyncService:
             > 0
         )
 
+        return self._academic_risk_request_from_aggregates(
+            student_id=student_id,
+            latest_score=latest_score,
+            series=_RunningSeries.of(score_series),
+            num_assessments=num_assessments,
+            assessed_days=assessed_days,
+            metric_days=len(daily_metrics),
+            profile=profile,
+        )
+
+    def _academic_risk_request_from_aggregates(
+        self,
+        student_id: str,
+        latest_score: dict[str, Any],
+        series: _RunningSeries,
+        num_assessments: int,
+        assessed_days: int,
+        metric_days: int,
+        profile: dict[str, Any] | None,
+    ) -> AcademicRiskRequest:
+        avg_grade = round(series.total / series.count, 2) if series.count else 50.0
+        grade_range = round((series.maximum - series.minimum), 2) if series.count > 1 else 0.0
+        grade_consistency = round(
+            self._clamp(100.0 - grade_range, 0.0, 100.0),
+            2,
+        )
+
         profile_completion = None
         if isinstance(profile, dict):
             profile_completion = profile.get("avg_completion_rate")
 
         if profile_completion is not None:
             assessment_completion_rate = self._to_ratio(profile_completion, default=0.5)
-        elif daily_metrics:
+        elif metric_days:
             assessment_completion_rate = self._clamp(
-                assessed_days / max(len(daily_metrics), 1),
+                assessed_days / max(metric_days, 1),
                 0.0,
                 1.0,
             )
@@ -600,36 +929,6 @@ class XAIFeatureSyncService:
 
         return [50.0]
 
-    def _history_until_date(
-        self,
-        history: list[dict[str, Any]],
-        target_date: date | None,
-    ) -> list[dict[str, Any]]:
-        if target_date is None:
-            return history
-        return [
-            item
-            for item in history
-            if isinstance(item, dict)
-            and self._extract_entry_date(item) is not None
-            and self._extract_entry_date(item) <= target_date
-        ]
-
-    def _metrics_until_date(
-        self,
-        metrics: list[dict[str, Any]],
-        target_date: date | None,
-    ) -> list[dict[str, Any]]:
-        if target_date is None:
-            return metrics
-        return [
-            item
-            for item in metrics
-            if isinstance(item, dict)
-            and self._extract_entry_date(item) is not None
-            and self._extract_entry_date(item) <= target_date
-        ]
-
     def _timeline_timestamp(self, entry: dict[str, Any]) -> datetime:
         entry_date = self._extract_entry_date(entry)
         if entry_date is not None:
@@ -828,14 +1127,5 @@ class XAIFeatureSyncService:
 
         return max((date.today() - parsed_date).days, 0)
 
-    @staticmethod
-    def _search_sort_key(student_id: str, search_query: str) -> tuple[int, str]:
-        normalized = student_id.lower()
-        if normalized == search_query:
-            return (0, student_id)
-        if normalized.startswith(search_query):
-            return (1, student_id)
-        return (2, student_id)
-
 
 sync_service = XAIFeatureSyncService()
@@ -0,0 +1,211 @@
+"""Pure NumPy evaluator for XGBoost tree ensembles saved as JSON.
+
+``xgb.Booster.predict`` pays for DMatrix construction and thread dispatch on
+every call, which dominates the cost of scoring one student against a small
+model. ``CompiledTreeEnsemble`` flattens the trees of a saved ``gbtree`` model
+into padded NumPy arrays and walks them level by level for a whole batch at once,
+using only 1-D ``take`` calls in the inner loop.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+_LOGISTIC_OBJECTIVES = {"binary:logistic", "reg:logistic", "binary:logitraw"}
+_SOFTMAX_OBJECTIVES = {"multi:softprob", "multi:softmax"}
+
+
+class UnsupportedModelError(ValueError):
+    """Raised when a saved model uses features the compiled evaluator lacks."""
+
+
+class CompiledTreeEnsemble:
+    """Flattened, NumPy-only copy of an XGBoost ``gbtree`` model."""
+
+    def __init__(self, model: dict[str, Any]) -> None:
+        learner = model["learner"]
+        booster = learner["gradient_booster"]
+        if booster.get("name") != "gbtree":
+            raise UnsupportedModelError(f"Unsupported booster: {booster.get('name')}")
+
+        self.objective = learner["objective"]["name"]
+        if self.objective not in _LOGISTIC_OBJECTIVES | _SOFTMAX_OBJECTIVES:
+            raise UnsupportedModelError(f"Unsupported objective: {self.objective}")
+
+        params = learner["learner_model_param"]
+        self.num_features = int(params["num_feature"])
+        self.num_class = max(1, int(params.get("num_class", "0")))
+        self.feature_names = learner.get("feature_names") or None
+
+        base_score = float(params["base_score"])
+        if (
+            self.objective in _LOGISTIC_OBJECTIVES
+            and self.objective != "binary:logitraw"
+        ):
+            # base_score is stored in probability space for logistic objectives.
+            base_score = float(np.log(base_score / (1.0 - base_score)))
+        self.base_margin = np.float32(base_score)
+
+        trees = booster["model"]["trees"]
+        if not trees:
+            raise UnsupportedModelError("Model contains no trees")
+        self.tree_class = np.asarray(booster["model"]["tree_info"], dtype=np.int64)
+
+        max_nodes = max(len(tree["left_children"]) for tree in trees)
+        shape = (len(trees), max_nodes)
+        self.left = np.zeros(shape, dtype=np.int32)
+        self.right = np.zeros(shape, dtype=np.int32)
+        self.feature = np.zeros(shape, dtype=np.int32)
+        self.threshold = np.zeros(shape, dtype=np.float32)
+        self.default_left = np.zeros(shape, dtype=bool)
+        self.is_leaf = np.ones(shape, dtype=bool)
+        self.leaf_value = np.zeros(shape, dtype=np.float32)
+
+        max_depth = 0
+        for index, tree in enumerate(trees):
+            if any(tree.get("split_type", [])) or tree.get("categories"):
+                raise UnsupportedModelError("Categorical splits are not supported")
+            if int(tree["tree_param"].get("size_leaf_vector", "1")) > 1:
+                raise UnsupportedModelError("Vector leaves are not supported")
+
+            left = np.asarray(tree["left_children"], dtype=np.int32)
+            node_count = len(left)
+            leaves = left == -1
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+
+            self.left[index, :node_count] = np.where(
+                leaves, np.arange(node_count), left
+            )
+            self.right[index, :node_count] = np.where(
+                leaves, np.arange(node_count), tree["right_children"]
+            )
+            self.feature[index, :node_count] = tree["split_indices"]
+            self.threshold[index, :node_count] = conditions
+            self.default_left[index, :node_count] = np.asarray(
+                tree["default_left"], dtype=bool
+            )
+            self.is_leaf[index, :node_count] = leaves
+            # XGBoost stores the leaf weight in split_conditions for leaf nodes.
+            self.leaf_value[index, :node_count] = np.where(leaves, conditions, 0.0)
+            max_depth = max(max_depth, self._tree_depth(left, tree["right_children"]))
+
+        self.max_depth = max_depth
+        # Flat views indexed by ``tree * max_nodes + node`` keep the hot loop 1-D.
+        self._roots = np.arange(len(trees), dtype=np.intp) * max_nodes
+        self._node_count = len(trees) * max_nodes
+        self._flat_feature = self.feature.ravel().astype(np.intp)
+        self._flat_threshold = self.threshold.ravel()
+        self._flat_default_left = self.default_left.ravel()
+        self._flat_leaf_value = self.leaf_value.ravel()
+        # children[2 * node + went_left] -> next flat node; leaves point at themselves.
+        self._children = np.empty(2 * self._node_count, dtype=np.intp)
+        self._children[0::2] = (self.right + self._roots[:, None]).ravel()
+        self._children[1::2] = (self.left + self._roots[:, None]).ravel()
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "CompiledTreeEnsemble":
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _tree_depth(left: np.ndarray, right: list[int]) -> int:
+        depth = 0
+        frontier = [0]
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                if left[node] != -1:
+                    next_frontier.extend((int(left[node]), int(right[node])))
+            if next_frontier:
+                depth += 1
+            frontier = next_frontier
+        return depth
+
+    def predict_margin(self, features: np.ndarray) -> np.ndarray:
+        """Return raw margins, shaped ``(n,)`` or ``(n, num_class)``."""
+        rows = np.asarray(features, dtype=np.float32)
+        if rows.ndim == 1:
+            rows = rows.reshape(1, -1)
+        if rows.shape[1] != self.num_features:
+            raise ValueError(
+                f"Expected {self.num_features} features, got {rows.shape[1]}"
+            )
+
+        row_count = rows.shape[0]
+        tree_count = len(self._roots)
+        flat_rows = rows.ravel()
+        has_missing = bool(np.isnan(flat_rows).any())
+        # One flat node cursor per (row, tree); every step below is a 1-D take.
+        nodes = np.tile(self._roots, row_count)
+        row_base = np.repeat(
+            np.arange(row_count, dtype=np.intp) * self.num_features, tree_count
+        )
+        for _ in range(self.max_depth):
+            values = flat_rows.take(row_base + self._flat_feature.take(nodes))
+            went_left = values < self._flat_threshold.take(nodes)
+            if has_missing:
+                went_left = np.where(
+                    np.isnan(values), self._flat_default_left.take(nodes), went_left
+                )
+            nodes = self._children.take(2 * nodes + went_left)
+
+        leaf_values = self._flat_leaf_value.take(nodes).reshape(row_count, tree_count)
+        if self.num_class == 1:
+            return leaf_values.sum(axis=1, dtype=np.float32) + self.base_margin
+
+        margins = np.full(
+            (rows.shape[0], self.num_class), self.base_margin, dtype=np.float32
+        )
+        for class_index in range(self.num_class):
+            mask = self.tree_class == class_index
+            margins[:, class_index] += leaf_values[:, mask].sum(
+                axis=1, dtype=np.float32
+            )
+        return margins
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Mirror ``Booster.predict`` output for the supported objectives."""
+        margins = self.predict_margin(features)
+        if self.objective == "binary:logitraw":
+            return margins
+        if self.objective in _LOGISTIC_OBJECTIVES:
+            return 1.0 / (1.0 + np.exp(-margins))
+        if self.objective == "multi:softmax":
+            return np.argmax(margins, axis=1).astype(np.float32)
+
+        shifted = np.exp(margins - margins.max(axis=1, keepdims=True))
+        return shifted / shifted.sum(axis=1, keepdims=True)
+
+    def max_abs_error(self, booster: Any, features: np.ndarray) -> float:
+        """Largest absolute difference against ``booster`` on ``features``."""
+        import xgboost as xgb
+
+        expected = np.asarray(
+            booster.predict(xgb.DMatrix(features, feature_names=self.feature_names))
+        )
+        actual = self.predict(features)
+        return float(np.max(np.abs(expected.reshape(actual.shape) - actual)))
+
+    def validation_rows(self, rows: int = 256, seed: int = 0) -> np.ndarray:
+        """Synthetic rows that straddle every split threshold used by the model."""
+        rng = np.random.default_rng(seed)
+        samples = np.zeros((rows, self.num_features), dtype=np.float32)
+        splits = ~self.is_leaf
+        for feature in range(self.num_features):
+            thresholds = self.threshold[splits & (self.feature == feature)]
+            if thresholds.size == 0:
+                continue
+            low, high = float(thresholds.min()), float(thresholds.max())
+            margin = max(1.0, (high - low) * 0.1)
+            samples[:, feature] = rng.uniform(low - margin, high + margin, size=rows)
+        # Exact thresholds exercise the strict "<" comparison.
+        exact = min(rows, int(splits.sum()))
+        tree_ids, node_ids = np.nonzero(splits)
+        samples[
+            np.arange(exact), self.feature[tree_ids[:exact], node_ids[:exact]]
+        ] = self.threshold[tree_ids[:exact], node_ids[:exact]]
+        return samples
@@ -0,0 +1,241 @@
+"""Stale-while-revalidate cache for upstream service responses."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from app.core.cache import LRUTTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    """One cached upstream payload with the moment it was fetched."""
+
+    value: Any
+    stored_at: float
+    ttl_seconds: float
+    stale_seconds: float
+
+    def age(self, now: float) -> float:
+        return now - self.stored_at
+
+    def is_fresh(self, now: float) -> bool:
+        return self.age(now) < self.ttl_seconds
+
+    def is_usable(self, now: float) -> bool:
+        return self.age(now) < self.ttl_seconds + self.stale_seconds
+
+
+class InMemoryCacheBackend:
+    """Per-process backend; bounded by count, expired by UpstreamCache."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int) -> None:
+        self._entries = LRUTTLCache(max_entries=max_entries, ttl_seconds=None)
+
+    async def get(self, key: str) -> CachedResponse | None:
+        return self._entries.get(key)
+
+    async def set(self, key: str, entry: CachedResponse) -> None:
+        self._entries.set(key, entry)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Backend shared by every XAI replica pointed at the same Redis instance."""
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "xai:upstream:") -> None:
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key: str) -> CachedResponse | None:
+        try:
+            raw = await self._redis.get(self._prefix + key)
+        except Exception as exc:
+            logger.warning(f"Redis upstream cache read failed: {exc}")
+            return None
+        if raw is None:
+            return None
+        try:
+            return CachedResponse(**json.loads(raw))
+        except (TypeError, ValueError):
+            return None
+
+    async def set(self, key: str, entry: CachedResponse) -> None:
+        payload = json.dumps(entry.__dict__)
+        expires_in = max(1, int(entry.ttl_seconds + entry.stale_seconds) + 1)
+        try:
+            await self._redis.set(self._prefix + key, payload, ex=expires_in)
+        except Exception as exc:
+            logger.warning(f"Redis upstream cache write failed: {exc}")
+
+    async def clear(self) -> None:
+        try:
+            async for key in self._redis.scan_iter(match=f"{self._prefix}*"):
+                await self._redis.delete(key)
+        except Exception as exc:
+            logger.warning(f"Redis upstream cache clear failed: {exc}")
+
+
+def build_cache_backend() -> InMemoryCacheBackend | RedisCacheBackend:
+    """Use Redis when ``REDIS_URL`` is set and the client is installed."""
+    if settings.REDIS_URL:
+        try:
+            return RedisCacheBackend(settings.REDIS_URL)
+        except ImportError:
+            logger.warning("REDIS_URL is set but the redis package is not installed")
+    return InMemoryCacheBackend(max_entries=settings.UPSTREAM_CACHE_MAX_ENTRIES)
+
+
+class UpstreamCache:
+    """TTL cache with request coalescing and stale-while-revalidate.
+
+    Fresh entries are served directly. Entries past their TTL but within the
+    stale window are served immediately while one background task refreshes
+    them. Concurrent misses for the same key share a single fetch. Failed
+    fetches and ``None`` results are never cached.
+    """
+
+    def __init__(
+        self, backend: InMemoryCacheBackend | RedisCacheBackend | None = None
+    ) -> None:
+        self.backend = backend or InMemoryCacheBackend(
+            max_entries=settings.UPSTREAM_CACHE_MAX_ENTRIES
+        )
+        self._inflight: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, asyncio.Task]
+        ] = weakref.WeakKeyDictionary()
+        self._refresh_tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl_seconds: float,
+        stale_seconds: float | None = None,
+    ) -> Any:
+        if ttl_seconds <= 0:
+            return await fetch()
+        if stale_seconds is None:
+            stale_seconds = settings.UPSTREAM_CACHE_STALE_SECONDS
+
+        entry = await self.backend.get(key)
+        now = time.time()
+        if entry is not None and entry.is_fresh(now):
+            self.hits += 1
+            return entry.value
+        if entry is not None and entry.is_usable(now):
+            self.stale_hits += 1
+            self._refresh_in_background(key, fetch, ttl_seconds, stale_seconds)
+            return entry.value
+
+        self.misses += 1
+        return await self._fetch_once(key, fetch, ttl_seconds, stale_seconds)
+
+    async def _fetch_once(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl_seconds: float,
+        stale_seconds: float,
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.setdefault(loop, {})
+        task = inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # The fetch runs in its own task so a caller that is cancelled
+            # (e.g. by a timeout) only stops waiting; the others still get the result
+            task = loop.create_task(
+                self._fetch_and_store(key, fetch, ttl_seconds, stale_seconds)
+            )
+            inflight[key] = task
+            task.add_done_callback(lambda done: self._forget_fetch(inflight, key, done))
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl_seconds: float,
+        stale_seconds: float,
+    ) -> Any:
+        value = await fetch()
+        if value is not None:
+            await self.backend.set(
+                key, CachedResponse(value, time.time(), ttl_seconds, stale_seconds)
+            )
+        return value
+
+    @staticmethod
+    def _forget_fetch(
+        inflight: dict[str, asyncio.Task], key: str, task: asyncio.Task
+    ) -> None:
+        if inflight.get(key) is task:
+            del inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every waiter has gone.
+            task.exception()
+
+    def _refresh_in_background(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl_seconds: float,
+        stale_seconds: float,
+    ) -> None:
+        if key in self._inflight.get(asyncio.get_running_loop(), {}):
+            return
+
+        async def refresh() -> None:
+            self.refreshes += 1
+            try:
+                await self._fetch_once(key, fetch, ttl_seconds, stale_seconds)
+            except Exception as exc:
+                self.refresh_failures += 1
+                logger.warning(f"Background refresh failed for {key}: {exc}")
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4)
+            if lookups
+            else 0.0,
+        }
@@ -11,6 +11,11 @@ import pytest
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
+# Add the monorepo root so ``backend.shared`` resolves like it does in app.main
+repo_root = project_root.parent.parent.parent
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_environment():
@@ -1,7 +1,9 @@
 import asyncio
+import threading
 
 from app.schemas.academic_risk import AcademicRiskRequest
-from app.services.academic_risk_service import AcademicRiskService
+from app.services import academic_risk_service as academic_risk_module
+from app.services.academic_risk_service import AcademicRiskService, _CounterfactualState
 
 
 def build_service() -> AcademicRiskService:
@@ -72,3 +74,360 @@ def test_top_risk_factors_align_with_multiclass_labels():
     assert any(factor["feature"] == "avg_grade" for factor in at_risk_factors)
     assert any(factor["impact"] in {"critical", "high"} for factor in at_risk_factors)
     assert all(factor["impact"] != "critical" for factor in medium_factors)
+
+
+def test_predict_batch_matches_single_predictions():
+    service = build_service()
+    requests = [
+        AcademicRiskRequest(
+            student_id="STU_BATCH_1",
+            avg_grade=35.0,
+            grade_consistency=58.0,
+            grade_range=42.0,
+            num_assessments=3,
+            assessment_completion_rate=0.45,
+            studied_credits=60,
+            num_of_prev_attempts=1,
+            low_performance=1,
+            low_engagement=1,
+            has_previous_attempts=1,
+        ),
+        AcademicRiskRequest(
+            student_id="STU_BATCH_2",
+            avg_grade=82.0,
+            grade_consistency=90.0,
+            grade_range=10.0,
+            num_assessments=9,
+            assessment_completion_rate=0.92,
+            studied_credits=60,
+            num_of_prev_attempts=0,
+            low_performance=0,
+            low_engagement=0,
+            has_previous_attempts=0,
+        ),
+    ]
+
+    batch_responses = asyncio.run(service.predict_batch(requests))
+    single_responses = [asyncio.run(service.predict(request)) for request in requests]
+
+    assert [response.student_id for response in batch_responses] == [
+        "STU_BATCH_1",
+        "STU_BATCH_2",
+    ]
+    for batch_response, single_response in zip(batch_responses, single_responses):
+        assert batch_response.risk_level == single_response.risk_level
+        assert batch_response.risk_score == single_response.risk_score
+        assert batch_response.probabilities == single_response.probabilities
+
+
+def test_counterfactual_search_batches_candidates_within_budget():
+    service = build_service()
+    request = AcademicRiskRequest(
+        student_id="STU_COUNTER_4",
+        avg_grade=35.0,
+        grade_consistency=58.0,
+        grade_range=42.0,
+        num_assessments=3,
+        assessment_completion_rate=0.45,
+        studied_credits=60,
+        num_of_prev_attempts=1,
+        low_performance=1,
+        low_engagement=1,
+        has_previous_attempts=1,
+    )
+    batch_sizes: list[int] = []
+    run_batch = service._run_prediction_batch
+
+    def counting_run_batch(requests):
+        batch_sizes.append(len(requests))
+        return run_batch(requests)
+
+    service._run_prediction_batch = counting_run_batch
+
+    greedy = service._build_counterfactual(request)
+    greedy_calls = len(batch_sizes)
+    batch_sizes.clear()
+    beam = service._build_counterfactual(request, beam_width=3, max_evaluations=20)
+
+    assert greedy.changes
+    assert greedy_calls <= 1 + 8
+    assert sum(batch_sizes) <= 1 + 20
+    assert beam.current_outcome == greedy.current_outcome
+    assert (beam.estimated_risk_score or 0.0) <= 1.0
+
+
+def test_counterfactual_search_breaks_ties_by_first_seen_candidate():
+    service = build_service()
+    request = service._normalize_request(
+        AcademicRiskRequest(
+            student_id="STU_COUNTER_TIE",
+            avg_grade=35.0,
+            grade_consistency=58.0,
+            grade_range=42.0,
+            num_assessments=3,
+            assessment_completion_rate=0.45,
+            studied_credits=60,
+            num_of_prev_attempts=1,
+            low_performance=1,
+            low_engagement=1,
+            has_previous_attempts=1,
+        )
+    )
+    scored_batches: list[list[AcademicRiskRequest]] = []
+
+    def tied_scores(requests, memo, max_new_rows):
+        scored_batches.append(list(requests))
+        return [("Medium Risk", 0.5, 0.5, {}) for _ in requests]
+
+    service._score_requests_memoized = tied_scores
+    # grade_range was already changed, so re-updating it yields the shortest path
+    start = _CounterfactualState(
+        request=request,
+        outcome="At-Risk",
+        score=0.9,
+        confidence=0.9,
+        changes={"grade_range": (request.grade_range, "")},
+    )
+
+    result = service._search_counterfactual_path(
+        start, target_rank=0, memo={}, beam_width=1, evaluation_budget=[100]
+    )
+
+    # Every candidate ties, so the first one scored wins, as in the greedy search
+    assert result.request == scored_batches[0][0]
+    assert set(result.changes) == {"grade_range", "avg_grade"}
+
+
+def test_score_skips_counterfactual_and_guidance():
+    service = build_service()
+    request = AcademicRiskRequest(
+        student_id="STU_SCORE_1",
+        avg_grade=35.0,
+        grade_consistency=58.0,
+        grade_range=42.0,
+        num_assessments=3,
+        assessment_completion_rate=0.45,
+        studied_credits=60,
+        num_of_prev_attempts=1,
+        low_performance=1,
+        low_engagement=1,
+        has_previous_attempts=1,
+    )
+
+    scored = asyncio.run(service.score(request))
+    full = asyncio.run(service.predict(request))
+    explanation = asyncio.run(service.explain_counterfactual(request))
+
+    assert scored.counterfactual is None
+    assert scored.recommendations == []
+    assert scored.top_risk_factors == []
+    assert scored.risk_level == full.risk_level
+    assert scored.risk_score == full.risk_score
+    assert explanation == full.counterfactual
+
+
+def test_prediction_cache_reuses_scores_until_model_reload():
+    service = build_service()
+    request = AcademicRiskRequest(
+        student_id="STU_CACHE_1",
+        avg_grade=52.0,
+        grade_consistency=70.0,
+        grade_range=25.0,
+        num_assessments=6,
+        assessment_completion_rate=0.7,
+        studied_credits=60,
+        num_of_prev_attempts=0,
+        low_performance=0,
+        low_engagement=0,
+        has_previous_attempts=0,
+    )
+    twin = request.model_copy(update={"student_id": "STU_CACHE_2"})
+
+    uncached_rows = []
+    original_score_uncached = service._score_uncached
+
+    def counting_score_uncached(requests, snapshot):
+        uncached_rows.append(len(requests))
+        return original_score_uncached(requests, snapshot)
+
+    service._score_uncached = counting_score_uncached
+
+    first = asyncio.run(service.score(request))
+    second = asyncio.run(service.score(twin))
+
+    assert uncached_rows == [1]
+    assert second.risk_score == first.risk_score
+    assert second.student_id == "STU_CACHE_2"
+    assert service.cache_stats()["hits"] >= 1
+
+    service.reload_model()
+    service.model = None
+    service.feature_names = service._get_default_features()
+    asyncio.run(service.score(request))
+
+    assert uncached_rows == [1, 1]
+
+
+def test_scoring_batch_keeps_its_model_snapshot_across_a_reload():
+    service = build_service()
+    request = AcademicRiskRequest(
+        student_id="STU_SWAP_1",
+        avg_grade=55.0,
+        grade_consistency=70.0,
+        grade_range=25.0,
+        num_assessments=6,
+        assessment_completion_rate=0.7,
+        studied_credits=60,
+        num_of_prev_attempts=0,
+        low_performance=0,
+        low_engagement=0,
+        has_previous_attempts=0,
+    )
+    original_score_uncached = service._score_uncached
+
+    def swap_mid_batch(requests, snapshot):
+        # A reload publishing a new booster while this batch is being scored
+        service.model = object()
+        return original_score_uncached(requests, snapshot)
+
+    service._score_uncached = swap_mid_batch
+
+    prediction, probabilities = service._run_prediction_batch([request])[0]
+    demo_prediction, demo_probabilities = service._demo_predict(request)
+
+    assert prediction == demo_prediction
+    assert list(probabilities) == list(demo_probabilities)
+
+
+def test_process_worker_reloads_when_parent_model_changed(monkeypatch):
+    reloads = []
+    monkeypatch.setattr(
+        academic_risk_module.academic_risk_service, "reload_model", lambda: reloads.append(1)
+    )
+    current = academic_risk_module.academic_risk_service._model_file_signature
+
+    academic_risk_module._call_academic_risk_service(current, "cache_stats")
+    academic_risk_module._call_academic_risk_service((1, 2), "cache_stats")
+
+    assert reloads == [1]
+
+
+def test_concurrent_predictions_are_coalesced_into_one_batch():
+    service = build_service()
+    requests = [
+        AcademicRiskRequest(
+            student_id=f"STU_COALESCE_{index}",
+            avg_grade=40.0 + index * 5,
+            grade_consistency=70.0,
+            grade_range=25.0,
+            num_assessments=6,
+            assessment_completion_rate=0.7,
+            studied_credits=60,
+            num_of_prev_attempts=0,
+            low_performance=0,
+            low_engagement=0,
+            has_previous_attempts=0,
+        )
+        for index in range(5)
+    ]
+    batch_sizes = []
+    original_run_batch = service._run_prediction_batch
+
+    def counting_run_batch(batch):
+        batch_sizes.append(len(batch))
+        return original_run_batch(batch)
+
+    service._run_prediction_batch = counting_run_batch
+
+    async def score_concurrently():
+        return await asyncio.gather(*(service.score(request) for request in requests))
+
+    responses = asyncio.run(score_concurrently())
+
+    assert batch_sizes == [5]
+    assert [response.student_id for response in responses] == [
+        request.student_id for request in requests
+    ]
+    assert service.coalescer.stats()["batches_run"] == 1
+
+
+def test_coalesced_predictions_run_counterfactual_searches_separately():
+    service = build_service()
+    requests = [
+        AcademicRiskRequest(
+            student_id=f"STU_COALESCE_CF_{index}",
+            avg_grade=30.0 + index * 2,
+            grade_consistency=55.0,
+            grade_range=40.0,
+            num_assessments=3,
+            assessment_completion_rate=0.45,
+            studied_credits=60,
+            num_of_prev_attempts=1,
+            low_performance=1,
+            low_engagement=1,
+            has_previous_attempts=1,
+        )
+        for index in range(3)
+    ]
+    dispatched = []
+    original_dispatch = service._dispatch
+
+    async def recording_dispatch(method, *args):
+        dispatched.append((method, args[1:]))
+        return await original_dispatch(method, *args)
+
+    service._dispatch = recording_dispatch
+
+    async def predict_concurrently():
+        return await asyncio.gather(*(service.predict(request) for request in requests))
+
+    responses = asyncio.run(predict_concurrently())
+
+    assert dispatched.count(("predict_batch_sync", (False,))) == 1
+    assert dispatched.count(("explain_counterfactual_sync", ())) == len(requests)
+    for request, response in zip(requests, responses):
+        assert response.counterfactual == service.explain_counterfactual_sync(request)
+
+
+def test_model_file_check_runs_off_the_event_loop(monkeypatch):
+    service = build_service()
+    request = AcademicRiskRequest(
+        student_id="STU_RELOAD_1",
+        avg_grade=55.0,
+        grade_consistency=70.0,
+        grade_range=25.0,
+        num_assessments=6,
+        assessment_completion_rate=0.7,
+        studied_credits=60,
+        num_of_prev_attempts=0,
+        low_performance=0,
+        low_engagement=0,
+        has_previous_attempts=0,
+    )
+    monkeypatch.setattr(academic_risk_module.settings, "MODEL_RELOAD_CHECK_SECONDS", 0.001)
+    service._last_model_check = 0.0
+    reload_started = threading.Event()
+    release_reload = threading.Event()
+    reload_threads = []
+
+    def slow_reload():
+        reload_threads.append(threading.get_ident())
+        reload_started.set()
+        release_reload.wait(timeout=5)
+
+    service._refresh_model_if_changed = slow_reload
+
+    async def score_during_reload():
+        first = await service.score(request)
+        await asyncio.to_thread(reload_started.wait, 5)
+        # The reload is still blocked, yet scoring carries on and no second check starts
+        second = await service.score(request)
+        release_reload.set()
+        await service._model_refresh
+        return first, second
+
+    first, second = asyncio.run(score_during_reload())
+
+    assert first.risk_score == second.risk_score
+    assert len(reload_threads) == 1
+    assert reload_threads[0] != threading.get_ident()
@@ -30,6 +30,7 @@ from app.schemas.academic_risk import (
     StudentInsightsResponse,
 )
 from app.schemas.prediction import PredictionRequest
+from app.services.similarity_index import SimilarityIndex
 from app.services.student_insights_service import student_insights_service
 from app.services.student_insights_service import InsightCandidate
 from app.services.sync_service import sync_service
@@ -144,7 +145,7 @@ class TestAcademicRiskEndpoint:
                 timestamp="2026-03-08T10:30:00",
             )
 
-        def fake_persist_temporary_student_record(db, request, response):
+        async def fake_persist_temporary_student_record(request, response):
             return None
 
         monkeypatch.setattr(academic_risk_routes.academic_risk_service, "predict", fake_predict)
@@ -176,57 +177,106 @@ class TestAcademicRiskEndpoint:
         assert data["student_id"] == "temp_student_001"
         assert data["risk_level"] == "Medium Risk"
 
+    def test_batch_prediction_endpoint(self, client, monkeypatch):
+        """Batch endpoint should score every request and keep request order."""
+
+        async def fake_predict_batch(requests, include_counterfactual=False):
+            return [
+                AcademicRiskResponse(
+                    student_id=request.student_id,
+                    risk_level="Safe",
+                    risk_score=0.1,
+                    confidence=0.9,
+                    probabilities={"Safe": 0.9, "At-Risk": 0.1},
+                    recommendations=[],
+                    top_risk_factors=[],
+                )
+                for request in requests
+            ]
+
+        persisted: list = []
+
+        async def fake_persist_academic_risk_predictions(results):
+            persisted.extend(results)
+
+        monkeypatch.setattr(
+            academic_risk_routes.academic_risk_service, "predict_batch", fake_predict_batch
+        )
+        monkeypatch.setattr(
+            academic_risk_routes,
+            "persist_academic_risk_predictions",
+            fake_persist_academic_risk_predictions,
+        )
+
+        student_payload = {
+            "avg_grade": 70,
+            "grade_consistency": 85,
+            "grade_range": 30,
+            "num_assessments": 8,
+            "assessment_completion_rate": 0.8,
+            "studied_credits": 60,
+            "num_of_prev_attempts": 0,
+            "low_performance": 0,
+            "low_engagement": 0,
+            "has_previous_attempts": 0,
+        }
+        response = client.post(
+            "/api/v1/academic-risk/predict/batch",
+            json={
+                "requests": [
+                    {"student_id": "BATCH001", **student_payload},
+                    {"student_id": "BATCH002", **student_payload},
+                ]
+            },
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 2
+        assert [item["student_id"] for item in data["predictions"]] == ["BATCH001", "BATCH002"]
+        assert len(persisted) == 2
+
+    def test_counterfactual_endpoint_rejects_mismatched_student(self, client):
+        """On-demand counterfactuals must be requested for the student in the path."""
+        response = client.post(
+            "/api/v1/academic-risk/OTHER001/counterfactual",
+            json={
+                "student_id": "temp_student_001",
+                "avg_grade": 35,
+                "grade_consistency": 58,
+                "grade_range": 42,
+                "num_assessments": 3,
+                "assessment_completion_rate": 0.45,
+                "studied_credits": 60,
+                "num_of_prev_attempts": 1,
+                "low_performance": 1,
+                "low_engagement": 1,
+                "has_previous_attempts": 1,
+            },
+        )
+
+        assert response.status_code == 422
+
     def test_academic_risk_stats_endpoint(self, client):
         """Stats endpoint should surface average performance from XAI records."""
 
-        class FakeQuery:
-            def __init__(self, items):
-                self.items = items
+        class FakeResult:
+            def __init__(self, row):
+                self.row = row
 
-            def order_by(self, *_args, **_kwargs):
-                return self
-
-            def all(self):
-                return self.items
+            def one(self):
+                return self.row
 
         class FakeSession:
-            def __init__(self, items):
-                self.items = items
-
-            def query(self, *_args, **_kwargs):
-                return FakeQuery(self.items)
+            def __init__(self, row):
+                self.row = row
 
-        connected_records = [
-            SimpleNamespace(
-                student_id="STU0001",
-                created_at=datetime(2026, 3, 8, 12, 0, 0),
-                request_payload={"avg_grade": 80},
-                risk_score=0.2,
-                risk_level="Safe",
-            ),
-            SimpleNamespace(
-                student_id="STU0001",
-                created_at=datetime(2026, 3, 7, 12, 0, 0),
-                request_payload={"avg_grade": 60},
-                risk_score=0.5,
-                risk_level="At-Risk",
-            ),
-            SimpleNamespace(
-                student_id="STU0002",
-                created_at=datetime(2026, 3, 8, 12, 0, 0),
-                request_payload={"avg_grade": 70},
-                risk_score=0.7,
-                risk_level="At-Risk",
-            ),
-        ]
+            async def execute(self, _statement):
+                return FakeResult(self.row)
 
-        temp_records = [
-            SimpleNamespace(
-                student_id="TEMP001",
-                avg_grade=55,
-                latest_risk_level="At-Risk",
-            )
-        ]
+        # Aggregates over the latest-per-student table: (students, avg grade, avg risk, high risk).
+        connected_records = (2, 75.0, 0.45, 1)
+        temp_records = (1, 55.0, 1)
 
         app.dependency_overrides[get_db] = lambda: FakeSession(connected_records)
         app.dependency_overrides[get_temp_students_db] = lambda: FakeSession(temp_records)
@@ -241,25 +291,43 @@ class TestAcademicRiskEndpoint:
         data = response.json()
         assert data["total_students_analyzed"] == 2
         assert data["average_performance"] == 75.0
+        assert data["average_risk_score"] == 0.45
         assert data["high_risk_students"] == 1
 
+    def test_academic_risk_stats_fall_back_to_temporary_students(self, client):
+        """Without connected predictions the stats should describe temporary students."""
+
+        class FakeSession:
+            def __init__(self, row):
+                self.row = row
+
+            async def execute(self, _statement):
+                return SimpleNamespace(one=lambda: self.row)
+
+        app.dependency_overrides[get_db] = lambda: FakeSession((0, None, None, 0))
+        app.dependency_overrides[get_temp_students_db] = lambda: FakeSession((3, 61.237, 2))
+
+        try:
+            response = client.get("/api/v1/academic-risk/stats")
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            app.dependency_overrides.pop(get_temp_students_db, None)
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "total_students_analyzed": 3,
+            "average_performance": 61.24,
+            "average_risk_score": None,
+            "high_risk_students": 2,
+        }
+
     def test_list_temporary_students_endpoint(self, client):
         """Saved temporary students should be listable for the manual XAI flow."""
 
-        class FakeQuery:
+        class FakeResult:
             def __init__(self, items):
                 self.items = items
 
-            def order_by(self, *_args, **_kwargs):
-                return self
-
-            def filter(self, *_args, **_kwargs):
-                return self
-
-            def limit(self, value):
-                self.items = self.items[:value]
-                return self
-
             def all(self):
                 return self.items
 
@@ -267,11 +335,12 @@ class TestAcademicRiskEndpoint:
             def __init__(self, items):
                 self.items = items
 
-            def query(self, *_args, **_kwargs):
-                return FakeQuery(self.items)
+            async def scalars(self, _statement):
+                return FakeResult(self.items)
 
         temp_records = [
             SimpleNamespace(
+                id=1,
                 student_id="TEMP001",
                 avg_grade=72.0,
                 latest_risk_level="Medium Risk",
@@ -281,6 +350,7 @@ class TestAcademicRiskEndpoint:
                 created_at=datetime(2026, 3, 9, 10, 0, 0),
             ),
             SimpleNamespace(
+                id=2,
                 student_id="TEMP002",
                 avg_grade=48.0,
                 latest_risk_level="At-Risk",
@@ -303,36 +373,88 @@ class TestAcademicRiskEndpoint:
         assert data["total"] == 2
         assert data["students"][0]["student_id"] == "TEMP001"
         assert data["students"][0]["latest_risk_level"] == "Medium Risk"
+        assert data["next_cursor"] is None
 
-    def test_student_risk_timeline_endpoint(self, client, monkeypatch):
-        """Timeline endpoint should return persisted XAI history in chronological order."""
+    def test_list_temporary_students_pages_with_cursor(self, client):
+        """A full page returns a cursor that resumes after its last record."""
 
-        class FakeQuery:
+        class FakeResult:
             def __init__(self, items):
                 self.items = items
 
-            def filter(self, *_args, **_kwargs):
-                return self
+            def all(self):
+                return self.items
+
+        class FakeSession:
+            def __init__(self, items):
+                self.items = items
+                self.statements = []
+
+            async def scalars(self, statement):
+                self.statements.append(statement)
+                return FakeResult(self.items)
+
+        temp_records = [
+            SimpleNamespace(
+                id=record_id,
+                student_id=f"TEMP00{record_id}",
+                avg_grade=60.0,
+                latest_risk_level="Medium Risk",
+                latest_risk_score=0.5,
+                latest_confidence=0.8,
+                updated_at=datetime(2026, 3, 9, 12 - record_id, 0, 0),
+                created_at=datetime(2026, 3, 9, 9, 0, 0),
+            )
+            for record_id in (1, 2)
+        ]
+        session = FakeSession(temp_records)
+        app.dependency_overrides[get_temp_students_db] = lambda: session
+
+        try:
+            first = client.get("/api/v1/academic-risk/temporary-students?limit=1")
+            cursor = first.json()["next_cursor"]
+            second = client.get(
+                "/api/v1/academic-risk/temporary-students",
+                params={"limit": 1, "cursor": cursor},
+            )
+            invalid = client.get(
+                "/api/v1/academic-risk/temporary-students",
+                params={"limit": 1, "cursor": "not-a-cursor"},
+            )
+        finally:
+            app.dependency_overrides.pop(get_temp_students_db, None)
 
-            def order_by(self, *_args, **_kwargs):
-                return self
+        assert first.status_code == 200
+        assert [student["student_id"] for student in first.json()["students"]] == ["TEMP001"]
+        assert cursor
+        assert second.status_code == 200
+        second_sql = str(session.statements[1].compile(compile_kwargs={"literal_binds": True}))
+        assert "(temporary_students.updated_at, temporary_students.id) <" in second_sql
+        assert invalid.status_code == 422
 
-            def limit(self, value):
-                self.items = self.items[:value]
-                return self
+    def test_student_risk_timeline_endpoint(self, client, monkeypatch):
+        """Timeline endpoint should return persisted XAI history in chronological order."""
+
+        class FakeResult:
+            def __init__(self, items):
+                self.items = items
 
             def all(self):
                 return self.items
 
-            def first(self):
-                return self.items[0] if self.items else None
-
         class FakeSession:
             def __init__(self, model_items):
                 self.model_items = model_items
 
-            def query(self, model):
-                return FakeQuery(self.model_items.get(model, []))
+            def _items(self, statement):
+                return self.model_items.get(statement.column_descriptions[0]["entity"], [])
+
+            async def scalars(self, statement):
+                return FakeResult(self._items(statement))
+
+            async def scalar(self, statement):
+                items = self._items(statement)
+                return items[0] if items else None
 
         academic_records = [
             SimpleNamespace(
@@ -425,32 +547,26 @@ class TestAcademicRiskEndpoint:
     ):
         """Connected timeline should be derived from engagement history before returning 404."""
 
-        class FakeQuery:
+        class FakeResult:
             def __init__(self, items):
                 self.items = items
 
-            def filter(self, *_args, **_kwargs):
-                return self
-
-            def order_by(self, *_args, **_kwargs):
-                return self
-
-            def limit(self, value):
-                self.items = self.items[:value]
-                return self
-
             def all(self):
                 return self.items
 
-            def first(self):
-                return self.items[0] if self.items else None
-
         class FakeSession:
             def __init__(self, model_items):
                 self.model_items = model_items
 
-            def query(self, model):
-                return FakeQuery(self.model_items.get(model, []))
+            def _items(self, statement):
+                return self.model_items.get(statement.column_descriptions[0]["entity"], [])
+
+            async def scalars(self, statement):
+                return FakeResult(self._items(statement))
+
+            async def scalar(self, statement):
+                items = self._items(statement)
+                return items[0] if items else None
 
         async def fake_build_connected_timeline(student_id: str, limit: int, days: int):
             assert student_id == "STU0007"
@@ -515,32 +631,26 @@ class TestAcademicRiskEndpoint:
     def test_temporary_student_risk_timeline_endpoint(self, client):
         """Temporary students should also return a real saved timeline when history exists."""
 
-        class FakeQuery:
+        class FakeResult:
             def __init__(self, items):
                 self.items = items
 
-            def filter(self, *_args, **_kwargs):
-                return self
-
-            def order_by(self, *_args, **_kwargs):
-                return self
-
-            def limit(self, value):
-                self.items = self.items[:value]
-                return self
-
             def all(self):
                 return self.items
 
-            def first(self):
-                return self.items[0] if self.items else None
-
         class FakeSession:
             def __init__(self, model_items):
                 self.model_items = model_items
 
-            def query(self, model):
-                return FakeQuery(self.model_items.get(model, []))
+            def _items(self, statement):
+                return self.model_items.get(statement.column_descriptions[0]["entity"], [])
+
+            async def scalars(self, statement):
+                return FakeResult(self._items(statement))
+
+            async def scalar(self, statement):
+                items = self._items(statement)
+                return items[0] if items else None
 
         temp_history = [
             SimpleNamespace(
@@ -598,25 +708,12 @@ class TestAcademicRiskEndpoint:
     def test_get_temporary_student_record_endpoint(self, client):
         """A saved temporary student should return its form payload and prediction."""
 
-        class FakeQuery:
-            def __init__(self, items):
-                self.items = items
-
-            def filter(self, *_args, **_kwargs):
-                return self
-
-            def order_by(self, *_args, **_kwargs):
-                return self
-
-            def first(self):
-                return self.items[0] if self.items else None
-
         class FakeSession:
             def __init__(self, items):
                 self.items = items
 
-            def query(self, *_args, **_kwargs):
-                return FakeQuery(self.items)
+            async def scalar(self, _statement):
+                return self.items[0] if self.items else None
 
         temp_record = SimpleNamespace(
             student_id="TEMP001",
@@ -676,6 +773,7 @@ class TestConnectedAcademicRiskEndpoints:
             query: str = "",
             limit: int = 10,
             institute_id: str = "LMS_INST_A",
+            cursor: str | None = None,
         ):
             return {
                 "query": query,
@@ -747,10 +845,13 @@ class TestConnectedAcademicRiskEndpoints:
             query: str = "",
             limit: int = 10,
             institute_id: str = "LMS_INST_A",
+            cursor: str | None = None,
         ):
             raise SyncServiceError(status_code=502, detail="engagement unavailable")
 
-        def fake_local_search(db, query: str, limit: int, institute_id: str):
+        async def fake_local_search(
+            db, query: str, limit: int, institute_id: str, cursor: str | None = None
+        ):
             return {
                 "query": query,
                 "total": 1,
@@ -796,7 +897,7 @@ class TestConnectedAcademicRiskEndpoints:
         ):
             raise SyncServiceError(status_code=502, detail="engagement unavailable")
 
-        def fake_local_request(db, student_id: str):
+        async def fake_local_request(db, student_id: str):
             return AcademicRiskRequest(
                 student_id=student_id,
                 avg_grade=55.0,
@@ -1123,17 +1224,18 @@ class TestStudentInsightsServiceThresholds:
             engagement_level="Low",
         )
 
-        safe_similarity = student_insights_service._similarity_score(
-            current_request=current_request,
-            current_prediction=current_prediction,
-            current_learning_style="Visual",
-            candidate=safe_candidate,
-        )
-        at_risk_similarity = student_insights_service._similarity_score(
-            current_request=current_request,
-            current_prediction=current_prediction,
-            current_learning_style="Visual",
-            candidate=at_risk_candidate,
-        )
+        index = SimilarityIndex()
+        index.rebuild([safe_candidate, at_risk_candidate])
+        similarities = {
+            candidate.student_id: similarity
+            for similarity, candidate in index.nearest(
+                request=current_request,
+                prediction=current_prediction,
+                learning_style="Visual",
+                limit=2,
+            )
+        }
+        safe_similarity = similarities["SAFE002"]
+        at_risk_similarity = similarities["RISK001"]
 
         assert safe_similarity > at_risk_similarity
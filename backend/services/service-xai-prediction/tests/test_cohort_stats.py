@@ -0,0 +1,70 @@
+import random
+
+from app.services.cohort_stats import CohortEntry, CohortStats
+
+
+def make_entry(rng: random.Random) -> CohortEntry:
+    risk_score = round(rng.uniform(0, 1), 2)
+    return CohortEntry(
+        metrics={
+            "avg_grade": round(rng.uniform(20, 95), 1),
+            "completion_rate": round(rng.uniform(0, 100), 1),
+            "risk_score": risk_score,
+        },
+        elevated=risk_score >= 0.5,
+        groups={
+            "Learning Style": rng.choice(["Visual", "Auditory", "Unknown"]),
+            "Attempt History": rng.choice(["First attempt", "Has previous attempts"]),
+        },
+    )
+
+
+def test_incremental_updates_match_recomputed_aggregates():
+    rng = random.Random(5)
+    entries = {f"STU{i:03d}": make_entry(rng) for i in range(200)}
+    cohort = CohortStats()
+    cohort.rebuild(dict(list(entries.items())[:150]))
+    for student_id in list(entries)[100:]:
+        entries[student_id] = make_entry(rng)
+        cohort.upsert(student_id, entries[student_id])
+
+    values = list(entries.values())
+    summary = cohort.summary()
+    assert summary["size"] == 200
+    grades = [entry.metrics["avg_grade"] for entry in values]
+    assert abs(summary["averages"]["avg_grade"] - sum(grades) / len(grades)) < 1e-9
+    assert summary["elevated_rate"] == sum(entry.elevated for entry in values) / 2.0
+    for probe in (0.0, 37.5, grades[7], 120.0):
+        expected = sum(1 for grade in grades if grade <= probe) / len(grades) * 100.0
+        assert cohort.percentile_rank("avg_grade", probe) == expected
+
+    members = [entry for entry in values if entry.groups["Learning Style"] == "Visual"]
+    group_count, group = cohort.group("Learning Style", "Visual")
+    assert group_count == 3
+    assert group.size == len(members)
+    expected_risk = sum(entry.metrics["risk_score"] for entry in members) / len(members)
+    assert abs(group.average_risk - expected_risk) < 1e-9
+    assert (
+        group.elevated_rate
+        == sum(entry.elevated for entry in members) / len(members) * 100.0
+    )
+
+
+def test_groups_disappear_when_their_last_member_moves():
+    cohort = CohortStats()
+    entry = CohortEntry(
+        metrics={"avg_grade": 50.0, "completion_rate": 80.0, "risk_score": 0.3},
+        elevated=False,
+        groups={"Learning Style": "Visual"},
+    )
+    cohort.upsert("STU001", entry)
+    cohort.upsert(
+        "STU001",
+        CohortEntry(
+            metrics=entry.metrics, elevated=False, groups={"Learning Style": "Auditory"}
+        ),
+    )
+
+    assert cohort.group("Learning Style", "Visual") == (1, None)
+    assert cohort.group("Learning Style", "Auditory")[1].size == 1
+    assert cohort.percentile_rank("risk_score", 0.3) == 100.0
@@ -0,0 +1,73 @@
+import asyncio
+
+import httpx
+
+from app.services.http_client import UpstreamHTTPClient
+
+
+def test_shared_client_reuses_one_pool_and_caps_upstream_concurrency():
+    active = {"now": 0, "peak": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        return httpx.Response(200, json={"path": request.url.path})
+
+    client = UpstreamHTTPClient(
+        per_upstream_concurrency=2,
+        http2=False,
+        transport=httpx.MockTransport(handler),
+    )
+
+    async def fetch_all():
+        await client.start()
+        try:
+            return await asyncio.gather(
+                *(
+                    client.get(f"http://engagement.test/students/{index}")
+                    for index in range(6)
+                )
+            )
+        finally:
+            await client.close()
+
+    responses = asyncio.run(fetch_all())
+    stats = client.stats()
+
+    assert [response.json()["path"] for response in responses] == [
+        f"/students/{index}" for index in range(6)
+    ]
+    assert active["peak"] == 2
+    assert stats["clients_opened"] == 1
+    assert stats["requests_sent"] == 6
+    assert stats["open"] is False
+
+
+def test_client_from_a_previous_event_loop_is_closed_and_forgotten():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200)
+
+    client = UpstreamHTTPClient(http2=False, transport=httpx.MockTransport(handler))
+
+    async def fetch_once():
+        await client.get("http://engagement.test/students/1")
+        return client._client
+
+    first = asyncio.run(fetch_once())
+
+    async def fetch_again_and_close():
+        second = await fetch_once()
+        semaphore_loops = len(client._semaphores)
+        await client.close()
+        return second, semaphore_loops
+
+    second, semaphore_loops = asyncio.run(fetch_again_and_close())
+    stats = client.stats()
+
+    assert second is not first
+    assert first.is_closed
+    assert semaphore_loops == 1
+    assert stats["clients_opened"] == 2
+    assert stats["clients_retired"] == 1
@@ -0,0 +1,40 @@
+import asyncio
+import threading
+
+from app.services.inference_executor import InferenceExecutor
+
+
+def test_thread_executor_runs_calls_concurrently_and_tracks_depth():
+    executor = InferenceExecutor(mode="thread", max_workers=2)
+    observed_depths = []
+    # Each call waits until a second call is running alongside it; run
+    # serially, the barrier times out and the calls fail.
+    both_running = threading.Barrier(2, timeout=5)
+
+    def paired_call(value: int) -> tuple[int, str]:
+        observed_depths.append(executor.stats()["queue_depth"])
+        both_running.wait()
+        return value, threading.current_thread().name
+
+    async def run_all():
+        return await asyncio.gather(
+            *(executor.run(paired_call, index) for index in range(4))
+        )
+
+    results = asyncio.run(run_all())
+    stats = executor.stats()
+    executor.shutdown()
+
+    assert [value for value, _ in results] == [0, 1, 2, 3]
+    assert all(name.startswith("xai-inference") for _, name in results)
+    assert max(observed_depths) <= 2
+    assert stats["in_flight"] == 0
+    assert stats["completed"] == 4
+
+
+def test_inline_executor_runs_on_calling_thread():
+    executor = InferenceExecutor(mode="inline")
+
+    result = asyncio.run(executor.run(lambda: threading.current_thread().name))
+
+    assert result == threading.current_thread().name
@@ -0,0 +1,71 @@
+from sqlalchemy.dialects import postgresql
+
+from app.schemas.academic_risk import AcademicRiskRequest, AcademicRiskResponse
+from app.services.latest_predictions import upsert_latest_academic_risk
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+
+def make_result(student_id: str, avg_grade: float, risk_score: float):
+    request = AcademicRiskRequest(
+        student_id=student_id,
+        avg_grade=avg_grade,
+        grade_consistency=70.0,
+        grade_range=25.0,
+        num_assessments=6,
+        assessment_completion_rate=0.8,
+        studied_credits=60,
+        num_of_prev_attempts=0,
+        low_performance=0,
+        low_engagement=0,
+        has_previous_attempts=0,
+    )
+    response = AcademicRiskResponse(
+        student_id=student_id,
+        risk_level="At-Risk" if risk_score >= 0.5 else "Safe",
+        risk_score=risk_score,
+        confidence=max(risk_score, 1 - risk_score),
+        probabilities={"Safe": 1 - risk_score, "At-Risk": risk_score},
+        recommendations=[],
+        top_risk_factors=[],
+    )
+    return request, response
+
+
+def test_upsert_keeps_the_last_result_per_student():
+    session = RecordingSession()
+    upsert_latest_academic_risk(
+        session,
+        [
+            make_result("STU001", 40.0, 0.8),
+            make_result("STU002", 75.0, 0.2),
+            make_result("STU001", 65.0, 0.3),
+        ],
+        model_version="1.0",
+    )
+
+    assert len(session.statements) == 1
+    compiled = session.statements[0].compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+    assert "ON CONFLICT (student_id) DO UPDATE" in sql
+
+    rows = {}
+    for key, value in compiled.params.items():
+        column, _, position = key.rpartition("_m")
+        rows.setdefault(position, {})[column] = value
+    assert sorted((row["student_id"], row["avg_grade"]) for row in rows.values()) == [
+        ("STU001", 65.0),
+        ("STU002", 75.0),
+    ]
+
+
+def test_upsert_without_results_is_a_no_op():
+    session = RecordingSession()
+    upsert_latest_academic_risk(session, [], model_version=None)
+    assert session.statements == []
@@ -0,0 +1,95 @@
+import asyncio
+
+from app.services.persistence_queue import PersistenceQueue, PersistenceSink
+
+
+class RecordingSession:
+    def __init__(self, log):
+        self.log = log
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def run_sync(self, fn, *args):
+        return fn(self, *args)
+
+    async def commit(self):
+        self.log.append("commit")
+
+    async def rollback(self):
+        self.log.append("rollback")
+
+
+def make_sink(log, batches, failures=0):
+    remaining_failures = [failures]
+
+    def write(db, items):
+        if remaining_failures[0]:
+            remaining_failures[0] -= 1
+            raise RuntimeError("database unavailable")
+        batches.append(list(items))
+
+    return PersistenceSink(
+        name="test",
+        session_factory=lambda: RecordingSession(log),
+        write=write,
+        on_written=lambda items: log.append(("written", len(items))),
+    )
+
+
+def test_queued_items_are_flushed_in_batches_and_drained_on_stop():
+    log, batches = [], []
+    sink = make_sink(log, batches)
+    queue = PersistenceQueue(
+        max_size=100, flush_interval_seconds=0.01, max_batch_size=4
+    )
+
+    async def scenario():
+        queue.start()
+        await queue.submit_many(sink, range(10))
+        await queue.stop(timeout=2.0)
+
+    asyncio.run(scenario())
+
+    assert [item for batch in batches for item in batch] == list(range(10))
+    assert all(len(batch) <= 4 for batch in batches)
+    assert len(batches) < 10
+    assert log.count("commit") == len(batches)
+    stats = queue.stats()
+    assert stats["written"] == 10
+    assert stats["running"] is False
+    assert stats["depth"] == 0
+
+
+def test_failed_batches_are_retried_then_counted():
+    log, batches = [], []
+    queue = PersistenceQueue(max_retries=2, retry_backoff_seconds=0.0)
+
+    asyncio.run(queue.submit(make_sink(log, batches, failures=2), "row"))
+    assert batches == [["row"]]
+    assert queue.stats()["retries"] == 2
+    assert log.count("rollback") == 2
+
+    asyncio.run(queue.submit(make_sink(log, batches, failures=3), "lost"))
+    assert queue.stats()["failed"] == 1
+    assert ("written", 1) in log
+    assert batches == [["row"]]
+
+
+def test_full_queue_applies_backpressure():
+    log, batches = [], []
+    sink = make_sink(log, batches)
+    queue = PersistenceQueue(max_size=2, flush_interval_seconds=0.01, max_batch_size=2)
+
+    async def scenario():
+        queue.start()
+        await queue.submit_many(sink, range(8))
+        await queue.stop(timeout=2.0)
+
+    asyncio.run(scenario())
+
+    assert [item for batch in batches for item in batch] == list(range(8))
+    assert queue.stats()["backpressure_waits"] > 0
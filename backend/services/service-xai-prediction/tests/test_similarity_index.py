@@ -0,0 +1,155 @@
+import random
+import time
+
+from app.schemas.academic_risk import AcademicRiskRequest, AcademicRiskResponse
+from app.services.similarity_index import SimilarityIndex
+from app.services.student_insights_service import InsightCandidate
+
+RISK_LEVELS = ["Safe", "Medium Risk", "At-Risk"]
+LEARNING_STYLES = ["Visual", "Auditory", "Kinesthetic", None]
+
+
+def make_candidate(rng: random.Random, student_id: str) -> InsightCandidate:
+    avg_grade = round(rng.uniform(20, 95), 2)
+    attempts = rng.randint(0, 2)
+    request = AcademicRiskRequest(
+        student_id=student_id,
+        avg_grade=avg_grade,
+        grade_consistency=round(rng.uniform(40, 100), 2),
+        grade_range=round(rng.uniform(0, 60), 2),
+        num_assessments=rng.randint(0, 20),
+        assessment_completion_rate=round(rng.uniform(0, 1), 3),
+        studied_credits=60,
+        num_of_prev_attempts=attempts,
+        low_performance=1 if avg_grade < 40 else 0,
+        low_engagement=rng.randint(0, 1),
+        has_previous_attempts=1 if attempts else 0,
+    )
+    risk_level = rng.choice(RISK_LEVELS)
+    prediction = AcademicRiskResponse(
+        student_id=student_id,
+        risk_level=risk_level,
+        risk_score=round(rng.uniform(0, 1), 4),
+        confidence=0.8,
+        probabilities={level: 1 / 3 for level in RISK_LEVELS},
+        recommendations=[],
+        top_risk_factors=[],
+    )
+    return InsightCandidate(
+        student_id=student_id,
+        request=request,
+        prediction=prediction,
+        learning_style=rng.choice(LEARNING_STYLES),
+        engagement_level=rng.choice(["Low", "Medium", "High"]),
+    )
+
+
+def test_similarity_weights_features_flags_bands_and_style():
+    rng = random.Random(5)
+    current = make_candidate(rng, "CURRENT")
+    current.request = current.request.model_copy(
+        update={
+            "avg_grade": 50.0,
+            "assessment_completion_rate": 0.5,
+            "grade_consistency": 70.0,
+            "grade_range": 20.0,
+            "num_assessments": 10,
+            "low_engagement": 0,
+            "low_performance": 0,
+            "has_previous_attempts": 0,
+        }
+    )
+    current.prediction = current.prediction.model_copy(
+        update={"risk_level": "Medium Risk", "risk_score": 0.5}
+    )
+    neighbour = make_candidate(rng, "NEIGHBOUR")
+    neighbour.learning_style = "Visual"
+    neighbour.request = current.request.model_copy(
+        update={
+            "student_id": "NEIGHBOUR",
+            "avg_grade": 60.0,
+            "assessment_completion_rate": 0.6,
+            "grade_consistency": 60.0,
+            "grade_range": 30.0,
+            "num_assessments": 12,
+            "low_engagement": 1,
+        }
+    )
+    neighbour.prediction = current.prediction.model_copy(
+        update={"student_id": "NEIGHBOUR", "risk_level": "At-Risk", "risk_score": 0.7}
+    )
+    index = SimilarityIndex()
+    index.rebuild([neighbour])
+
+    [(similarity, _)] = index.nearest(
+        current.request, current.prediction, "Visual", limit=1
+    )
+
+    # 0.03 + 0.025 + 0.015 + 0.01 + 0.01 + 0.02 numeric, 0.05 flag, 0.12 band gap,
+    # then the 0.05 shared learning style bonus
+    assert abs(similarity - 0.77) < 1e-9
+
+
+def test_nearest_returns_the_head_of_the_full_ranking():
+    rng = random.Random(7)
+    candidates = [make_candidate(rng, f"STU{i:04d}") for i in range(300)]
+    current = candidates[0]
+    index = SimilarityIndex()
+    index.rebuild(candidates)
+
+    def ranking(limit):
+        return index.nearest(
+            request=current.request,
+            prediction=current.prediction,
+            learning_style="Visual",
+            limit=limit,
+            exclude_student_id=current.student_id,
+        )
+
+    full = ranking(len(candidates))
+    top = ranking(5)
+
+    assert len(full) == len(candidates) - 1
+    assert [similarity for similarity, _ in full] == sorted(
+        (similarity for similarity, _ in full), reverse=True
+    )
+    assert [candidate.student_id for _, candidate in top] == [
+        candidate.student_id for _, candidate in full[:5]
+    ]
+
+
+def test_upsert_replaces_rows_and_keeps_known_profile():
+    rng = random.Random(3)
+    index = SimilarityIndex(refresh_seconds=60)
+    assert index.is_stale()
+    live = make_candidate(rng, "STU0001")
+    live.learning_style = "Visual"
+    index.rebuild([live, make_candidate(rng, "STU0002")])
+    assert not index.is_stale()
+
+    stored = make_candidate(rng, "STU0001")
+    stored.learning_style = None
+    index.upsert(stored)
+
+    assert len(index) == 2
+    [(_, match)] = index.nearest(
+        stored.request, stored.prediction, None, limit=1, exclude_student_id="STU0002"
+    )
+    assert match.request == stored.request
+    assert match.learning_style == "Visual"
+    assert stored.learning_style is None
+
+
+def test_nearest_scales_to_whole_institute():
+    rng = random.Random(11)
+    index = SimilarityIndex()
+    index.upsert_many(make_candidate(rng, f"STU{i:05d}") for i in range(20000))
+    current = make_candidate(rng, "CURRENT")
+
+    started = time.perf_counter()
+    nearest = index.nearest(current.request, current.prediction, "Visual", limit=3)
+    elapsed = time.perf_counter() - started
+
+    assert len(nearest) == 3
+    assert nearest[0][0] >= nearest[1][0] >= nearest[2][0]
+    assert elapsed < 0.5
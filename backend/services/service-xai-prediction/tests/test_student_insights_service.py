@@ -0,0 +1,410 @@
+import asyncio
+import time
+
+from app.core.cache import LRUTTLCache
+from app.core.config import settings
+from app.schemas.academic_risk import AcademicRiskRequest, StudentInsightsRequest
+from app.services.academic_risk_service import academic_risk_service
+from app.services.student_insights_service import (
+    InsightCandidate,
+    student_insights_service,
+)
+
+
+class EmptyResult:
+    def all(self):
+        return []
+
+
+class EmptySession:
+    async def scalars(self, *args):
+        return EmptyResult()
+
+    async def execute(self, *args):
+        return EmptyResult()
+
+
+def make_request() -> AcademicRiskRequest:
+    return AcademicRiskRequest(
+        student_id="STU_WHATIF_1",
+        avg_grade=52.0,
+        grade_consistency=68.0,
+        grade_range=28.0,
+        num_assessments=5,
+        assessment_completion_rate=0.62,
+        studied_credits=60,
+        num_of_prev_attempts=1,
+        low_performance=0,
+        low_engagement=0,
+        has_previous_attempts=1,
+    )
+
+
+def test_what_if_scores_all_scenarios_and_probes_in_one_batch(monkeypatch):
+    request = make_request()
+    prediction = academic_risk_service.score_batch_sync([request])[0]
+    scenarios = student_insights_service._intervention_scenarios(request, "Visual")
+    probes = student_insights_service._stability_probes(request)
+    perturbed = [scenario[2] for scenario in scenarios] + [
+        probe.request for probe in probes
+    ]
+
+    batches: list[int] = []
+    original_score_batch = academic_risk_service.score_batch
+
+    async def counting_score_batch(requests):
+        batches.append(len(requests))
+        return await original_score_batch(requests)
+
+    monkeypatch.setattr(academic_risk_service, "score_batch", counting_score_batch)
+    outcomes = asyncio.run(student_insights_service._run_what_if(prediction, perturbed))
+
+    assert batches == [len(scenarios) + 10]
+    for outcome, perturbed_request in zip(outcomes, perturbed):
+        expected = academic_risk_service.score_batch_sync([perturbed_request])[0]
+        assert outcome.prediction.risk_score == expected.risk_score
+        assert outcome.risk_delta == expected.risk_score - prediction.risk_score
+        assert outcome.level_changed == (expected.risk_level != prediction.risk_level)
+
+    interventions = student_insights_service._build_ranked_interventions(
+        current_request=request,
+        current_prediction=prediction,
+        scenarios=scenarios,
+        outcomes=outcomes[: len(scenarios)],
+    )
+    stability = student_insights_service._build_explanation_stability(
+        probes=probes,
+        outcomes=outcomes[len(scenarios) :],
+    )
+
+    assert [item.rank for item in interventions] == list(
+        range(1, len(interventions) + 1)
+    )
+    assert len(stability.sensitive_features) == 4
+    assert 0.0 <= stability.stability_score <= 100.0
+
+
+async def skip_refresh(cohort_key):
+    return None
+
+
+def test_build_insights_degrades_sections_that_miss_the_budget(monkeypatch):
+    request = make_request()
+    prediction = academic_risk_service.score_batch_sync([request])[0]
+    monkeypatch.setattr(student_insights_service, "similarity_indexes", {})
+    monkeypatch.setattr(student_insights_service, "cohort_stats", {})
+    monkeypatch.setattr(
+        student_insights_service, "insights_cache", LRUTTLCache(100, 60)
+    )
+    neighbour_request = request.model_copy(update={"student_id": "STU_WHATIF_2"})
+    student_insights_service.record_prediction(
+        "temporary", neighbour_request, prediction
+    )
+
+    async def slow_case_outcome(source, candidate, history):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(settings, "INSIGHTS_LATENCY_BUDGET_MS", 100.0)
+    monkeypatch.setattr(
+        student_insights_service, "_resolve_case_outcome", slow_case_outcome
+    )
+    monkeypatch.setattr(
+        student_insights_service,
+        "_refresh_materialized_views",
+        skip_refresh,
+    )
+
+    started = time.perf_counter()
+    response = asyncio.run(
+        student_insights_service.build_insights(
+            StudentInsightsRequest(
+                source="temporary",
+                request_payload=request,
+                prediction=prediction,
+            ),
+            db=EmptySession(),
+            temp_db=EmptySession(),
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 2.0
+    assert response.degraded_sections == ["case_outcome_explorer"]
+    assert response.interventions
+    assert response.explanation_stability is not None
+    [case] = response.case_outcome_explorer.cases
+    assert case.student_id == "STU_WHATIF_2"
+    assert case.trajectory == "insufficient_data"
+
+
+def test_repeat_insights_are_served_from_cache_until_cohort_changes(monkeypatch):
+    request = make_request()
+    prediction = academic_risk_service.score_batch_sync([request])[0]
+    monkeypatch.setattr(student_insights_service, "similarity_indexes", {})
+    monkeypatch.setattr(student_insights_service, "cohort_stats", {})
+    monkeypatch.setattr(
+        student_insights_service, "insights_cache", LRUTTLCache(100, 60)
+    )
+    monkeypatch.setattr(
+        student_insights_service,
+        "_refresh_materialized_views",
+        skip_refresh,
+    )
+
+    batches: list[int] = []
+    original_score_batch = academic_risk_service.score_batch
+
+    async def counting_score_batch(requests):
+        batches.append(len(requests))
+        return await original_score_batch(requests)
+
+    monkeypatch.setattr(academic_risk_service, "score_batch", counting_score_batch)
+    payload = StudentInsightsRequest(
+        source="temporary",
+        request_payload=request,
+        prediction=prediction,
+    )
+
+    def build():
+        return asyncio.run(
+            student_insights_service.build_insights(
+                payload,
+                db=EmptySession(),
+                temp_db=EmptySession(),
+            )
+        )
+
+    first = build()
+    second = build()
+    assert len(batches) == 1
+    assert second == first
+
+    neighbour_request = request.model_copy(update={"student_id": "STU_WHATIF_3"})
+    student_insights_service.record_prediction(
+        "temporary", neighbour_request, prediction
+    )
+    third = build()
+    assert len(batches) == 2
+    assert (
+        third.cohort_comparison.cohort_size == first.cohort_comparison.cohort_size + 1
+    )
+
+
+def test_connected_index_and_cohort_are_partitioned_by_institute(monkeypatch):
+    request = make_request()
+    prediction = academic_risk_service.score_batch_sync([request])[0]
+    monkeypatch.setattr(student_insights_service, "similarity_indexes", {})
+    monkeypatch.setattr(student_insights_service, "cohort_stats", {})
+    neighbour_request = request.model_copy(update={"student_id": "STU_INST_A_1"})
+    student_insights_service._index_candidates(
+        ("connected", "INST_A"),
+        [
+            InsightCandidate(
+                student_id="STU_INST_A_1",
+                request=neighbour_request,
+                prediction=prediction,
+            )
+        ],
+    )
+    student_insights_service._index_candidates(("connected", "INST_B"), [])
+    # A prediction without an institute only updates partitions holding the student
+    student_insights_service.record_prediction(
+        "connected", neighbour_request, prediction
+    )
+
+    def similar_ids(institute_id):
+        return [
+            candidate.student_id
+            for _, candidate in student_insights_service._rank_similar_candidates(
+                cohort_key=("connected", institute_id),
+                current_request=request,
+                current_prediction=prediction,
+                current_learning_style=None,
+            )
+        ]
+
+    assert similar_ids("INST_A") == ["STU_INST_A_1"]
+    assert similar_ids("INST_B") == []
+    assert len(student_insights_service.cohort_stats[("connected", "INST_A")]) == 1
+    assert len(student_insights_service.cohort_stats[("connected", "INST_B")]) == 0
+
+
+def test_recorded_prediction_only_retires_its_own_institute_cache(monkeypatch):
+    request = make_request()
+    prediction = academic_risk_service.score_batch_sync([request])[0]
+    monkeypatch.setattr(student_insights_service, "similarity_indexes", {})
+    monkeypatch.setattr(student_insights_service, "cohort_stats", {})
+    monkeypatch.setattr(
+        student_insights_service, "insights_cache", LRUTTLCache(100, 60)
+    )
+    monkeypatch.setattr(student_insights_service, "_cohort_generations", {})
+    institute_a, institute_b = ("connected", "INST_A"), ("connected", "INST_B")
+    for cohort_key in (institute_a, institute_b):
+        candidate = InsightCandidate(
+            student_id=request.student_id, request=request, prediction=prediction
+        )
+        student_insights_service._index_candidates(cohort_key, [candidate])
+        student_insights_service.insights_cache.set((cohort_key, "STU_OTHER"), "cached")
+        student_insights_service.insights_cache.set(
+            (cohort_key, request.student_id), "cached"
+        )
+
+    student_insights_service.record_prediction(
+        "connected", request, prediction, institute_id="INST_A"
+    )
+
+    generations = student_insights_service._cohort_generations
+    assert generations.get(institute_a) == 1
+    assert generations.get(institute_b) is None
+    assert (
+        student_insights_service.insights_cache.get((institute_a, request.student_id))
+        is None
+    )
+    assert (
+        student_insights_service.insights_cache.get((institute_b, request.student_id))
+        == "cached"
+    )
+
+
+def test_case_outcome_explorer_loads_every_history_in_one_statement():
+    request = make_request()
+    prediction = academic_risk_service.score_batch_sync([request])[0]
+    candidates = [
+        (
+            0.9,
+            InsightCandidate(
+                student_id=student_id, request=request, prediction=prediction
+            ),
+        )
+        for student_id in ("TEMP_A", "TEMP_B")
+    ]
+
+    class HistorySession:
+        statements = 0
+
+        async def execute(self, statement):
+            self.statements += 1
+            rows = [("TEMP_A", 0.8, "At-Risk"), ("TEMP_A", 0.3, "Safe")]
+            return type("Result", (), {"all": lambda _self: rows})()
+
+    session = HistorySession()
+    explorer, complete = asyncio.run(
+        student_insights_service._build_case_outcome_explorer(
+            source="temporary",
+            ranked_candidates=candidates,
+            db=EmptySession(),
+            temp_db=session,
+        )
+    )
+
+    assert complete
+    assert session.statements == 1
+    assert [case.trajectory for case in explorer.cases] == [
+        "improving",
+        "insufficient_data",
+    ]
+
+
+def test_case_outcome_explorer_reports_failed_history_load_as_incomplete():
+    request = make_request()
+    prediction = academic_risk_service.score_batch_sync([request])[0]
+    candidates = [
+        (
+            0.9,
+            InsightCandidate(
+                student_id="TEMP_A", request=request, prediction=prediction
+            ),
+        )
+    ]
+
+    class FailingSession:
+        rollbacks = 0
+
+        async def execute(self, statement):
+            raise RuntimeError("connection reset")
+
+        async def rollback(self):
+            self.rollbacks += 1
+
+    session = FailingSession()
+    explorer, complete = asyncio.run(
+        student_insights_service._build_case_outcome_explorer(
+            source="temporary",
+            ranked_candidates=candidates,
+            db=EmptySession(),
+            temp_db=session,
+        )
+    )
+
+    assert not complete
+    assert session.rollbacks == 1
+    assert [case.trajectory for case in explorer.cases] == ["insufficient_data"]
+
+
+def test_stale_index_is_rebuilt_off_the_request_path(monkeypatch):
+    request = make_request()
+    prediction = academic_risk_service.score_batch_sync([request])[0]
+    monkeypatch.setattr(student_insights_service, "similarity_indexes", {})
+    monkeypatch.setattr(student_insights_service, "cohort_stats", {})
+    monkeypatch.setattr(
+        student_insights_service, "insights_cache", LRUTTLCache(100, 60)
+    )
+    monkeypatch.setattr(student_insights_service, "_refresh_tasks", {})
+    # No budget: the request would wait forever if it awaited the rebuild
+    monkeypatch.setattr(settings, "INSIGHTS_LATENCY_BUDGET_MS", 0.0)
+    index = student_insights_service._similarity_index(("temporary", ""))
+    index.rebuild([])
+    index.refresh_seconds = 0.0
+    started_refreshes: list[tuple[str, str]] = []
+
+    async def blocked_refresh(cohort_key):
+        started_refreshes.append(cohort_key)
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(
+        student_insights_service, "_refresh_materialized_views", blocked_refresh
+    )
+
+    response = asyncio.run(
+        student_insights_service.build_insights(
+            StudentInsightsRequest(
+                source="temporary",
+                request_payload=request,
+                prediction=prediction,
+            ),
+            db=EmptySession(),
+            temp_db=EmptySession(),
+        )
+    )
+
+    assert started_refreshes == [("temporary", "")]
+    assert response.student_id == request.student_id
+
+
+def test_connected_history_is_filtered_to_the_roster_in_sql():
+    class CapturingSession:
+        def __init__(self):
+            self.statements = []
+
+        async def scalars(self, statement):
+            self.statements.append(statement)
+            return EmptyResult()
+
+    session = CapturingSession()
+
+    asyncio.run(
+        student_insights_service._build_connected_candidates_from_history(
+            session, current_student_id="STU_SELF", student_ids={"STU_A", "STU_B"}
+        )
+    )
+    skipped = asyncio.run(
+        student_insights_service._build_connected_candidates_from_history(
+            session, current_student_id=None, student_ids=set()
+        )
+    )
+
+    [statement] = session.statements
+    compiled = statement.compile(compile_kwargs={"render_postcompile": True})
+    assert "xai_academic_risk_latest.student_id IN (" in str(compiled)
+    assert set(compiled.params.values()) >= {"STU_A", "STU_B"}
+    assert skipped == []
@@ -0,0 +1,251 @@
+import asyncio
+import json
+
+import httpx
+
+from app.services import sync_service as sync_service_module
+from app.services.http_client import UpstreamHTTPClient
+from app.services.sync_service import XAIFeatureSyncService
+
+HISTORY = {
+    "STU0001": [
+        {
+            "student_id": "STU0001",
+            "date": "2026-03-01",
+            "engagement_score": 62.0,
+            "assignment_score": 70.0,
+            "engagement_level": "Medium",
+        },
+        {
+            "student_id": "STU0001",
+            "date": "2026-03-02",
+            "engagement_score": 58.0,
+            "assignment_score": 64.0,
+            "engagement_level": "Medium",
+        },
+    ],
+    "STU0002": [
+        {
+            "student_id": "STU0002",
+            "date": "2026-03-02",
+            "engagement_score": 31.0,
+            "assignment_score": 0.0,
+            "engagement_level": "Low",
+        },
+    ],
+}
+METRICS = {
+    "STU0001": [{"date": "2026-03-02", "quiz_attempts": 1, "assignments_submitted": 1}],
+    "STU0002": [],
+}
+PROFILES = {"STU0001": {"student_id": "STU0001", "avg_completion_rate": 80.0}}
+
+
+def entries_until(service, entries, target_date):
+    """Reference prefix filter the running series must reproduce."""
+    return [
+        item
+        for item in entries
+        if service._extract_entry_date(item) is not None
+        and service._extract_entry_date(item) <= target_date
+    ]
+
+
+def build_sync_service(bulk_available: bool) -> tuple[XAIFeatureSyncService, list[str]]:
+    calls: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        calls.append(f"{request.method} {path}")
+        if path.endswith("/students/bulk-features") or path.endswith("/students/bulk"):
+            if not bulk_available:
+                return httpx.Response(404, json={"detail": "Not Found"})
+            ids = json.loads(request.content)["student_ids"]
+            if path.endswith("/bulk"):
+                return httpx.Response(
+                    200, json=[PROFILES[sid] for sid in ids if sid in PROFILES]
+                )
+            return httpx.Response(
+                200,
+                json={
+                    "days": 14,
+                    "students": [
+                        {
+                            "student_id": sid,
+                            "latest": HISTORY[sid][-1],
+                            "history": HISTORY[sid],
+                            "metrics": METRICS[sid],
+                        }
+                        for sid in ids
+                        if sid in HISTORY
+                    ],
+                    "missing": [sid for sid in ids if sid not in HISTORY],
+                },
+            )
+
+        student_id = path.split("/students/")[-1].split("/")[0]
+        if path.endswith("/latest"):
+            data = HISTORY.get(student_id, [None])[-1]
+        elif path.endswith("/history"):
+            data = HISTORY.get(student_id)
+        elif path.endswith("/metrics"):
+            data = METRICS.get(student_id) or None
+        else:
+            data = PROFILES.get(student_id)
+        if data is None:
+            return httpx.Response(404, json={"detail": "Not Found"})
+        return httpx.Response(200, json=data)
+
+    service = XAIFeatureSyncService()
+    service.http = UpstreamHTTPClient(
+        http2=False, transport=httpx.MockTransport(handler)
+    )
+    return service, calls
+
+
+def test_bulk_request_builder_matches_per_student_requests():
+    service, calls = build_sync_service(bulk_available=True)
+    student_ids = ["STU0001", "STU0002", "STU9999"]
+
+    bulk = asyncio.run(service.build_academic_risk_requests_bulk(student_ids))
+    bulk_calls = list(calls)
+    single = {
+        student_id: asyncio.run(service.build_academic_risk_request(student_id))
+        for student_id in ["STU0001", "STU0002"]
+    }
+
+    assert len(bulk_calls) == 2
+    assert set(bulk) == {"STU0001", "STU0002"}
+    assert bulk == single
+
+
+def test_bulk_request_builder_falls_back_to_per_student_fetches():
+    service, calls = build_sync_service(bulk_available=False)
+
+    bulk = asyncio.run(
+        service.build_academic_risk_requests_bulk(["STU0001", "STU0002"])
+    )
+
+    assert set(bulk) == {"STU0001", "STU0002"}
+    assert bulk["STU0001"].assessment_completion_rate == 0.8
+    assert any(call.endswith("/STU0001/latest") for call in calls)
+
+
+def test_timeline_requests_match_per_point_slices():
+    service = XAIFeatureSyncService()
+    history = service._normalize_entries_by_date(
+        [
+            {
+                "date": f"2026-03-{day:02d}",
+                "engagement_score": 40.0 + (day * 7) % 23,
+                "assignment_score": None
+                if day % 4 == 0
+                else float(55 + (day * 11) % 30),
+            }
+            for day in range(1, 29)
+        ]
+    )
+    metrics = service._normalize_entries_by_date(
+        [
+            {
+                "date": f"2026-03-{day:02d}",
+                "quiz_attempts": day % 3,
+                "assignments_submitted": day % 2,
+            }
+            for day in range(2, 29, 2)
+        ]
+    )
+    profile = {"avg_completion_rate": 72.0, "learning_style": "Visual"}
+    selected = service._select_timeline_entries(history, 10)
+
+    timeline = service._build_timeline_requests(
+        "STU0001", history, metrics, selected, profile
+    )
+
+    assert [entry for entry, _ in timeline] == selected
+    for entry, request in timeline:
+        entry_date = service._extract_entry_date(entry)
+        expected = service._map_to_academic_risk_request(
+            student_id="STU0001",
+            latest_score=entry,
+            history=entries_until(service, history, entry_date),
+            daily_metrics=entries_until(service, metrics, entry_date),
+            profile=profile,
+            timeline_mode=True,
+        )
+        assert request == expected
+
+
+def test_search_students_pages_the_cached_roster_index(monkeypatch):
+    monkeypatch.setattr(sync_service_module, "ROSTER_PAGE_SIZE", 2)
+    roster = [
+        {"student_id": student_id, "engagement_score": 50.0}
+        for student_id in ["STU0002", "ABC0100", "STU0001", "XSTU9", "STU0003"]
+    ]
+    calls: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.endswith("/students/list"):
+            offset = int(request.url.params["offset"])
+            calls.append(f"list {offset}")
+            return httpx.Response(200, json={"students": roster[offset : offset + 2]})
+        if path.endswith("/students/bulk"):
+            ids = json.loads(request.content)["student_ids"]
+            calls.append(f"bulk {','.join(ids)}")
+            return httpx.Response(
+                200, json=[PROFILES[sid] for sid in ids if sid in PROFILES]
+            )
+        return httpx.Response(404, json={"detail": "Not Found"})
+
+    service = XAIFeatureSyncService()
+    service.http = UpstreamHTTPClient(
+        http2=False, transport=httpx.MockTransport(handler)
+    )
+
+    first = asyncio.run(service.search_students(query="stu", limit=2))
+    second = asyncio.run(
+        service.search_students(query="stu", limit=2, cursor=first.next_cursor)
+    )
+
+    assert [student.student_id for student in first.students] == ["STU0001", "STU0002"]
+    assert [student.student_id for student in second.students] == ["STU0003", "XSTU9"]
+    assert first.total == second.total == 4
+    assert first.students[0].has_learning_profile
+    assert second.next_cursor is None
+    assert calls == [
+        "list 0",
+        "list 2",
+        "list 4",
+        "bulk STU0001,STU0002",
+        "bulk STU0003,XSTU9",
+    ]
+
+
+def test_concurrent_searches_share_one_roster_rebuild():
+    calls: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.endswith("/students/list"):
+            calls.append(f"list {request.url.params['offset']}")
+            await asyncio.sleep(0)
+            return httpx.Response(200, json={"students": [{"student_id": "STU0001"}]})
+        if path.endswith("/students/bulk"):
+            return httpx.Response(200, json=[])
+        return httpx.Response(404, json={"detail": "Not Found"})
+
+    service = XAIFeatureSyncService()
+    service.http = UpstreamHTTPClient(
+        http2=False, transport=httpx.MockTransport(handler)
+    )
+
+    async def search_concurrently():
+        return await asyncio.gather(
+            *(service.search_students(query="stu", limit=5) for _ in range(4))
+        )
+
+    results = asyncio.run(search_concurrently())
+
+    assert calls == ["list 0"]
+    assert all(result.total == 1 for result in results)
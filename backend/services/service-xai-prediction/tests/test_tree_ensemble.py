@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from app.services.tree_ensemble import CompiledTreeEnsemble, UnsupportedModelError
+
+
+def train_booster(params: dict, labels_from) -> tuple[xgb.Booster, np.ndarray]:
+    rng = np.random.default_rng(7)
+    features = rng.uniform(0, 100, size=(400, 5)).astype(np.float32)
+    labels = labels_from(features)
+    booster = xgb.train(params, xgb.DMatrix(features, label=labels), num_boost_round=25)
+    return booster, features
+
+
+def compile_booster(booster: xgb.Booster) -> CompiledTreeEnsemble:
+    return CompiledTreeEnsemble(json.loads(booster.save_raw("json")))
+
+
+def test_compiled_binary_model_matches_booster():
+    booster, features = train_booster(
+        {"objective": "binary:logistic", "max_depth": 4},
+        lambda x: (x[:, 0] + x[:, 2] > 100).astype(int),
+    )
+    compiled = compile_booster(booster)
+
+    assert compiled.max_abs_error(booster, features) <= 1e-6
+    assert compiled.max_abs_error(booster, compiled.validation_rows()) <= 1e-6
+    assert compiled.predict(features[0]).shape == (1,)
+
+
+def test_compiled_multiclass_model_matches_booster_with_missing_values():
+    booster, features = train_booster(
+        {"objective": "multi:softprob", "num_class": 3, "max_depth": 3},
+        lambda x: np.digitize(x[:, 1], [33.0, 66.0]),
+    )
+    compiled = compile_booster(booster)
+    features[::5, 1] = np.nan
+
+    assert compiled.predict(features[:3]).shape == (3, 3)
+    assert compiled.max_abs_error(booster, features) <= 1e-6
+
+
+def test_compiled_model_rejects_unsupported_objective():
+    booster, _ = train_booster(
+        {"objective": "reg:squarederror", "max_depth": 2},
+        lambda x: x[:, 0],
+    )
+
+    with pytest.raises(UnsupportedModelError):
+        compile_booster(booster)
@@ -0,0 +1,95 @@
+import asyncio
+
+from app.services.upstream_cache import InMemoryCacheBackend, UpstreamCache
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = UpstreamCache(InMemoryCacheBackend(max_entries=10))
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"students": ["STU0001"]}
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.get_or_fetch("roster", fetch, ttl_seconds=60) for _ in range(5))
+        )
+
+    results = asyncio.run(run())
+    cached = asyncio.run(cache.get_or_fetch("roster", fetch, ttl_seconds=60))
+
+    assert len(calls) == 1
+    assert all(result == {"students": ["STU0001"]} for result in results)
+    assert cached == {"students": ["STU0001"]}
+    assert cache.stats()["coalesced"] == 4
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_entries_are_served_while_refreshing():
+    cache = UpstreamCache(InMemoryCacheBackend(max_entries=10))
+    versions = iter(["v1", "v2"])
+
+    async def fetch():
+        return next(versions)
+
+    async def run():
+        first = await cache.get_or_fetch(
+            "profile", fetch, ttl_seconds=60, stale_seconds=600
+        )
+        entry = await cache.backend.get("profile")
+        entry.stored_at -= 120
+        stale = await cache.get_or_fetch(
+            "profile", fetch, ttl_seconds=60, stale_seconds=600
+        )
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        refreshed = await cache.get_or_fetch(
+            "profile", fetch, ttl_seconds=60, stale_seconds=600
+        )
+        return first, stale, refreshed
+
+    assert asyncio.run(run()) == ("v1", "v1", "v2")
+    assert cache.stats()["stale_hits"] == 1
+    assert cache.stats()["refreshes"] == 1
+
+
+def test_missing_results_are_not_cached():
+    cache = UpstreamCache(InMemoryCacheBackend(max_entries=10))
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return None
+
+    asyncio.run(cache.get_or_fetch("profile", fetch, ttl_seconds=60))
+    asyncio.run(cache.get_or_fetch("profile", fetch, ttl_seconds=60))
+
+    assert len(calls) == 2
+
+
+def test_cancelled_leader_does_not_cancel_coalesced_callers():
+    cache = UpstreamCache(InMemoryCacheBackend(max_entries=10))
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {"students": ["STU0001"]}
+
+    async def run():
+        leader = asyncio.ensure_future(
+            asyncio.wait_for(cache.get_or_fetch("roster", fetch, ttl_seconds=60), 0.05)
+        )
+        # Let the leader start the fetch before the follower joins it
+        await asyncio.sleep(0.01)
+        follower = cache.get_or_fetch("roster", fetch, ttl_seconds=60)
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader_result, follower_result = asyncio.run(run())
+
+    assert isinstance(leader_result, asyncio.TimeoutError)
+    assert follower_result == {"students": ["STU0001"]}
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 1